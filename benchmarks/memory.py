@@ -0,0 +1,159 @@
+"""
+Benchmark the memory used by a loaded synthetic inventory, with all its
+resource objects built, with and without the compact mode.
+
+Each mode builds its own binary snapshots first, and is then measured in
+two fresh Python processes: one reports the memory allocated by Python
+according to tracemalloc, and the other the resident set size of the process,
+which is measured without tracemalloc as its bookkeeping inflates it.
+
+Usage:
+    python benchmarks/memory.py [--resources 100000] [--inventory-dir DIR]
+"""
+
+from clinv.inventory import Inventory
+from synthetic_inventory import write_inventory
+import argparse
+import gc
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def current_rss():
+    """
+    Return the current resident set size of the process in bytes, or None
+    if the platform doesn't expose it.
+    """
+
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def measure(inventory_dir, compact, trace):
+    """
+    Load the inventory, build all its resources and print the memory used as
+    a json document.
+    """
+
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    inventory = Inventory(inventory_dir, compact=compact)
+    inventory.load()
+    resources = sum(
+        len(inventory.inv[resource_type])
+        for resource_type in inventory.inv
+    )
+    load_time = time.perf_counter() - start
+    gc.collect()
+    traced, traced_peak = (None, None)
+    if trace:
+        traced, traced_peak = tracemalloc.get_traced_memory()
+    print(json.dumps({
+        'resources': resources,
+        'load_time': load_time,
+        'traced': traced,
+        'traced_peak': traced_peak,
+        'rss': current_rss(),
+        # ru_maxrss is in kilobytes on Linux.
+        'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--resources', type=int, default=100000)
+    parser.add_argument(
+        '--inventory-dir',
+        help='Directory of the synthetic inventory, it is reused if it '
+        'already has one',
+    )
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    parser.add_argument(
+        '--compact',
+        action='store_true',
+        help=argparse.SUPPRESS,
+    )
+    parser.add_argument('--trace', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        measure(args.measure, args.compact, args.trace)
+        return
+
+    inventory_dir = args.inventory_dir or tempfile.mkdtemp()
+    if not os.path.exists(os.path.join(inventory_dir, 'manifest.yaml')):
+        print('Writing a synthetic inventory of {} resources to {}'.format(
+            args.resources,
+            inventory_dir,
+        ))
+        write_inventory(inventory_dir, args.resources)
+
+    print('{:<10}{:>12}{:>14}{:>14}{:>14}{:>12}'.format(
+        'mode',
+        'resources',
+        'traced (MB)',
+        'RSS (MB)',
+        'max RSS (MB)',
+        'load (s)',
+    ))
+    results = {}
+    for mode in ['default', 'compact']:
+        # Each mode stores its own snapshots, build them before measuring.
+        shutil.rmtree(
+            os.path.join(inventory_dir, 'snapshots'),
+            ignore_errors=True,
+        )
+        Inventory(inventory_dir, compact=mode == 'compact').load()
+
+        command = [
+            sys.executable,
+            os.path.abspath(__file__),
+            '--measure',
+            inventory_dir,
+        ]
+        if mode == 'compact':
+            command.append('--compact')
+        result = {}
+        for trace in [False, True]:
+            output = subprocess.check_output(
+                command + ['--trace'] if trace else command
+            )
+            run = json.loads(output.decode().splitlines()[-1])
+            if trace:
+                result.update(
+                    traced=run['traced'],
+                    traced_peak=run['traced_peak'],
+                )
+            else:
+                result.update(run)
+        results[mode] = result
+        print('{:<10}{:>12}{:>14.1f}{:>14.1f}{:>14.1f}{:>12.2f}'.format(
+            mode,
+            result['resources'],
+            result['traced'] / 2 ** 20,
+            (result['rss'] or 0) / 2 ** 20,
+            result['max_rss'] / 2 ** 20,
+            result['load_time'],
+        ))
+
+    for key, name in [('traced', 'Traced memory'), ('rss', 'RSS')]:
+        if results['default'][key]:
+            print('{} reduction: {:.1%}'.format(
+                name,
+                1 - results['compact'][key] / results['default'][key],
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+Benchmark the search report on a synthetic inventory, scanning all the
+resources and using the search, ip and field indexes, with all its resource
+objects built beforehand so only the search is measured.
+
+Usage:
+    python benchmarks/search.py [--resources 100000] [--inventory-dir DIR]
+"""
+
+from clinv.inventory import Inventory
+from clinv.reports.search import SearchReport
+from clinv.search_index import FieldIndex, IPIndex, TrigramIndex
+from synthetic_inventory import write_inventory
+import argparse
+import contextlib
+import io
+import ipaddress
+import os
+import sys
+import tempfile
+import time
+
+
+def best_time(function, repeat):
+    """
+    Return the best wall time of repeat runs of function, and the lines it
+    printed.
+    """
+
+    times = []
+    for _ in range(repeat):
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            function()
+        times.append(time.perf_counter() - start)
+    return min(times), output.getvalue().splitlines()
+
+
+class ScanIndex():
+    """
+    Search index that selects all the resources, to measure the search
+    without index.
+    """
+
+    def candidates(self, search_string):
+        return None
+
+
+class ScanFieldIndex():
+    """
+    Field index without indexed fields, to measure the field queries without
+    index.
+    """
+
+    indexed_fields = []
+
+
+class ScanIPIndex(IPIndex):
+    """
+    Ip index that checks the ip addresses of all the resources, to measure
+    the search by network without index.
+    """
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+
+    def candidates(self, network):
+        network = ipaddress.ip_network(network, strict=False)
+        return {
+            resource_type: [
+                resource_id
+                for resource_id, resource in
+                self.inventory[resource_type].items()
+                if any(
+                    address in network
+                    for address in self._resource_addresses(resource)
+                )
+            ]
+            for resource_type in self.resource_types
+            if resource_type in self.inventory
+        }
+
+
+def compare(report, searches, repeat):
+    """
+    Print the time of some searches without and with the indexes, and exit
+    if the indexes change their results.
+    """
+
+    index = report.index
+    ip_index = report.ip_index
+    field_index = report.field_index
+    print('{:<60}{:>10}{:>12}{:>12}'.format(
+        'search',
+        'lines',
+        'scan (s)',
+        'index (s)',
+    ))
+    totals = [0, 0]
+    for search_string, cidr in searches:
+        report.index = ScanIndex()
+        report.ip_index = ScanIPIndex(report.inv)
+        report.field_index = ScanFieldIndex()
+        scan_time, scan_lines = best_time(
+            lambda: report.output(search_string, cidr),
+            repeat,
+        )
+        report.index = index
+        report.ip_index = ip_index
+        report.field_index = field_index
+        index_time, index_lines = best_time(
+            lambda: report.output(search_string, cidr),
+            repeat,
+        )
+        name = search_string if cidr is None else '--cidr {}'.format(cidr)
+        if index_lines != scan_lines:
+            print('The index changed the results of {}'.format(name))
+            sys.exit(1)
+        totals[0] += scan_time
+        totals[1] += index_time
+        print('{:<60}{:>10}{:>12.2f}{:>12.2f}'.format(
+            name,
+            len(scan_lines),
+            scan_time,
+            index_time,
+        ))
+    print('{:<60}{:>10}{:>12.2f}{:>12.2f}'.format('total', '', *totals))
+
+
+patterns = [
+    'i-00000000000001',
+    r'10\.12\.',
+    'production',
+    '.*synthetic',
+    'unexistent',
+    'type:ec2 region:eu-west-1 state:running instance_type:m5.*',
+    'region:eu-west-1 state:running',
+    'state:stopped',
+]
+
+networks = [
+    '10.12.0.0/16',
+    '52.1.2.0/24',
+    '52.0.0.0/8',
+    '2001:db8::/32',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--resources', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument(
+        '--inventory-dir',
+        help='Directory of the synthetic inventory, it is reused if it '
+        'already has one',
+    )
+    args = parser.parse_args()
+
+    inventory_dir = args.inventory_dir or tempfile.mkdtemp()
+    if not os.path.exists(os.path.join(inventory_dir, 'manifest.yaml')):
+        print('Writing a synthetic inventory of {} resources to {}'.format(
+            args.resources,
+            inventory_dir,
+        ))
+        write_inventory(inventory_dir, args.resources)
+
+    inventory = Inventory(inventory_dir)
+    inventory.load()
+    resources = sum(
+        len(inventory.inv[resource_type])
+        for resource_type in inventory.inv
+    )
+    report = SearchReport(inventory)
+    for index_class, index_path, load_index in [
+        (
+            TrigramIndex,
+            inventory.search_index_path,
+            inventory.load_search_index,
+        ),
+        (IPIndex, inventory.ip_index_path, inventory.load_ip_index),
+        (FieldIndex, inventory.field_index_path, inventory.load_field_index),
+    ]:
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        start = time.perf_counter()
+        index = load_index()
+        build_time = time.perf_counter() - start
+        if index_class is TrigramIndex:
+            report.index = index
+        elif index_class is IPIndex:
+            report.ip_index = index
+        else:
+            report.field_index = index
+        start = time.perf_counter()
+        index_class(index_path).load()
+        print(
+            '{} of {} resources built in {:.2f}s, loaded in {:.2f}s, '
+            '{:.1f} MB'.format(
+                index_class.__name__,
+                resources,
+                build_time,
+                time.perf_counter() - start,
+                os.path.getsize(index_path) / 2 ** 20,
+            )
+        )
+
+    compare(
+        report,
+        [(pattern, None) for pattern in patterns] +
+        [(None, network) for network in networks],
+        args.repeat,
+    )
+
+
+if __name__ == '__main__':
+    main()
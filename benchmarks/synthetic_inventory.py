@@ -0,0 +1,280 @@
+"""
+Build synthetic inventories to benchmark clinv.
+
+The resources have the same structure as the pruned data stored by the AWS
+sources, and the user data the defaults of generate_user_data, so the
+benchmarks exercise the same code paths as a real inventory.
+
+Functions:
+    synthetic_inventory: Return the source and user data of a synthetic
+        inventory.
+    write_inventory: Save a synthetic inventory to an inventory directory.
+"""
+
+from clinv.inventory import Inventory
+from dateutil.tz import tzutc
+import datetime
+import random
+
+regions = ['us-east-1', 'us-west-2', 'eu-west-1', 'eu-central-1']
+
+
+def _ec2_reservation(rng, index):
+    region = rng.choice(regions)
+    instance_id = 'i-{:017x}'.format(index)
+    reservation = {
+        'Groups': [],
+        'Instances': [
+            {
+                'ImageId': 'ami-{:08x}'.format(rng.getrandbits(32)),
+                'InstanceId': instance_id,
+                'InstanceType': rng.choice(['t3.micro', 'm5.large']),
+                'LaunchTime': datetime.datetime(
+                    2019, 1, 1, tzinfo=tzutc()
+                ) + datetime.timedelta(seconds=rng.randint(0, 10 ** 7)),
+                'NetworkInterfaces': [
+                    {
+                        'PrivateIpAddresses': [
+                            {
+                                'Association': {
+                                    'IpOwnerId': '585394460090',
+                                    'PublicDnsName': 'ec2-{}.aws.com'.format(
+                                        index,
+                                    ),
+                                    'PublicIp': '52.{}.{}.{}'.format(
+                                        rng.randint(0, 255),
+                                        rng.randint(0, 255),
+                                        rng.randint(1, 254),
+                                    ),
+                                },
+                                'Primary': True,
+                                'PrivateDnsName': 'ip-{}.internal'.format(
+                                    index,
+                                ),
+                                'PrivateIpAddress': '10.{}.{}.{}'.format(
+                                    rng.randint(0, 255),
+                                    rng.randint(0, 255),
+                                    rng.randint(1, 254),
+                                ),
+                            }
+                        ],
+                    }
+                ],
+                'SecurityGroups': [
+                    {
+                        'GroupId': 'sg-{:08x}'.format(rng.getrandbits(32)),
+                        'GroupName': 'sg-{}'.format(rng.randint(0, 50)),
+                    },
+                ],
+                'State': {'Code': 16, 'Name': 'running'},
+                'StateTransitionReason': '',
+                'Tags': [
+                    {'Key': 'Name', 'Value': 'instance-{}'.format(index)},
+                ],
+                'VpcId': 'vpc-31084921',
+            }
+        ],
+        'OwnerId': '585394460090',
+        'ReservationId': 'r-{:017x}'.format(index),
+    }
+    user_data = {
+        'description': 'Instance {} of the synthetic inventory'.format(index),
+        'to_destroy': 'tbd',
+        'environment': rng.choice(['production', 'staging', 'tbd']),
+        'region': region,
+    }
+    return region, reservation, instance_id, user_data
+
+
+def _rds_instance(rng, index):
+    region = rng.choice(regions)
+    resource_id = 'db-{:020X}'.format(index)
+    instance = {
+        'AllocatedStorage': 100,
+        'AutoMinorVersionUpgrade': True,
+        'AvailabilityZone': '{}a'.format(region),
+        'DBInstanceClass': 'db.t2.micro',
+        'DBInstanceIdentifier': 'database-{}'.format(index),
+        'DBInstanceStatus': 'available',
+        'DBSecurityGroups': [],
+        'DbiResourceId': resource_id,
+        'Endpoint': {
+            'Address': 'database-{}.{}.rds.amazonaws.com'.format(
+                index,
+                region,
+            ),
+            'HostedZoneId': '202FGHSL2JKCFW',
+            'Port': 5432,
+        },
+        'Engine': rng.choice(['postgres', 'mariadb']),
+        'EngineVersion': '11.4',
+        'InstanceCreateTime': datetime.datetime(2019, 6, 17, tzinfo=tzutc()),
+        'MultiAZ': False,
+        'PubliclyAccessible': False,
+        'StorageEncrypted': True,
+        'VpcSecurityGroups': [
+            {
+                'Status': 'active',
+                'VpcSecurityGroupId': 'sg-{:08x}'.format(rng.getrandbits(32)),
+            },
+        ],
+    }
+    user_data = {
+        'description': 'Database {} of the synthetic inventory'.format(index),
+        'to_destroy': 'tbd',
+        'environment': rng.choice(['production', 'staging', 'tbd']),
+        'region': region,
+    }
+    return region, instance, resource_id, user_data
+
+
+def _route53_record(rng, index):
+    record_type = rng.choice(['A', 'CNAME'])
+    record_name = 'host-{}.clinv.org.'.format(index)
+    if record_type == 'A':
+        value = '52.{}.{}.{}'.format(
+            rng.randint(0, 255),
+            rng.randint(0, 255),
+            rng.randint(1, 254),
+        )
+    else:
+        value = 'ec2-{}.aws.com'.format(rng.randint(0, index + 1))
+    record = {
+        'Name': record_name,
+        'ResourceRecords': [{'Value': value}],
+        'TTL': 300,
+        'Type': record_type,
+    }
+    user_data = {
+        'description': 'tbd',
+        'to_destroy': 'tbd',
+        'state': 'active',
+    }
+    return (
+        record,
+        '{}-{}'.format(record_name.rstrip('.'), record_type.lower()),
+        user_data,
+    )
+
+
+def _s3_bucket(rng, index):
+    bucket_name = 'bucket-{}'.format(index)
+    bucket = {
+        'CreationDate': datetime.datetime(2012, 12, 12, tzinfo=tzutc()),
+        'Name': bucket_name,
+        'Grants': [
+            {
+                'Grantee': {
+                    'DisplayName': 'admin',
+                    'ID': 'admin_id',
+                    'Type': 'CanonicalUser',
+                },
+                'Permission': 'FULL_CONTROL',
+            },
+        ],
+        'permissions': {
+            'READ': rng.choice(['private', 'public']),
+            'WRITE': 'private',
+        },
+    }
+    user_data = {
+        'description': 'tbd',
+        'to_destroy': 'tbd',
+        'environment': 'tbd',
+        'desired_permissions': {'read': 'tbd', 'write': 'tbd'},
+        'state': 'active',
+    }
+    return bucket_name, bucket, user_data
+
+
+def synthetic_inventory(resources=10000, seed=0):
+    """
+    Return the source and user data of a synthetic inventory.
+
+    The resources are split in 50% EC2 instances, 15% RDS instances, 25%
+    Route53 records and 10% S3 buckets.
+
+    Parameters:
+        resources (int): Number of resources of the inventory.
+        seed (int): Seed of the random generator, the same seed always
+            returns the same inventory.
+
+    Returns:
+        tuple: source_data and user_data dictionaries.
+    """
+
+    rng = random.Random(seed)
+    zone_id = '/hostedzone/Z2SYNTHETIC'
+    source_data = {
+        'ec2': {region: [] for region in regions},
+        'rds': {region: [] for region in regions},
+        'route53': {
+            'hosted_zones': [
+                {
+                    'Config': {
+                        'Comment': 'Synthetic zone',
+                        'PrivateZone': False,
+                    },
+                    'Id': zone_id,
+                    'Name': 'clinv.org.',
+                    'ResourceRecordSetCount': 0,
+                    'records': [],
+                },
+            ],
+        },
+        's3': {},
+    }
+    user_data = {'ec2': {}, 'rds': {}, 'route53': {}, 's3': {}}
+    records = source_data['route53']['hosted_zones'][0]['records']
+
+    for index in range(resources):
+        kind = index % 20
+        if kind < 10:
+            region, reservation, resource_id, resource_user_data = \
+                _ec2_reservation(rng, index)
+            source_data['ec2'][region].append(reservation)
+            user_data['ec2'][resource_id] = resource_user_data
+        elif kind < 13:
+            region, instance, resource_id, resource_user_data = \
+                _rds_instance(rng, index)
+            source_data['rds'][region].append(instance)
+            user_data['rds'][resource_id] = resource_user_data
+        elif kind < 18:
+            record, record_id, resource_user_data = \
+                _route53_record(rng, index)
+            records.append(record)
+            user_data['route53'][
+                '{}-{}'.format(zone_id.split('/')[-1], record_id)
+            ] = resource_user_data
+        else:
+            bucket_name, bucket, resource_user_data = _s3_bucket(rng, index)
+            source_data['s3'][bucket_name] = bucket
+            user_data['s3'][bucket_name] = resource_user_data
+
+    source_data['route53']['hosted_zones'][0]['ResourceRecordSetCount'] = \
+        len(records)
+
+    return source_data, user_data
+
+
+def write_inventory(inventory_dir, resources=10000, seed=0):
+    """
+    Save a synthetic inventory to the source_data.yaml and user_data.yaml
+    files of an inventory directory.
+
+    Parameters:
+        inventory_dir (str): Path to the inventory directory.
+        resources (int): Number of resources of the inventory.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        Inventory: Inventory with the synthetic data.
+    """
+
+    inventory = Inventory(inventory_dir)
+    inventory.source_data, inventory.user_data = synthetic_inventory(
+        resources,
+        seed,
+    )
+    inventory.save()
+    return inventory
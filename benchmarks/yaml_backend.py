@@ -0,0 +1,74 @@
+"""
+Benchmark the pure Python and the libyaml backends of the inventory load and
+save on a synthetic inventory, and check that both dump the same bytes.
+
+Usage:
+    python benchmarks/yaml_backend.py [--resources 50000] [--repeat 3]
+"""
+
+from synthetic_inventory import synthetic_inventory
+import argparse
+import sys
+import time
+import yaml
+
+backends = [('python', yaml.SafeLoader, yaml.SafeDumper)]
+if yaml.__with_libyaml__:
+    backends.append(('libyaml', yaml.CSafeLoader, yaml.CSafeDumper))
+
+
+def best_time(function, repeat):
+    """
+    Return the best wall time of repeat runs of function, and its result.
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--resources', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    source_data, _ = synthetic_inventory(args.resources)
+    print(
+        'Synthetic inventory of {} resources'.format(args.resources)
+    )
+    print('{:<10}{:>12}{:>12}'.format('backend', 'save (s)', 'load (s)'))
+
+    dumps = {}
+    loads = {}
+    for name, loader, dumper in backends:
+        save_time, dumps[name] = best_time(
+            lambda: yaml.dump(
+                source_data,
+                Dumper=dumper,
+                default_flow_style=False,
+            ),
+            args.repeat,
+        )
+        load_time, loads[name] = best_time(
+            lambda: yaml.load(dumps[name], Loader=loader),
+            args.repeat,
+        )
+        print('{:<10}{:>12.2f}{:>12.2f}'.format(name, save_time, load_time))
+
+    if len(set(dumps.values())) != 1:
+        print('The backends dumped different documents')
+        sys.exit(1)
+    if any(loaded != loads['python'] for loaded in loads.values()):
+        print('The backends loaded different data')
+        sys.exit(1)
+    print('Saved documents are byte identical ({} bytes)'.format(
+        len(dumps['python'].encode()),
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -32,11 +32,16 @@ def main():
     args = parser.parse_args()
     load_logger()
 
-    inventory = Inventory(args.data_path)
+    inventory = Inventory(
+        args.data_path,
+        backend=args.backend,
+        compact=args.compact,
+    )
     if args.subcommand not in [
         'export',
         'generate',
         'list',
+        'migrate',
         'print',
         'search',
         'unassigned',
@@ -44,19 +49,45 @@ def main():
         return
 
     if args.subcommand == 'generate':
-        inventory.generate()
+        inventory.generate(
+            jobs=args.jobs,
+            only=args.only,
+            stale_only=args.stale_only,
+            ttls=args.ttl,
+            resume=args.resume,
+            regions=args.regions,
+            region_cache_ttl=args.region_cache_ttl,
+            max_pool_connections=args.max_pool_connections,
+            max_attempts=args.max_attempts,
+            max_request_rate=args.max_request_rate,
+            throttle_retries=args.throttle_retries,
+            route53_request_rate=args.route53_request_rate,
+            max_zone_workers=args.max_zone_workers,
+        )
+    elif args.subcommand == 'migrate':
+        inventory.migrate()
     else:
-        inventory.load()
         if args.subcommand == 'search':
-            SearchReport(inventory).output(args.search_string)
+            if args.search_string is None and args.cidr is None:
+                parser.error('search needs a search_string or a --cidr')
+            report = SearchReport
+            report_args = [
+                args.search_string,
+                args.cidr,
+                args.limit,
+                args.count,
+            ]
         elif args.subcommand == 'unassigned':
-            UnassignedReport(inventory).output(args.resource_type)
+            report, report_args = UnassignedReport, [args.resource_type]
         elif args.subcommand == 'print':
-            PrintReport(inventory).output(args.search_string)
+            report, report_args = PrintReport, [args.search_string]
         elif args.subcommand == 'list':
-            ListReport(inventory).output(args.resource_type)
+            report, report_args = ListReport, [args.resource_type]
         elif args.subcommand == 'export':
-            ExportReport(inventory).output(args.export_path)
+            report, report_args = ExportReport, [args.export_path]
+
+        inventory.load(report.resource_types(*report_args))
+        report(inventory).output(*report_args)
 
 
 if __name__ == "__main__":
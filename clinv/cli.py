@@ -1,6 +1,105 @@
+from clinv.inventory import active_source_plugins
 import logging
 import argparse
 import argcomplete
+import ipaddress
+
+source_ids = sorted(source().id for source in active_source_plugins)
+
+
+def comma_separated_list(value):
+    ''' Argparse type to parse comma separated lists '''
+
+    elements = [element.strip() for element in value.split(',')]
+    return [element for element in elements if element]
+
+
+def source_id(value):
+    ''' Argparse type to parse the id of an active source '''
+
+    if value not in source_ids:
+        raise argparse.ArgumentTypeError(
+            "{} is not a source, choose from {}".format(
+                value,
+                ', '.join(source_ids),
+            )
+        )
+    return value
+
+
+def comma_separated_source_ids(value):
+    ''' Argparse type to parse comma separated lists of source ids '''
+
+    return [source_id(element) for element in comma_separated_list(value)]
+
+
+def comma_separated_ttls(value):
+    ''' Argparse type to parse comma separated source=seconds pairs '''
+
+    ttls = {}
+    for element in comma_separated_list(value):
+        try:
+            ttl_source_id, ttl = element.split('=')
+            ttl = int(ttl)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                "{} is not a source=seconds pair".format(element)
+            )
+        ttls[source_id(ttl_source_id.strip())] = ttl
+    return ttls
+
+
+def positive_int(value):
+    ''' Argparse type to parse integers greater than zero '''
+
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(
+            "{} is not a positive integer".format(value)
+        )
+    return number
+
+
+def non_negative_int(value):
+    ''' Argparse type to parse integers greater than or equal to zero '''
+
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise argparse.ArgumentTypeError(
+            "{} is not a non negative integer".format(value)
+        )
+    return number
+
+
+def positive_float(value):
+    ''' Argparse type to parse numbers greater than zero '''
+
+    try:
+        number = float(value)
+    except ValueError:
+        number = 0
+    if not number > 0:
+        raise argparse.ArgumentTypeError(
+            "{} is not a positive number".format(value)
+        )
+    return number
+
+
+def cidr_network(value):
+    ''' Argparse type to parse networks in CIDR notation '''
+
+    try:
+        return ipaddress.ip_network(value, strict=False)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "{} is not a network in CIDR notation".format(value)
+        )
 
 
 def load_parser():
@@ -18,16 +117,124 @@ def load_parser():
         default='~/.local/share/clinv',
         help='Path to the inventory',
     )
+    parser.add_argument(
+        "--backend",
+        choices=['yaml', 'sqlite'],
+        default='yaml',
+        help='Storage of the inventory in the data path',
+    )
+    parser.add_argument(
+        "--compact",
+        action='store_true',
+        help='Share the repeated strings of the loaded inventory to use '
+        'less memory',
+    )
     subparser = parser.add_subparsers(dest='subcommand', help='subcommands')
 
     search_parser = subparser.add_parser('search')
     search_parser.add_argument(
         "search_string",
         type=str,
+        nargs='?',
         help='String used to search',
     )
+    search_parser.add_argument(
+        "--cidr",
+        type=cidr_network,
+        help='Show only the resources with an ip address in the network, '
+        'like 10.12.0.0/16',
+    )
+    search_parser.add_argument(
+        "--limit",
+        type=positive_int,
+        help='Stop the search after this number of matches',
+    )
+    search_parser.add_argument(
+        "--count",
+        action='store_true',
+        help='Print the number of matches of each type instead of the '
+        'resources',
+    )
 
-    subparser.add_parser('generate')
+    generate_parser = subparser.add_parser('generate')
+    generate_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help='Number of sources to fetch at the same time',
+    )
+    generate_parser.add_argument(
+        "--only",
+        type=comma_separated_source_ids,
+        default=None,
+        help='Comma separated list of the sources to fetch',
+    )
+    generate_parser.add_argument(
+        "--stale-only",
+        action='store_true',
+        help='Fetch only the sources whose data is older than their TTL',
+    )
+    generate_parser.add_argument(
+        "--ttl",
+        type=comma_separated_ttls,
+        default=None,
+        help='Comma separated list of source=seconds data TTLs',
+    )
+    generate_parser.add_argument(
+        "--resume",
+        action='store_true',
+        help='Resume a failed generate from its checkpoints',
+    )
+    generate_parser.add_argument(
+        "--regions",
+        type=comma_separated_list,
+        default=None,
+        help='Comma separated list of the AWS regions to fetch',
+    )
+    generate_parser.add_argument(
+        "--region-cache-ttl",
+        type=int,
+        default=0,
+        help='Seconds to reuse the AWS regions cached in the inventory dir',
+    )
+    generate_parser.add_argument(
+        "--max-pool-connections",
+        type=positive_int,
+        default=20,
+        help='Maximum number of HTTPS connections kept open per AWS client',
+    )
+    generate_parser.add_argument(
+        "--max-attempts",
+        type=non_negative_int,
+        default=5,
+        help='Maximum number of retries of a failed AWS API call that '
+        'may succeed later, like on a connection error',
+    )
+    generate_parser.add_argument(
+        "--max-request-rate",
+        type=positive_float,
+        default=20,
+        help='Maximum number of AWS API calls per second of each service',
+    )
+    generate_parser.add_argument(
+        "--throttle-retries",
+        type=non_negative_int,
+        default=8,
+        help='Maximum number of retries of a throttled AWS API call',
+    )
+    generate_parser.add_argument(
+        "--route53-request-rate",
+        type=positive_float,
+        default=5,
+        help='Maximum number of Route53 API calls per second',
+    )
+    generate_parser.add_argument(
+        "--max-zone-workers",
+        type=positive_int,
+        default=4,
+        help='Number of Route53 hosted zones to fetch at the same time',
+    )
 
     unassigned_parser = subparser.add_parser('unassigned')
     unassigned_parser.add_argument(
@@ -69,6 +276,8 @@ def load_parser():
         ],
     )
 
+    subparser.add_parser('migrate')
+
     export_parser = subparser.add_parser('export')
     export_parser.add_argument(
         "export_path",
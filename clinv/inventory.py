@@ -25,9 +25,12 @@ Module to store the Clinv main classes
 
 Classes:
     Inventory: Class to gather and manipulate the inventory data.
+    LazyInventory: Mapping of source ids to resource objects that builds
+        the objects of each source on first access.
 """
 
 from clinv.sources.aws import \
+    AWSBasesrc, \
     EC2src, \
     RDSsrc, \
     Route53src, \
@@ -37,11 +40,26 @@ from clinv.sources.aws import \
 
 from clinv.sources.risk_management import \
     Informationsrc, Projectsrc, Servicesrc, Peoplesrc
+from clinv.search_index import FieldIndex, IPIndex, TrigramIndex
+from clinv.store import SQLiteInventory, SQLiteStore
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 from yaml import YAMLError
+import hashlib
 import logging
 import os
+import pickle
+import shutil
+import time
 import yaml
 
+# Use the libyaml bindings when PyYAML was built with them, they load and dump
+# the same documents as the pure Python implementation but many times faster.
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
+
 active_source_plugins = [
     EC2src,
     IAMGroupsrc,
@@ -56,46 +74,196 @@ active_source_plugins = [
 ]
 
 
+class LazyInventory(MutableMapping):
+    """
+    Mapping of source ids to the dictionaries of resource objects of each
+    source, with the same structure as the Inventory.inv dictionary.
+
+    The resource objects of a source are built with its generate_inventory
+    method the first time they are accessed, so reports that only use some
+    resource types don't pay for building the rest.
+
+    Parameters:
+        sources (list): Initialized source plugins.
+
+    Public attributes:
+        sources (dict): Source plugins whose objects can be built, with the
+            source id as key.
+    """
+
+    def __init__(self, sources=[]):
+        self.sources = {source.id: source for source in sources}
+        self._objects = {}
+
+    def __getitem__(self, source_id):
+        try:
+            return self._objects[source_id]
+        except KeyError:
+            pass
+        self._objects[source_id] = self.sources[source_id].generate_inventory()
+        return self._objects[source_id]
+
+    def __setitem__(self, source_id, resources):
+        self._objects[source_id] = resources
+
+    def __delitem__(self, source_id):
+        if source_id not in self.sources and source_id not in self._objects:
+            raise KeyError(source_id)
+        self.sources.pop(source_id, None)
+        self._objects.pop(source_id, None)
+
+    def __iter__(self):
+        for source_id in self.sources:
+            yield source_id
+        for source_id in self._objects:
+            if source_id not in self.sources:
+                yield source_id
+
+    def __len__(self):
+        return len(set(self.sources) | set(self._objects))
+
+    def __repr__(self):
+        return 'LazyInventory({})'.format(list(self))
+
+
 class Inventory():
     """
     Class to gather and manipulate the inventory data.
 
+    The data is stored in one yaml shard per source id in the source_data
+    and user_data directories of the inventory_dir, for example
+    source_data/ec2.yaml and user_data/ec2.yaml, and a manifest.yaml file
+    with the stored sources and their fetch times:
+    {
+        'version': 1,
+        'sources': {
+            'ec2': {
+                'fetch_time': 1570000000.0,
+            },
+        },
+    }
+
+    Inventories saved with the previous layout, a source_data.yaml and a
+    user_data.yaml file with the data of all the sources, are still loaded
+    and can be converted with the migrate method.
+
+    With the sqlite backend the source data and the resources are stored
+    instead in the inventory.sqlite database, see SQLiteStore, and the loaded
+    inventory reads the resources from it on demand. The user data is still
+    stored in the user_data shards, where it's edited, and it's imported into
+    the database on each generate or migrate. Until then, load builds the
+    resources of the sources whose shards changed from their data.
+
     Parameters:
-        inventory_dir (str): Path to the directory where the source_data.yml
-            and user_data.yml are located.
+        inventory_dir (str): Path to the directory where the inventory data
+            is located.
         source_plugins (list): List of source plugins objects, for example:
             [EC2src, RDSsrc, Route53src]
+        backend (str): Storage of the inventory, one of ['yaml', 'sqlite'].
+            By default, is set to 'yaml'.
+        compact (bool): Share the repeated strings of the loaded data, like
+            regions, states or dictionary keys, to reduce the memory used by
+            big inventories at the cost of a slower load. By default, is set
+            to False.
 
     Public methods:
         generate: Build the inventory from source and user data.
         load: Load the inventory from the yaml files.
-        save: Saves source and user data into the yaml files.
+        load_search_index: Return the search index of the loaded inventory.
+        load_ip_index: Return the ip index of the loaded inventory.
+        load_field_index: Return the field index of the loaded inventory.
+        migrate: Convert the two files layout to the sharded one, or the
+            yaml files to the database.
+        save: Saves source and user data into the yaml files or the
+            database.
 
     Internal methods:
         _load_plugins: Initializes the source plugins.
-        _load_source_data_from_file: Load the source data from the
-            source_data.yaml file.
-        _load_user_data_from_file: Load the user data from the
-            user_data.yaml file.
+        _load_stored_data: Load the source and user data of the selected
+            sources from the configured backend.
+        _load_yaml_data: Load the source and user data of the selected
+            sources from the shards or the two files layout.
+        _load_user_data_shards: Load the user data of the selected sources
+            from their shards.
+        _user_data_signatures: Return the size and mtime of the user data
+            shards of some sources.
+        _load_legacy_data: Load the source and user data from the two files
+            layout.
+        _load_manifest: Load the manifest of the sharded layout.
+        _scan_shards: Build the manifest of the stored shards.
+        _shard_path: Return the path of the shard of a source.
         _load_yaml: Load a variable from a yaml file.
+        _load_cached_yaml: Load a variable from a yaml file or its binary
+            snapshot.
+        _compact: Return a variable with its repeated strings shared.
         _generate_inventory_objects: Build the inventory dictionary from the
             sources and user data.
         _generate_source_data: Build the source data dictionary from the
             sources.
         _generate_user_data: Build the user data dictionary from the
             sources.
-        _save_yaml: Save a variable to a yaml file.
+        _select_sources: Return the ids of the sources to fetch.
+        _is_stale: Check if the stored data of a source has expired.
+        _load_checkpoint: Load the source data of a source from its
+            checkpoint.
+        _save_checkpoint: Save the source data of a source to its
+            checkpoint.
+        _clear_checkpoints: Remove the checkpoints of the last generate.
+        _save_yaml: Save a variable to a yaml file if its content changes.
+        _fsync_directory: Flush the entries of a directory to disk.
+        _remove_legacy_files: Remove the files of the two files layout.
+        _file_signature: Return the size, mtime and hash of a file.
+        _snapshot_path: Return the path of the binary snapshot of a yaml
+            file.
+        _load_snapshot: Load the content of a yaml file from its binary
+            snapshot.
+        _save_snapshot: Save the content of a yaml file to its binary
+            snapshot.
+        _load_index: Load an index of the loaded inventory, or build it if
+            it's out of date.
+        _build_index: Build and save an index of the loaded inventory.
+        _build_search_indexes: Build and save the search, ip and field
+            indexes of the loaded inventory.
+        _ip_source_ids: Return the ids of the loaded sources with ip
+            addresses.
+        _search_index_signature: Return the signature of the stored data of
+            some sources.
 
     Public attributes:
         source_data (dict): Aggregated source data of the different sources.
         user_data (dict): Aggregated user data of the different sources.
         sources (dict): Aggregated user data of the different sources.
+        fetch_times (dict): Epoch time of the last fetch of each source, with
+            the source id as key.
+        backend (str): Storage of the inventory.
+        compact (bool): If the repeated strings of the loaded data are
+            shared.
+        store (SQLiteStore): Database of the inventory, or None with the yaml
+            backend.
+
+    Class attributes:
+        manifest_version (int): Version of the sharded layout.
+        snapshot_version (int): Version of the binary snapshot format, bump
+            it when the structure of the snapshot changes.
     """
 
-    def __init__(self, inventory_dir, source_plugins=active_source_plugins):
+    manifest_version = 1
+    snapshot_version = 1
+
+    def __init__(
+        self,
+        inventory_dir,
+        source_plugins=active_source_plugins,
+        backend='yaml',
+        compact=False,
+    ):
         self.log = logging.getLogger('main')
         self.inventory_dir = inventory_dir
         self._source_plugins = source_plugins
+        if backend not in ['yaml', 'sqlite']:
+            raise ValueError('Unknown inventory backend {}'.format(backend))
+        self.backend = backend
+        self.compact = compact
         self.source_data_path = os.path.join(
             self.inventory_dir,
             'source_data.yaml',
@@ -104,37 +272,435 @@ class Inventory():
             self.inventory_dir,
             'user_data.yaml',
         )
+        self.region_cache_path = os.path.join(
+            self.inventory_dir,
+            'aws_regions.yaml',
+        )
+        self.fetch_times_path = os.path.join(
+            self.inventory_dir,
+            'fetch_times.yaml',
+        )
+        self.manifest_path = os.path.join(
+            self.inventory_dir,
+            'manifest.yaml',
+        )
+        self.checkpoint_dir = os.path.join(
+            self.inventory_dir,
+            'checkpoints',
+        )
+        self.snapshot_dir = os.path.join(
+            self.inventory_dir,
+            'snapshots',
+        )
+        self.database_path = os.path.join(
+            self.inventory_dir,
+            'inventory.sqlite',
+        )
+        self.search_index_path = os.path.join(
+            self.inventory_dir,
+            'search_index.pickle',
+        )
+        self.ip_index_path = os.path.join(
+            self.inventory_dir,
+            'ip_index.pickle',
+        )
+        self.field_index_path = os.path.join(
+            self.inventory_dir,
+            'field_index.pickle',
+        )
+        self.store = None
+        if self.backend == 'sqlite':
+            self.store = SQLiteStore(
+                self.database_path,
+                {
+                    source().id: source().resource_obj
+                    for source in source_plugins
+                },
+            )
         self.user_data = {}
         self.source_data = {}
-        self.inv = {}
+        self.fetch_times = {}
+        self.inv = LazyInventory()
 
-    def load(self):
+    def load(self, source_ids=None):
         """
         Loads the inventory from the saved data.
 
-        Loads the source data from the source_data.yaml file into
+        Loads the source data from the source_data shards into
         self.source_data.
 
-        Loads the user data from the user_data.yaml file into
+        Loads the user data from the user_data shards into
         self.user_data.
 
         Loads the source plugins into self.sources
 
         Loads the resource objects into self.inv
 
+        With the sqlite backend only self.inv is loaded, and it reads the
+        resources of each source from the database when they are first
+        accessed. The sources whose stored resources were built with another
+        resource class or user data shard are built in memory from their
+        data instead, the database is not written until the next generate or
+        migrate.
+
         Parameters:
-            None.
+            source_ids (list): Ids of the sources to load, only their shards
+                are read. By default, is set to None to load all of them.
+
+        Exceptions:
+            FileNotFoundError: If there is no stored inventory.
 
         Returns:
             Nothing.
         """
 
-        self.source_data = self._load_yaml(self.source_data_path)
-        self.user_data = self._load_yaml(self.user_data_path)
-        self._load_plugins()
+        if self.store is not None:
+            if not self.store.exists():
+                raise FileNotFoundError(self.database_path)
+            selected_ids = [
+                source().id
+                for source in self._source_plugins
+                if source_ids is None or source().id in source_ids
+            ]
+            stale_ids = [
+                source_id
+                for source_id in self.store.stale_sources(
+                    self._user_data_signatures(selected_ids)
+                )
+                if source_id in selected_ids
+            ]
+            self.store.memory_resources = {}
+            if stale_ids != []:
+                self.log.info(
+                    'Building the resources of {} from their changed data, '
+                    'run clinv migrate to store them'.format(
+                        ', '.join(stale_ids),
+                    )
+                )
+                self._load_stored_data(stale_ids)
+                self._load_plugins(stale_ids)
+                self._generate_inventory_objects()
+                self.store.memory_resources = self.inv
+            self.inv = SQLiteInventory(self.store, selected_ids)
+            return
+
+        self._load_stored_data(source_ids)
+        self._load_plugins(source_ids)
         self._generate_inventory_objects()
 
-    def _load_plugins(self):
+    def migrate(self):
+        """
+        Convert an inventory saved with the two files layout to the sharded
+        layout, and remove the source_data.yaml, user_data.yaml and
+        fetch_times.yaml files.
+
+        With the sqlite backend, import the yaml inventory into the database
+        instead, the yaml files are kept. If the database already exists, the
+        user data shards are imported again, so the changes of the user data
+        are seen without fetching the sources.
+
+        Parameters:
+            None.
+
+        Returns:
+            Nothing.
+        """
+
+        if self.store is not None:
+            if self.store.exists():
+                self._load_stored_data()
+            else:
+                self._load_yaml_data()
+            self._load_plugins()
+            self._generate_inventory_objects()
+            self.save()
+            self.log.info(
+                'Imported {} sources to the inventory database'.format(
+                    len(self.source_data),
+                )
+            )
+            return
+
+        if self._load_manifest() is not None:
+            self.log.info('The inventory is already sharded')
+            return
+
+        self._load_yaml_data()
+        self.save()
+        self.log.info(
+            'Migrated {} sources to the sharded layout'.format(
+                len(self.source_data),
+            )
+        )
+
+    def _load_stored_data(self, source_ids=None):
+        """
+        Load the source data, user data and fetch times of the selected
+        sources into self.source_data, self.user_data and self.fetch_times
+        from the database or the yaml files.
+
+        With the sqlite backend the user data is read from the user_data
+        shards, and only the sources without shard use the copy stored in
+        the database.
+
+        Parameters:
+            source_ids (list): Ids of the sources to load. By default, is set
+                to None to load all the stored sources.
+
+        Exceptions:
+            FileNotFoundError: If there is no stored inventory.
+
+        Returns:
+            Nothing.
+        """
+
+        if self.store is not None:
+            if self.store.exists():
+                self.source_data, self.user_data, self.fetch_times = \
+                    self.store.load_sources(source_ids)
+            else:
+                self.source_data, self.user_data, self.fetch_times = \
+                    {}, {}, {}
+            self._load_user_data_shards(source_ids)
+            if not self.store.exists() and self.user_data == {}:
+                raise FileNotFoundError(self.database_path)
+            if self.compact:
+                strings = {}
+                self.source_data = self._compact(self.source_data, strings)
+                self.user_data = self._compact(self.user_data, strings)
+        else:
+            self._load_yaml_data(source_ids)
+
+    def _load_yaml_data(self, source_ids=None):
+        """
+        Load the source data, user data and fetch times of the selected
+        sources from the yaml files.
+
+        If the inventory has a manifest only the shards of the selected
+        sources are read, otherwise all the data is loaded from the two files
+        layout. If the manifest is missing or invalid but there are no files
+        of the two files layout, the stored shards are read instead.
+
+        Parameters:
+            source_ids (list): Ids of the sources to load. By default, is set
+                to None to load all the stored sources.
+
+        Exceptions:
+            FileNotFoundError: If there is no stored inventory.
+
+        Returns:
+            Nothing.
+        """
+
+        manifest = self._load_manifest()
+        if manifest is None and \
+                not os.path.exists(os.path.expanduser(self.source_data_path)):
+            manifest = self._scan_shards()
+        if manifest is None:
+            self._load_legacy_data()
+            return
+
+        if source_ids is None:
+            source_ids = list(manifest['sources'].keys())
+
+        self.source_data = {}
+        self.user_data = {}
+        self.fetch_times = {}
+        for source_id in source_ids:
+            try:
+                source = manifest['sources'][source_id]
+            except KeyError:
+                continue
+            self.source_data[source_id] = self._load_cached_yaml(
+                self._shard_path('source_data', source_id)
+            )
+            try:
+                self.user_data[source_id] = self._load_cached_yaml(
+                    self._shard_path('user_data', source_id)
+                )
+            except FileNotFoundError:
+                pass
+            if source.get('fetch_time') is not None:
+                self.fetch_times[source_id] = source['fetch_time']
+
+    def _load_user_data_shards(self, source_ids=None):
+        """
+        Load the user data of the selected sources from their user_data
+        shards into self.user_data. The sources without shard keep their
+        current user data.
+
+        Parameters:
+            source_ids (list): Ids of the sources to load. By default, is set
+                to None to load all the sources with data or plugin.
+
+        Returns:
+            Nothing.
+        """
+
+        if source_ids is None:
+            source_ids = sorted(
+                set(self.source_data) |
+                set(self.user_data) |
+                {source().id for source in self._source_plugins}
+            )
+
+        for source_id in source_ids:
+            shard_path = self._shard_path('user_data', source_id)
+            if os.path.exists(os.path.expanduser(shard_path)):
+                self.user_data[source_id] = self._load_cached_yaml(shard_path)
+
+    def _user_data_signatures(self, source_ids):
+        """
+        Return the signature of the user_data shards of some sources, used
+        to check if they changed since they were imported into the database,
+        with the following structure:
+        {
+            'ec2': [1024, 1570000000000000000],
+            'rds': None,
+        }
+
+        Each shard has its size and modification time, or None if it doesn't
+        exist.
+
+        Parameters:
+            source_ids (list): Ids of the sources.
+
+        Returns:
+            dict: Signature of the shard of each source.
+        """
+
+        signatures = {}
+        for source_id in source_ids:
+            try:
+                stat = os.stat(
+                    os.path.expanduser(
+                        self._shard_path('user_data', source_id)
+                    )
+                )
+            except FileNotFoundError:
+                signatures[source_id] = None
+                continue
+            signatures[source_id] = [stat.st_size, stat.st_mtime_ns]
+        return signatures
+
+    def _load_legacy_data(self):
+        """
+        Load the source data, user data and fetch times from the
+        source_data.yaml, user_data.yaml and fetch_times.yaml files of the
+        two files layout.
+
+        Exceptions:
+            FileNotFoundError: If there is no source_data.yaml or
+                user_data.yaml file.
+
+        Returns:
+            Nothing.
+        """
+
+        self.source_data = self._load_cached_yaml(self.source_data_path)
+        self.user_data = self._load_cached_yaml(self.user_data_path)
+        try:
+            with open(os.path.expanduser(self.fetch_times_path), 'r') as f:
+                self.fetch_times = yaml.load(f, Loader=SafeLoader) or {}
+        except FileNotFoundError:
+            self.fetch_times = {}
+
+    def _load_manifest(self):
+        """
+        Load the manifest of the sharded layout.
+
+        An empty or unparseable manifest, for example one truncated by a
+        crash, is treated as a missing one, so the inventory can still be
+        loaded from the shards.
+
+        Exceptions:
+            ValueError: If the manifest has an unsupported version.
+
+        Returns:
+            dict: Manifest, or None if the inventory has no valid manifest.
+        """
+
+        try:
+            with open(os.path.expanduser(self.manifest_path), 'r') as f:
+                manifest = yaml.load(f, Loader=SafeLoader)
+        except FileNotFoundError:
+            return None
+        except YAMLError as e:
+            self.log.warning(
+                'Ignoring the invalid inventory manifest: {}'.format(e)
+            )
+            return None
+
+        if not isinstance(manifest, dict):
+            self.log.warning('Ignoring the empty inventory manifest')
+            return None
+
+        if manifest.get('version') != self.manifest_version:
+            raise ValueError(
+                'Unsupported inventory manifest version {}'.format(
+                    manifest.get('version')
+                )
+            )
+        if not isinstance(manifest.get('sources'), dict):
+            manifest['sources'] = {}
+        return manifest
+
+    def _scan_shards(self):
+        """
+        Build the manifest of the shards stored in the source_data directory,
+        used when the manifest is missing or invalid. Their fetch times are
+        unknown, so those sources are stale for generate --stale-only.
+
+        Returns:
+            dict: Manifest of the stored shards, or None if there are none.
+        """
+
+        try:
+            shard_names = sorted(
+                os.listdir(
+                    os.path.expanduser(
+                        os.path.join(self.inventory_dir, 'source_data')
+                    )
+                )
+            )
+        except FileNotFoundError:
+            return None
+
+        source_ids = [
+            os.path.splitext(shard_name)[0]
+            for shard_name in shard_names
+            if shard_name.endswith('.yaml')
+        ]
+        if source_ids == []:
+            return None
+        return {
+            'version': self.manifest_version,
+            'sources': {
+                source_id: {'fetch_time': None}
+                for source_id in source_ids
+            },
+        }
+
+    def _shard_path(self, data_type, source_id):
+        """
+        Return the path of the shard of a source.
+
+        Parameters:
+            data_type (str): Type of the data, one of ['source_data',
+                'user_data'].
+            source_id (str): Id of the source.
+
+        Returns:
+            str: Path of the shard.
+        """
+
+        return os.path.join(
+            self.inventory_dir,
+            data_type,
+            '{}.yaml'.format(source_id),
+        )
+
+    def _load_plugins(self, source_ids=None):
         """
         Initializes the source plugins and saves them in the self._sources
         list with the following structure:
@@ -144,7 +710,8 @@ class Inventory():
         ]
 
         Parameters:
-            None.
+            source_ids (list): Ids of the sources to initialize. By default,
+                is set to None to initialize all of them.
 
         Returns:
             Nothing.
@@ -153,6 +720,8 @@ class Inventory():
         self.sources = []
 
         for source in self._source_plugins:
+            if source_ids is not None and source().id not in source_ids:
+                continue
             try:
                 user_data = self.user_data[source().id]
             except KeyError:
@@ -182,7 +751,7 @@ class Inventory():
         try:
             with open(os.path.expanduser(yaml_path), 'r') as f:
                 try:
-                    return yaml.safe_load(f)
+                    return yaml.load(f, Loader=SafeLoader)
                 except YAMLError as e:
                     self.log.error(e)
                     raise
@@ -190,30 +759,200 @@ class Inventory():
             self.log.error('Error opening yaml file {}'.format(yaml_path))
             raise(e)
 
-    def generate(self):
+    def _load_cached_yaml(self, yaml_path):
         """
+        Load the content of a variable from a yaml file.
 
-        And saves the inventory to disk.
+        If the binary snapshot of the file is still valid, the variable is
+        loaded from it instead, which is much faster than parsing the yaml.
+        Otherwise the snapshot is rebuilt after parsing the yaml file.
+
+        With self.compact the variable is compacted before it's saved to the
+        snapshot. Pickle keeps the shared strings, so the next loads of the
+        snapshot get the compacted variable without compacting it again.
 
         Parameters:
-            None.
+            yaml_path (str): Path to the file to read.
+
+        Returns:
+            (str|dict|list|set|bool): Variable with the content of the file.
+        """
+
+        snapshot = self._load_snapshot(yaml_path)
+        if snapshot is not None:
+            if not self.compact or snapshot.get('compact', False):
+                return snapshot['data']
+            variable = snapshot.pop('data')
+        else:
+            variable = self._load_yaml(yaml_path)
+
+        if self.compact:
+            variable = self._compact(variable, {})
+        self._save_snapshot(yaml_path, variable, self.compact)
+        return variable
+
+    def _compact(self, variable, strings):
+        """
+        Return a copy of a variable loaded from the stored data where all the
+        equal strings, both keys and values, are the same object.
+
+        The parsers create a new string object for each occurrence, so values
+        like the region, the instance type or the keys of each resource are
+        otherwise stored once per resource.
+
+        Parameters:
+            variable (str|dict|list|set|bool): Variable to compact.
+            strings (dict): Strings already seen, with the string as key and
+                value. It's shared by the calls of one load.
+
+        Returns:
+            (str|dict|list|set|bool): Variable with the shared strings.
+        """
+
+        if isinstance(variable, str):
+            return strings.setdefault(variable, variable)
+        if isinstance(variable, dict):
+            return {
+                strings.setdefault(key, key)
+                if isinstance(key, str) else key:
+                self._compact(value, strings)
+                for key, value in variable.items()
+            }
+        if isinstance(variable, list):
+            return [self._compact(element, strings) for element in variable]
+        return variable
+
+    def generate(
+        self,
+        jobs=1,
+        only=None,
+        stale_only=False,
+        ttls=None,
+        resume=False,
+        **aws_settings
+    ):
+        """
+        Build the inventory from the sources and the user data, and saves the
+        inventory to disk.
+
+        The sources that are not fetched keep their stored source data.
+
+        The data of each source, and of each region of the AWS sources, is
+        checkpointed in the checkpoints directory as soon as it's fetched,
+        and the checkpoints are removed once the inventory is saved. If the
+        generate fails, it can be run again with resume to load the
+        checkpointed data instead of fetching it again.
+
+        Parameters:
+            jobs (int): Number of source plugins to fetch at the same time.
+                By default, is set to 1 to fetch them one after the other.
+            only (list): Ids of the sources to fetch. By default, is set to
+                None to fetch all of them.
+            stale_only (bool): Fetch only the sources whose stored data is
+                older than their TTL.
+            ttls (dict): Seconds the stored data of each source is fresh, with
+                the source id as key. The sources without TTL are always
+                stale.
+            resume (bool): Load the sources and regions checkpointed by a
+                previous failed generate instead of fetching them again.
+            **aws_settings: AWS settings shared by the AWS sources, for
+                example the regions allowlist, the region_cache_ttl or the
+                max_pool_connections. See AWSBasesrc.default_settings for
+                the supported ones.
 
         Returns:
             Nothing.
         """
 
         try:
-            self.source_data = self._load_yaml(self.source_data_path)
-            self.user_data = self._load_yaml(self.user_data_path)
+            self._load_stored_data()
         except FileNotFoundError:
             pass
+        if not resume:
+            self._clear_checkpoints()
+        AWSBasesrc.configure(
+            region_cache_path=self.region_cache_path,
+            checkpoint_dir=self.checkpoint_dir,
+            resume=resume,
+            **aws_settings
+        )
         self._load_plugins()
-        self._generate_source_data()
+        self._generate_source_data(
+            jobs,
+            self._select_sources(only, stale_only, ttls),
+            resume,
+        )
+        AWSBasesrc.log_throttling_stats()
         self._generate_user_data()
         self._generate_inventory_objects()
         self.save()
+        self._build_search_indexes()
+        self._clear_checkpoints()
 
-    def _generate_source_data(self):
+    def _select_sources(self, only=None, stale_only=False, ttls=None):
+        """
+        Return the ids of the sources to fetch.
+
+        Parameters:
+            only (list): Ids of the sources to fetch. By default, is set to
+                None to select all of them.
+            stale_only (bool): Select only the sources whose stored data is
+                older than their TTL.
+            ttls (dict): Seconds the stored data of each source is fresh, with
+                the source id as key.
+
+        Exceptions:
+            ValueError: If only contains an unknown source id.
+
+        Returns:
+            list: Ids of the sources to fetch, in the order of self.sources.
+        """
+
+        source_ids = [source.id for source in self.sources]
+
+        if only is not None:
+            for source_id in only:
+                if source_id not in source_ids:
+                    raise ValueError('Unknown source {}'.format(source_id))
+            source_ids = [
+                source_id
+                for source_id in source_ids
+                if source_id in only
+            ]
+
+        if stale_only:
+            source_ids = [
+                source_id
+                for source_id in source_ids
+                if self._is_stale(source_id, ttls or {})
+            ]
+
+        for source_id in source_ids:
+            self.log.info('Fetching {} source'.format(source_id))
+
+        return source_ids
+
+    def _is_stale(self, source_id, ttls):
+        """
+        Check if the stored data of a source is older than its TTL.
+
+        Parameters:
+            source_id (str): Id of the source.
+            ttls (dict): Seconds the stored data of each source is fresh, with
+                the source id as key.
+
+        Returns:
+            bool: If the source needs to be fetched again.
+        """
+
+        try:
+            fetch_time = self.fetch_times[source_id]
+        except KeyError:
+            return True
+
+        return time.time() - fetch_time >= ttls.get(source_id, 0)
+
+    def _generate_source_data(self, jobs=1, source_ids=None, resume=False):
         """
         Build the source data dictionary from the sources. Generates the
         self.source_data dictionary with the following structure:
@@ -230,18 +969,138 @@ class Inventory():
             ]
         }
 
+        The sources are fetched on a pool of `jobs` workers, but the results
+        are stored in the order of self.sources, so the result doesn't depend
+        on which source finishes first. The start time of the fetch is stored
+        in self.fetch_times for each fetched source.
+
+        Each source data is checkpointed as soon as the source is fetched. If
+        resume is True, the sources with a checkpoint are loaded from it
+        instead of fetched.
+
         Needs the self.sources data, so you'll need to call first
         self._load_plugins().
 
         Parameters:
-            None.
+            jobs (int): Number of source plugins to fetch at the same time.
+            source_ids (list): Ids of the sources to fetch. By default, is set
+                to None to fetch all of them.
+            resume (bool): Load the checkpointed sources instead of fetching
+                them.
 
         Returns:
             Nothing.
         """
 
-        for source in self.sources:
-            self.source_data[source.id] = source.generate_source_data()
+        sources = [
+            source
+            for source in self.sources
+            if source_ids is None or source.id in source_ids
+        ]
+        fetch_time = time.time()
+
+        def fetch_source(source):
+            if resume:
+                checkpoint = self._load_checkpoint(source.id)
+                if checkpoint is not None:
+                    self.log.info(
+                        'Resuming {} source from checkpoint'.format(source.id)
+                    )
+                    source.source_data = checkpoint['source_data']
+                    return checkpoint
+            checkpoint = {
+                'fetch_time': fetch_time,
+                'source_data': source.generate_source_data(),
+            }
+            self._save_checkpoint(source.id, checkpoint)
+            return checkpoint
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            checkpoints = list(executor.map(fetch_source, sources))
+
+        for source, checkpoint in zip(sources, checkpoints):
+            self.source_data[source.id] = checkpoint['source_data']
+            self.fetch_times[source.id] = checkpoint['fetch_time']
+
+    def _load_checkpoint(self, source_id):
+        """
+        Load the checkpoint of a source with the following structure:
+        {
+            'fetch_time': 1570000000.0,
+            'source_data': source_data,
+        }
+
+        Parameters:
+            source_id (str): Id of the source.
+
+        Returns:
+            dict: Checkpoint of the source, or None if there is no valid
+            checkpoint.
+        """
+
+        checkpoint_path = os.path.expanduser(
+            os.path.join(self.checkpoint_dir, '{}.pickle'.format(source_id))
+        )
+
+        try:
+            with open(checkpoint_path, 'rb') as f:
+                checkpoint = pickle.load(f)
+            checkpoint['fetch_time']
+            checkpoint['source_data']
+        except (
+            AttributeError,
+            EOFError,
+            ImportError,
+            KeyError,
+            OSError,
+            TypeError,
+            pickle.UnpicklingError,
+        ):
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, source_id, checkpoint):
+        """
+        Save the checkpoint of a source.
+
+        The checkpoint is only read back by clinv, so it's pickled instead of
+        dumped to yaml, and it's written to a temporary file, flushed to disk
+        and renamed, so an interrupted generate never leaves a truncated
+        checkpoint.
+
+        Parameters:
+            source_id (str): Id of the source.
+            checkpoint (dict): Fetch time and source data of the source.
+
+        Returns:
+            Nothing.
+        """
+
+        checkpoint_dir = os.path.expanduser(self.checkpoint_dir)
+        checkpoint_path = os.path.join(
+            checkpoint_dir,
+            '{}.pickle'.format(source_id),
+        )
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        with open(checkpoint_path + '.tmp', 'wb') as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(checkpoint_path + '.tmp', checkpoint_path)
+        self._fsync_directory(checkpoint_dir)
+
+    def _clear_checkpoints(self):
+        """
+        Remove the checkpoints directory.
+
+        Returns:
+            Nothing.
+        """
+
+        shutil.rmtree(
+            os.path.expanduser(self.checkpoint_dir),
+            ignore_errors=True,
+        )
 
     def _generate_user_data(self):
         """
@@ -278,8 +1137,8 @@ class Inventory():
 
     def _generate_inventory_objects(self):
         """
-        Build the inventory dictionary from the sources. Generates the
-        self.inv dictionary with the following structure:
+        Build the inventory mapping from the sources. Generates the
+        self.inv LazyInventory with the following structure:
         {
             'source_1_id': {
                 source_1_resource_1_id: source_1_resource_1_object,
@@ -293,6 +1152,9 @@ class Inventory():
             ]
         }
 
+        The resource objects of each source are built when they are first
+        accessed.
+
         As it needs the information of the sources and user, it needs to be
         called after _generate_source_data and _generate_user_data.
 
@@ -306,12 +1168,25 @@ class Inventory():
             Nothing.
         """
 
-        for source in self.sources:
-            self.inv[source.id] = source.generate_inventory()
+        self.inv = LazyInventory(self.sources)
 
     def save(self):
         """
-        Saves source and user data into the yaml files.
+        Saves the source and user data of each source into its shards, and
+        the stored sources and their fetch times into the manifest.
+
+        The manifest is written last, so it only lists sources whose shards
+        are already saved. If the inventory was stored with the two files
+        layout, its files are removed once the shards are saved.
+
+        Only the shards whose content changed are written, so a generate
+        that fetches a few sources doesn't rewrite the rest, and their
+        snapshots stay valid.
+
+        With the sqlite backend the source data and the resources of
+        self.inv are saved in the database instead, and only the user data
+        is saved to its shards. The database records the signature of the
+        saved shards, so load can detect when they are edited.
 
         Parameters:
             None.
@@ -319,20 +1194,458 @@ class Inventory():
         Returns:
             Nothing.
         """
-        self._save_yaml(self.source_data_path, self.source_data)
-        self._save_yaml(self.user_data_path, self.user_data)
+
+        if self.store is not None:
+            os.makedirs(
+                os.path.expanduser(
+                    os.path.join(self.inventory_dir, 'user_data')
+                ),
+                exist_ok=True,
+            )
+            for source_id in sorted(self.user_data):
+                self._save_yaml(
+                    self._shard_path('user_data', source_id),
+                    self.user_data[source_id],
+                )
+            self.store.save(
+                self.source_data,
+                self.user_data,
+                self.fetch_times,
+                self.inv,
+                self._user_data_signatures(self.user_data),
+            )
+            return
+
+        for data_type in ['source_data', 'user_data']:
+            os.makedirs(
+                os.path.expanduser(
+                    os.path.join(self.inventory_dir, data_type)
+                ),
+                exist_ok=True,
+            )
+
+        source_ids = sorted(set(self.source_data) | set(self.user_data))
+        written_shards = 0
+        for source_id in source_ids:
+            written_shards += self._save_yaml(
+                self._shard_path('source_data', source_id),
+                self.source_data.get(source_id, {}),
+            )
+            written_shards += self._save_yaml(
+                self._shard_path('user_data', source_id),
+                self.user_data.get(source_id, {}),
+            )
+        self.log.debug(
+            'Saved {} of {} inventory shards'.format(
+                written_shards,
+                2 * len(source_ids),
+            )
+        )
+
+        self._save_yaml(
+            self.manifest_path,
+            {
+                'version': self.manifest_version,
+                'sources': {
+                    source_id: {
+                        'fetch_time': self.fetch_times.get(source_id),
+                    }
+                    for source_id in source_ids
+                },
+            },
+        )
+        self._remove_legacy_files()
+
+    def _remove_legacy_files(self):
+        """
+        Remove the source_data.yaml, user_data.yaml and fetch_times.yaml files
+        of the two files layout, and their snapshots.
+
+        Returns:
+            Nothing.
+        """
+
+        for yaml_path in [
+            self.source_data_path,
+            self.user_data_path,
+            self.fetch_times_path,
+        ]:
+            for file_path in [yaml_path, self._snapshot_path(yaml_path)]:
+                try:
+                    os.remove(os.path.expanduser(file_path))
+                except FileNotFoundError:
+                    pass
 
     def _save_yaml(self, yaml_path, variable):
         """
         Save the content of a variable into a yaml file.
 
+        If the file already has the same content, identified by its size and
+        sha256 hash, it's not written again. Otherwise the content is written
+        to a temporary file, flushed to disk and renamed over the yaml file,
+        so a crash while saving leaves either the old or the new file, never
+        a truncated one.
+
         Parameters:
             yaml_path (str): Path to the file to write.
             variable (str|dict|list|set|bool): Variable to save to the file.
 
+        Returns:
+            bool: If the file was written.
+        """
+
+        yaml_path = os.path.expanduser(yaml_path)
+        content = yaml.dump(
+            variable,
+            Dumper=SafeDumper,
+            default_flow_style=False,
+        ).encode('utf-8')
+
+        try:
+            if os.stat(yaml_path).st_size == len(content) and \
+                    self._file_signature(yaml_path)['sha256'] == \
+                    hashlib.sha256(content).hexdigest():
+                return False
+        except OSError:
+            pass
+
+        with open(yaml_path + '.tmp', 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(yaml_path + '.tmp', yaml_path)
+        self._fsync_directory(os.path.dirname(yaml_path))
+        return True
+
+    def _fsync_directory(self, directory):
+        """
+        Flush the entries of a directory to disk, so a rename inside it
+        survives a crash.
+
+        Not all the platforms allow to open directories, so the errors are
+        ignored.
+
+        Parameters:
+            directory (str): Path to the directory.
+
         Returns:
             Nothing.
         """
 
-        with open(os.path.expanduser(yaml_path), 'w+') as f:
-            yaml.dump(variable, f, default_flow_style=False)
+        try:
+            fd = os.open(directory or '.', os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _file_signature(self, file_path):
+        """
+        Return the signature of a file, used to check if the binary snapshot
+        is still valid, with the following structure:
+        {
+            'size': 1024,
+            'mtime': 1570000000000000000,
+            'sha256': 'e3b0c44298fc1c149afbf4c8996fb924...',
+        }
+
+        Parameters:
+            file_path (str): Path to the file.
+
+        Exceptions:
+            OSError: If the file can't be read.
+
+        Returns:
+            dict: Signature of the file.
+        """
+
+        file_path = os.path.expanduser(file_path)
+        stat = os.stat(file_path)
+        file_hash = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                file_hash.update(chunk)
+
+        return {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'sha256': file_hash.hexdigest(),
+        }
+
+    def _snapshot_path(self, yaml_path):
+        """
+        Return the path of the binary snapshot of a yaml file of the
+        inventory, that mirrors its path inside the snapshots directory, for
+        example snapshots/source_data/ec2.pickle.
+
+        Parameters:
+            yaml_path (str): Path to the yaml file.
+
+        Returns:
+            str: Path of the snapshot.
+        """
+
+        return os.path.join(
+            self.snapshot_dir,
+            os.path.splitext(
+                os.path.relpath(yaml_path, self.inventory_dir)
+            )[0] + '.pickle',
+        )
+
+    def _load_snapshot(self, yaml_path):
+        """
+        Load the binary snapshot of a yaml file if it's still valid, with the
+        following structure:
+        {
+            'version': 1,
+            'signature': yaml_file_signature,
+            'compact': False,
+            'data': content_of_the_yaml_file,
+        }
+
+        The snapshot is valid if the yaml file has the size it had when the
+        snapshot was written, and either the same mtime or, if the file was
+        touched, the same content hash. The size and mtime are checked first
+        so the hash is only computed when they don't match.
+
+        Parameters:
+            yaml_path (str): Path to the yaml file.
+
+        Returns:
+            dict: Snapshot, or None if there is no valid snapshot.
+        """
+
+        try:
+            snapshot_path = os.path.expanduser(self._snapshot_path(yaml_path))
+            with open(snapshot_path, 'rb') as f:
+                snapshot = pickle.load(f)
+            if snapshot['version'] != self.snapshot_version:
+                return None
+            signature = snapshot['signature']
+            stat = os.stat(os.path.expanduser(yaml_path))
+            if stat.st_size != signature['size']:
+                return None
+            if stat.st_mtime_ns != signature['mtime'] and \
+                    self._file_signature(yaml_path)['sha256'] != \
+                    signature['sha256']:
+                return None
+        except (
+            AttributeError,
+            EOFError,
+            ImportError,
+            KeyError,
+            OSError,
+            TypeError,
+            pickle.UnpicklingError,
+        ):
+            return None
+        return snapshot
+
+    def _save_snapshot(self, yaml_path, variable, compact=False):
+        """
+        Save the content of a yaml file to its binary snapshot, together with
+        the signature of the yaml file.
+
+        The snapshot is only a cache of the yaml file, so if it can't be
+        written the error is logged and ignored.
+
+        Parameters:
+            yaml_path (str): Path to the yaml file.
+            variable (str|dict|list|set|bool): Content of the yaml file.
+            compact (bool): If the variable was compacted.
+
+        Returns:
+            Nothing.
+        """
+
+        try:
+            snapshot = {
+                'version': self.snapshot_version,
+                'signature': self._file_signature(yaml_path),
+                'compact': compact,
+                'data': variable,
+            }
+            snapshot_path = os.path.expanduser(self._snapshot_path(yaml_path))
+            os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+            with open(snapshot_path + '.tmp', 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(snapshot_path + '.tmp', snapshot_path)
+        except (OSError, pickle.PicklingError) as e:
+            self.log.debug('Error saving the inventory snapshot: {}'.format(e))
+
+    def load_search_index(self):
+        """
+        Return the search index of the loaded inventory, see TrigramIndex.
+
+        The index is built by generate and stored in the search_index.pickle
+        file of the inventory_dir. If it's missing, or the stored data of the
+        loaded sources changed since it was built, for example because the
+        user data was edited, it's built again from the loaded inventory.
+
+        Returns:
+            TrigramIndex: Search index of the loaded inventory.
+        """
+
+        return self._load_index(
+            TrigramIndex(self.search_index_path),
+            list(self.inv),
+        )
+
+    def load_ip_index(self):
+        """
+        Return the ip index of the loaded inventory, see IPIndex.
+
+        Like the search index, it's built by generate and stored in the
+        ip_index.pickle file of the inventory_dir, and it's built again if
+        it's out of date. Only the loaded sources with ip addresses are
+        indexed.
+
+        Returns:
+            IPIndex: Ip index of the loaded inventory.
+        """
+
+        return self._load_index(
+            IPIndex(self.ip_index_path),
+            self._ip_source_ids(),
+        )
+
+    def load_field_index(self):
+        """
+        Return the field index of the loaded inventory, see FieldIndex.
+
+        Like the search index, it's built by generate and stored in the
+        field_index.pickle file of the inventory_dir, and it's built again if
+        it's out of date.
+
+        Returns:
+            FieldIndex: Field index of the loaded inventory.
+        """
+
+        return self._load_index(
+            FieldIndex(self.field_index_path),
+            list(self.inv),
+        )
+
+    def _load_index(self, index, source_ids):
+        """
+        Load an index of some loaded sources from its file, or build it if
+        it's missing or out of date.
+
+        Parameters:
+            index (ResourceIndex): Index to load.
+            source_ids (list): Ids of the sources to index.
+
+        Returns:
+            ResourceIndex: The loaded index.
+        """
+
+        if index.load() and \
+                index.signature == self._search_index_signature(source_ids):
+            return index
+        return self._build_index(index, source_ids)
+
+    def _build_index(self, index, source_ids):
+        """
+        Build an index of some loaded sources, and save it.
+
+        Parameters:
+            index (ResourceIndex): Index to build.
+            source_ids (list): Ids of the sources to index.
+
+        Returns:
+            ResourceIndex: The built index.
+        """
+
+        index.build(
+            {source_id: self.inv[source_id] for source_id in source_ids},
+            self._search_index_signature(source_ids),
+        )
+        index.save()
+        return index
+
+    def _build_search_indexes(self):
+        """
+        Build the search, ip and field indexes of the loaded inventory, and
+        save them.
+
+        Returns:
+            Nothing.
+        """
+
+        self._build_index(
+            TrigramIndex(self.search_index_path),
+            list(self.inv),
+        )
+        self._build_index(IPIndex(self.ip_index_path), self._ip_source_ids())
+        self._build_index(
+            FieldIndex(self.field_index_path),
+            list(self.inv),
+        )
+
+    def _ip_source_ids(self):
+        """
+        Return the ids of the loaded sources with ip addresses, the ones
+        indexed by the ip index.
+
+        Returns:
+            list: Source ids, in the order of the inventory.
+        """
+
+        return [
+            source_id
+            for source_id in self.inv
+            if source_id in IPIndex.resource_types
+        ]
+
+    def _search_index_signature(self, source_ids):
+        """
+        Return the signature of the stored data of some sources, used to
+        check if the search indexes are up to date, with the following
+        structure:
+        {
+            'sources': ['ec2', 'rds'],
+            'files': {
+                '~/.local/share/clinv/source_data/ec2.yaml': [1024, 157...],
+                '~/.local/share/clinv/user_data/ec2.yaml': None,
+                ...
+            },
+        }
+
+        Each file has its size and modification time, or None if it doesn't
+        exist.
+
+        Parameters:
+            source_ids (list): Ids of the sources.
+
+        Returns:
+            dict: Signature of the stored data.
+        """
+
+        if self.store is not None:
+            file_paths = [self.database_path]
+            for source_id in source_ids:
+                file_paths.append(self._shard_path('user_data', source_id))
+        else:
+            file_paths = [
+                self.manifest_path,
+                self.source_data_path,
+                self.user_data_path,
+            ]
+            for source_id in source_ids:
+                file_paths.append(self._shard_path('source_data', source_id))
+                file_paths.append(self._shard_path('user_data', source_id))
+
+        files = {}
+        for file_path in file_paths:
+            try:
+                stat = os.stat(os.path.expanduser(file_path))
+            except FileNotFoundError:
+                files[file_path] = None
+                continue
+            files[file_path] = [stat.st_size, stat.st_mtime_ns]
+
+        return {'sources': source_ids, 'files': files}
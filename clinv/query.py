@@ -0,0 +1,368 @@
+"""
+Module to store the field queries of the search.
+
+Classes:
+    FieldQuery: Search restricted to some fields of the resources, compiled
+        into the indexes that narrow the resources to check.
+"""
+
+from clinv.sources import SearchQuery
+import re
+
+
+class FieldQuery():
+    """
+    Search restricted to some fields of the resources, like:
+
+        type:ec2 region:eu-west-1 state:running instance_type:c5.* web
+
+    Each term with the name of a field before a colon must match that field,
+    and the rest of the terms must match the resource like a normal search.
+    All the terms must match.
+
+    The value of a field term must match the whole value of the field, case
+    insensitively except for the id. If it doesn't have regular expression
+    characters it's compared as a plain string, otherwise it's a regular
+    expression.
+
+    The supported fields are:
+        type: Type of the resource, like ec2 or projects.
+        id: Id of the resource.
+        project: Id or name of a project, to select the project, its
+            services, informations and people, and the AWS resources of its
+            services.
+        name, state, region, instance_type, record_type: Properties of the
+            resources, see their search_fields class attribute.
+
+    The query is compiled into the steps that select the candidate resources
+    without checking them: the type terms select the types, the plain id
+    terms their resources, the project terms the resources assigned to the
+    projects, and the plain terms of the indexed fields are looked up in the
+    FieldIndex. Only the candidates are checked with the rest of the terms.
+
+    Parameters:
+        query_string (str): Query to compile.
+        inventory (Mapping): Resource objects of each type, with the type as
+            key, like Inventory.inv.
+
+    Public methods:
+        is_field_query: Check if a search string has field terms.
+        related_types: Return the resource types needed to resolve the
+            terms of a search string.
+        candidates: Return the resources that may match the query.
+        match: Check if a resource matches the query.
+
+    Internal methods:
+        _parse_term: Split a term into its field and value.
+        _compile_term: Compile the value of a field term.
+        _match_value: Check if a value matches a field term.
+        _project_members: Return the resources assigned to the projects that
+            match a term.
+        _selections: Return the resources selected by the terms of the
+            query without checking them.
+
+    Public attributes:
+        query_string (str): Query.
+        terms (list): Compiled field terms, tuples of field, literal value,
+            or None if the value is a regular expression, and the compiled
+            regular expression.
+        text_queries (list): SearchQuery of each term without field.
+        inventory (Mapping): Resources to search.
+
+    Class attributes:
+        fields (list): Fields supported by the field terms.
+    """
+
+    fields = [
+        'id',
+        'instance_type',
+        'name',
+        'project',
+        'record_type',
+        'region',
+        'state',
+        'type',
+    ]
+
+    def __init__(self, query_string, inventory):
+        self.query_string = query_string
+        self.inventory = inventory
+        self.terms = []
+        self.text_queries = []
+        self._members = {}
+        for term in query_string.split():
+            field, value = self._parse_term(term)
+            if field is None:
+                self.text_queries.append(SearchQuery(term))
+                continue
+            self.terms.append(self._compile_term(field, value))
+            if field == 'project':
+                self._members[len(self.terms) - 1] = self._project_members(
+                    self.terms[-1],
+                )
+
+    @classmethod
+    def is_field_query(cls, search_string):
+        """
+        Check if a search string has field terms.
+
+        Parameters:
+            search_string (str): Search string.
+
+        Returns:
+            bool: If any of its terms starts with a supported field.
+        """
+
+        return any(
+            cls._parse_term(term)[0] is not None
+            for term in search_string.split()
+        )
+
+    @classmethod
+    def related_types(cls, search_string):
+        """
+        Return the resource types needed to resolve the terms of a search
+        string, besides the searched ones: the projects and services of the
+        project terms.
+
+        Parameters:
+            search_string (str): Search string.
+
+        Returns:
+            list: Resource types.
+        """
+
+        if any(
+            cls._parse_term(term)[0] == 'project'
+            for term in search_string.split()
+        ):
+            return ['projects', 'services']
+        return []
+
+    @classmethod
+    def _parse_term(cls, term):
+        """
+        Split a term into its field and value.
+
+        Parameters:
+            term (str): Term of the query.
+
+        Returns:
+            tuple: Field and value of the term, or None and the term if it
+            doesn't start with a supported field.
+        """
+
+        field, separator, value = term.partition(':')
+        if separator == '' or value == '' or field not in cls.fields:
+            return None, term
+        return field, value
+
+    def _compile_term(self, field, value):
+        """
+        Compile the value of a field term.
+
+        Parameters:
+            field (str): Field of the term.
+            value (str): Value of the term.
+
+        Returns:
+            tuple: Field, literal value and compiled regular expression of
+            the term. The literal value is case folded except for the id,
+            and it's None if the value is a regular expression.
+        """
+
+        if re.search(r'[.^$*+?{}\[\]\\|()]', value) is None:
+            return (field, value if field == 'id' else value.lower(), None)
+        flags = 0 if field == 'id' else re.IGNORECASE
+        return (field, None, re.compile(value, flags))
+
+    def _match_value(self, term, value):
+        """
+        Check if a value matches a field term.
+
+        Parameters:
+            term (tuple): Compiled term.
+            value (str): Value of the field, or None if the resource doesn't
+                have it.
+
+        Returns:
+            bool: If the term matches the whole value.
+        """
+
+        field, literal, regexp = term
+        if not isinstance(value, str):
+            return False
+        if literal is not None:
+            if field != 'id':
+                value = value.lower()
+            return value == literal
+        return regexp.fullmatch(value) is not None
+
+    def _project_members(self, term):
+        """
+        Return the resources assigned to the projects whose id or name match
+        a term: the projects, their services, informations and people, and
+        the AWS resources of their services.
+
+        Parameters:
+            term (tuple): Compiled project term.
+
+        Returns:
+            set: Tuples of the type and the id of the resources.
+        """
+
+        members = set()
+        if 'projects' not in self.inventory:
+            return members
+
+        for project_id, project in self.inventory['projects'].items():
+            if not self._match_value(term, project_id) and \
+                    not self._match_value(term, project.raw.get('name')):
+                continue
+            members.add(('projects', project_id))
+            for resource_type in ['services', 'informations', 'people']:
+                try:
+                    for resource_id in project.raw[resource_type]:
+                        members.add((resource_type, resource_id))
+                except (KeyError, TypeError):
+                    pass
+
+        if 'services' not in self.inventory:
+            return members
+        services = self.inventory['services']
+        for resource_type, service_id in list(members):
+            if resource_type != 'services' or service_id not in services:
+                continue
+            try:
+                aws = services[service_id].raw['aws']
+                for aws_type, aws_ids in aws.items():
+                    for aws_id in aws_ids or []:
+                        members.add((aws_type, aws_id))
+            except (AttributeError, KeyError, TypeError):
+                pass
+        return members
+
+    def _selections(self, field_index=None):
+        """
+        Return the resources selected by the terms of the query that can be
+        resolved without checking the resources: the plain id terms, the
+        project terms and the plain terms of the fields of the field index.
+
+        Parameters:
+            field_index (FieldIndex): Field index of the inventory, or None
+                to not use it.
+
+        Returns:
+            list: A dictionary for each term with the selected resource ids
+            of each type, as a set. The types missing from a dictionary are
+            not narrowed by its term.
+        """
+
+        selections = []
+        for members in self._members.values():
+            selection = {
+                resource_type: set() for resource_type in self.inventory
+            }
+            for resource_type, resource_id in members:
+                if resource_type in selection:
+                    selection[resource_type].add(resource_id)
+            selections.append(selection)
+
+        for field, literal, regexp in self.terms:
+            if literal is None:
+                continue
+            if field == 'id':
+                selections.append(
+                    {
+                        resource_type: {literal}
+                        for resource_type in self.inventory
+                    }
+                )
+            elif field_index is not None and \
+                    field in field_index.indexed_fields:
+                selections.append(
+                    {
+                        resource_type: set(resource_ids)
+                        for resource_type, resource_ids in
+                        field_index.candidates(field, literal).items()
+                    }
+                )
+        return selections
+
+    def candidates(self, field_index=None):
+        """
+        Return the resources that may match the query.
+
+        Parameters:
+            field_index (FieldIndex): Field index of the inventory, or None
+                to not use it.
+
+        Returns:
+            dict: Ids of the candidate resources of each type, in the order
+            of the inventory. The types missing from the result are not
+            narrowed, so all their resources are candidates.
+        """
+
+        type_terms = [term for term in self.terms if term[0] == 'type']
+        selections = self._selections(field_index)
+
+        candidates = {}
+        for resource_type in self.inventory:
+            if not all(
+                self._match_value(term, resource_type) for term in type_terms
+            ):
+                candidates[resource_type] = []
+                continue
+
+            resource_ids = None
+            for selection in selections:
+                if resource_type not in selection:
+                    continue
+                if resource_ids is None:
+                    resource_ids = set(selection[resource_type])
+                else:
+                    resource_ids &= selection[resource_type]
+            if resource_ids is None:
+                continue
+            if resource_ids == set():
+                candidates[resource_type] = []
+                continue
+            candidates[resource_type] = [
+                resource_id
+                for resource_id in self.inventory[resource_type]
+                if resource_id in resource_ids
+            ]
+        return candidates
+
+    def match(self, resource_type, resource):
+        """
+        Check if a resource matches the query.
+
+        Parameters:
+            resource_type (str): Type of the resource.
+            resource (ClinvGenericResource): Resource to check.
+
+        Returns:
+            bool: If the resource matches all the terms.
+        """
+
+        values = None
+        for position, term in enumerate(self.terms):
+            field = term[0]
+            if field == 'type':
+                value = resource_type
+            elif field == 'project':
+                if (resource_type, resource.id) not in self._members[position]:
+                    return False
+                continue
+            else:
+                if values is None:
+                    values = resource.field_values()
+                value = values.get(field)
+            if not self._match_value(term, value):
+                return False
+
+        for query in self.text_queries:
+            if resource.search(query) is not True:
+                return False
+        return True
@@ -5,6 +5,7 @@ Classes:
     ClinvReport: Class to gather the common methods for the Clinv reports.
 """
 
+from operator import attrgetter
 import logging
 
 
@@ -15,22 +16,46 @@ class ClinvReport():
     Parameters:
         inventory (Inventory): Clinv inventory object.
 
+    Public class methods:
+        resource_types: Return the resource types needed by the report.
+
     Public methods:
         short_print_resources: Executes the short_print method for a list
             of clinv resources.
 
     Private methods:
         _get_resource_names: Return list of resource names.
+        _resources: Return the resources of a type sorted by id.
 
     Public attributes:
         inv (Inventory): Clinv inventory.
+        store (SQLiteStore): Database of the inventory, or None if it's not
+            stored in one.
         log (logging object):
     """
 
     def __init__(self, inventory):
         self.inv = inventory.inv
+        self.store = inventory.store
         self.log = logging.getLogger('main')
 
+    @classmethod
+    def resource_types(cls, *args):
+        """
+        Return the resource types that the output method needs for the
+        arguments it's going to be called with, so the inventory only loads
+        those sources.
+
+        Parameters:
+            *args: Arguments of the output method.
+
+        Returns:
+            list: Resource types needed by the report, or None if it needs
+            all of them.
+        """
+
+        return None
+
     def short_print_resources(self, resource_list):
         """
         Executes the short_print method for a list of Clinv resources.
@@ -44,6 +69,38 @@ class ClinvReport():
         for resource in resource_list:
             resource.short_print()
 
+    def _resources(self, resource_type, exclude_state=None):
+        """
+        Return the resources of a type sorted by id.
+
+        If the inventory is stored in a database, the resources are selected
+        with an indexed query instead of going through the whole type.
+
+        Parameters:
+            resource_type (str): Type of the resources.
+            exclude_state (str): Skip the resources with this state. By
+                default, is set to None to return all of them.
+
+        Returns:
+            list: Resource objects.
+        """
+
+        if self.store is not None:
+            return sorted(
+                self.store.query(
+                    resource_type,
+                    exclude_state=exclude_state,
+                ),
+                key=attrgetter('id'),
+            )
+
+        resources = sorted(self.inv[resource_type].items())
+        return [
+            resource
+            for resource_id, resource in resources
+            if exclude_state is None or resource.state != exclude_state
+        ]
+
     def _get_resource_names(self, resource_type, resource_ids):
         """
         Do aggregation of data to return a list with the names of the
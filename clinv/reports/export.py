@@ -20,6 +20,9 @@ class ExportReport(ClinvReport):
     Parameters:
         inventory (Inventory): Clinv inventory object.
 
+    Public class methods:
+        resource_types: Return the resource types needed by the report.
+
     Public methods:
         output: Export the Clinv inventory to ods.
 
@@ -56,6 +59,29 @@ class ExportReport(ClinvReport):
     def __init__(self, inventory):
         super().__init__(inventory)
 
+    @classmethod
+    def resource_types(cls, export_path=None):
+        """
+        Return the resource types exported to the spreadsheet.
+
+        Parameters:
+            export_path (str): Path to export the inventory.
+
+        Returns:
+            list: Resource types needed by the report.
+        """
+
+        return [
+            'projects',
+            'services',
+            'informations',
+            'ec2',
+            'rds',
+            'route53',
+            's3',
+            'people',
+        ]
+
     def _export_aws_resource(self, resource_type):
         """
         Do aggregation of data to return a list with the information needed to
@@ -16,6 +16,9 @@ class ListReport(ClinvReport):
     Parameters:
         inventory (Inventory): Clinv inventory object.
 
+    Public class methods:
+        resource_types: Return the resource types needed by the report.
+
     Public methods:
         output: Print the report to stdout.
 
@@ -26,6 +29,23 @@ class ListReport(ClinvReport):
     def __init__(self, inventory):
         super().__init__(inventory)
 
+    @classmethod
+    def resource_types(cls, desired_resource_type=None):
+        """
+        Return the resource types needed to list the desired resource type.
+
+        Parameters:
+            desired_resource_type (str): Type of Clinv resource to list.
+
+        Returns:
+            list: Resource types needed by the report, or None if it needs
+            all of them.
+        """
+
+        if desired_resource_type is None:
+            return None
+        return [desired_resource_type]
+
     def output(self, desired_resource_type=None):
         """
         Do aggregation of data to print a list of the selected resource entries
@@ -51,8 +71,6 @@ class ListReport(ClinvReport):
         for resource_type in sorted(self.inv.keys()):
             if resource_type == desired_resource_type \
                     or desired_resource_type is None:
-                for resource_id, resource \
-                        in sorted(self.inv[resource_type].items()):
-                    resources_to_print.append(resource)
+                resources_to_print.extend(self._resources(resource_type))
 
         self.short_print_resources(resources_to_print)
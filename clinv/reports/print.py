@@ -21,6 +21,9 @@ class PrintReport(ClinvReport):
     Public methods:
         output: Print the report to stdout.
 
+    Internal methods:
+        _id_prefix: Return the literal prefix of a regular expression.
+
     Public attributes:
         inv (Inventory): Clinv inventory.
     """
@@ -28,6 +31,33 @@ class PrintReport(ClinvReport):
     def __init__(self, inventory):
         super().__init__(inventory)
 
+    def _id_prefix(self, regexp_id):
+        """
+        Return the literal prefix that every string matched by the regular
+        expression starts with, used to select the resources by the id
+        index of the inventory database.
+
+        Parameters:
+            regexp_id (str): regular expression of a resource id.
+
+        Returns:
+            str: Literal prefix, empty if the expression doesn't start with
+            one.
+        """
+
+        # An alternation can start with any other literal.
+        if '|' in regexp_id:
+            return ''
+
+        prefix = ''
+        for character in regexp_id:
+            if character in '.^$*+?{}[]\\|()':
+                if character in '*?{' and prefix != '':
+                    prefix = prefix[:-1]
+                return prefix
+            prefix += character
+        return prefix
+
     def output(self, regexp_id):
         """
         Method to print the information of a Clinv resource.
@@ -39,6 +69,14 @@ class PrintReport(ClinvReport):
             stdout: Resource information
         """
 
+        if self.store is not None:
+            for resource in self.store.query(
+                id_prefix=self._id_prefix(regexp_id),
+            ):
+                if re.match(regexp_id, resource.id):
+                    resource.print()
+            return
+
         for resource_type in self.inv:
             for resource_id, resource in self.inv[resource_type].items():
                 if re.match(regexp_id, resource_id):
@@ -4,46 +4,331 @@ Module to store the SearchReport.
 Classes:
   SearchReport: Class to gather methods to search Clinv resources into the
   inventory.
+  BufferedStdout: Writer that gathers the writes to the standard output and
+  writes them in blocks.
 
 """
 
+from clinv.query import FieldQuery
 from clinv.reports import ClinvReport
+from clinv.search_index import IPIndex
+from clinv.sources import SearchQuery
+import contextlib
+import itertools
+import sys
+import time
 
 
 class SearchReport(ClinvReport):
     """
     Class to gather methods to search Clinv resources into the inventory.
 
+    The search index of the inventory selects the resources that may match
+    the search, and only those are searched. The searches by network use the
+    ip index of the inventory instead, and the searches with field terms,
+    like `type:ec2 state:running`, are compiled into a FieldQuery that uses
+    the field index.
+
     Parameters:
         inventory (Inventory): Clinv inventory object.
 
     Public methods:
         output: Print the report to stdout.
 
+    Class methods:
+        resource_types: Return the resource types needed by the report.
+
+    Internal methods:
+        _query: Compile the search string.
+        _candidates: Return the resources that may match the search.
+        _matches: Check if a resource matches the search.
+        _search: Yield the resources that match the search.
+        _print_counts: Print the number of matches of each type.
+
     Public attributes:
         inv (Inventory): Clinv inventory.
+        index (TrigramIndex): Search index of the inventory, loaded by the
+            first search.
+        ip_index (IPIndex): Ip index of the inventory, loaded by the first
+            search by network.
+        field_index (FieldIndex): Field index of the inventory, loaded by
+            the first search with field terms.
     """
 
     def __init__(self, inventory):
         super().__init__(inventory)
+        self._inventory = inventory
+        self.index = None
+        self.ip_index = None
+        self.field_index = None
+
+    @classmethod
+    def resource_types(cls, search_string=None, cidr=None, *args):
+        """
+        Override the parent method to load only the resources with ip
+        addresses when searching by network.
+
+        Parameters:
+            search_string (str): regular expression to search.
+            cidr (str): Network to search.
+            *args: Rest of the arguments of the output method.
+
+        Returns:
+            list: Resource types needed by the report, or None if it needs
+            all of them.
+        """
+
+        if cidr is None:
+            return None
+        resource_types = list(IPIndex.resource_types)
+        if search_string is not None:
+            resource_types += FieldQuery.related_types(search_string)
+        return resource_types
 
-    def output(self, search_string):
+    def output(self, search_string=None, cidr=None, limit=None, count=False):
         """
         Method to print the report to stdout.
 
+        The search_string is compiled once into a SearchQuery shared by all
+        the resources, or into a FieldQuery if it has field terms.
+
+        Each resource is printed as soon as it matches, and the output is
+        written to stdout in blocks, see BufferedStdout.
+
         Parameters:
-            resource_id (str): regular expression of a resource id.
+            search_string (str): regular expression or field query to
+                search.
+            cidr (str): Network to search, like 10.12.0.0/16, to only show
+                the resources with an ip address in it. It can be combined
+                with the search_string.
+            limit (int): Stop the search after this number of matches. By
+                default, is set to None to show all of them.
+            count (bool): Print the number of matches of each type instead
+                of the resources.
 
         Returns:
             stdout: Resource information
         """
 
+        query = self._query(search_string)
+        matches = self._search(query, self._candidates(query, cidr), cidr)
+        if limit is not None:
+            matches = itertools.islice(matches, limit)
+
+        output = BufferedStdout(sys.stdout)
+        try:
+            with contextlib.redirect_stdout(output):
+                if count:
+                    self._print_counts(matches)
+                    return
+
+                printed_type = None
+                for resource_type, resource in matches:
+                    if resource_type != printed_type:
+                        print('\nType: {}'.format(resource_type))
+                        printed_type = resource_type
+                    resource.short_print()
+        finally:
+            output.flush()
+
+    def _search(self, query, candidates, cidr=None):
+        """
+        Yield the resources that match the search, type by type in the order
+        of the inventory, checking them as they're requested so the search
+        stops when the caller does.
+
+        The candidates are only used to skip resources, the resources are
+        yielded in the order of the loaded inventory, so the results and
+        the limited searches are the same with and without the indexes.
+
+        Parameters:
+            query (SearchQuery or FieldQuery): Compiled search, or None to
+                match all the candidates.
+            candidates (dict): Candidate resources of each type, as returned
+                by _candidates.
+            cidr (str): Network to search.
+
+        Returns:
+            generator: Tuples of the type of a resource and the resource.
+        """
+
         for resource_type in self.inv.keys():
-            result = []
-            for resource_id, resource in self.inv[resource_type].items():
-                if resource.search(search_string) is True:
-                    result.append(resource)
-
-            if result != []:
-                print('\nType: {}'.format(resource_type))
-                self.short_print_resources(result)
+            if candidates is None or resource_type not in candidates:
+                if cidr is not None:
+                    continue
+                resources = self.inv[resource_type].values()
+            else:
+                candidate_ids = set(candidates[resource_type])
+                resources = (
+                    resource
+                    for resource_id, resource in
+                    self.inv[resource_type].items()
+                    if resource_id in candidate_ids
+                )
+
+            for resource in resources:
+                if self._matches(query, resource_type, resource):
+                    yield resource_type, resource
+
+    def _print_counts(self, matches):
+        """
+        Print the number of matches of each type, and the total, without
+        formatting the resources.
+
+        Parameters:
+            matches (iterable): Tuples of the type of a resource and the
+                resource, as returned by _search.
+
+        Returns:
+            stdout: Number of matches.
+        """
+
+        counts = {}
+        for resource_type, resource in matches:
+            counts[resource_type] = counts.get(resource_type, 0) + 1
+
+        for resource_type, type_count in counts.items():
+            print('{}: {}'.format(resource_type, type_count))
+        print('Total: {}'.format(sum(counts.values())))
+
+    def _query(self, search_string=None):
+        """
+        Compile the search string.
+
+        Parameters:
+            search_string (str): regular expression or field query to
+                search.
+
+        Returns:
+            SearchQuery or FieldQuery: Compiled search, or None if there is
+            no search string.
+        """
+
+        if search_string is None:
+            return None
+        if FieldQuery.is_field_query(search_string):
+            return FieldQuery(search_string, self.inv)
+        return SearchQuery(search_string)
+
+    def _candidates(self, query=None, cidr=None):
+        """
+        Return the resources that may match the search, loading the indexes
+        of the inventory the first time they're needed.
+
+        With a network, the resources are selected by the ip index, and the
+        query, if any, is only checked against them.
+
+        Parameters:
+            query (SearchQuery or FieldQuery): Compiled search.
+            cidr (str): Network to search.
+
+        Returns:
+            dict: Ids of the candidate resources of each indexed type, or
+            None to search all the resources. With a network, the resource
+            types missing from the result have no ip addresses.
+        """
+
+        if cidr is not None:
+            if self.ip_index is None:
+                self.ip_index = self._inventory.load_ip_index()
+            return self.ip_index.candidates(cidr)
+
+        if isinstance(query, FieldQuery):
+            if self.field_index is None:
+                self.field_index = self._inventory.load_field_index()
+            return query.candidates(self.field_index)
+
+        if self.index is None:
+            self.index = self._inventory.load_search_index()
+        return self.index.candidates(query.search_string)
+
+    def _matches(self, query, resource_type, resource):
+        """
+        Check if a resource matches the search.
+
+        Parameters:
+            query (SearchQuery or FieldQuery): Compiled search, or None to
+                match all the resources.
+            resource_type (str): Type of the resource.
+            resource (ClinvGenericResource): Resource to check.
+
+        Returns:
+            bool: If the resource matches.
+        """
+
+        if query is None:
+            return True
+        if isinstance(query, FieldQuery):
+            return query.match(resource_type, resource)
+        return resource.search(query) is True
+
+
+class BufferedStdout():
+    """
+    Writer that gathers the writes to the standard output and writes them in
+    blocks, to not write each printed line on its own, which is slow when the
+    output is a terminal.
+
+    The gathered text is written when it reaches buffer_size characters, or
+    when it's written more than flush_interval seconds after the last block,
+    so the results of a slow search are still shown as they're found.
+
+    Parameters:
+        stream (file object): Stream to write to.
+        buffer_size (int): Characters gathered before writing them. By
+            default, is set to 65536.
+        flush_interval (float): Seconds after which the gathered text is
+            written. By default, is set to 0.1.
+
+    Public methods:
+        write: Gather a text to write.
+        flush: Write the gathered text to the stream.
+
+    Public attributes:
+        stream (file object): Stream to write to.
+        buffer_size (int): Characters gathered before writing them.
+        flush_interval (float): Seconds after which the gathered text is
+            written.
+    """
+
+    def __init__(self, stream, buffer_size=65536, flush_interval=0.1):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, text):
+        """
+        Gather a text to write, writing the gathered text if it's big or old
+        enough.
+
+        Parameters:
+            text (str): Text to write.
+
+        Returns:
+            int: Number of characters written.
+        """
+
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= self.buffer_size or \
+                time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        """
+        Write the gathered text to the stream and flush it.
+
+        Returns:
+            Nothing.
+        """
+
+        if self._buffer != []:
+            self.stream.write(''.join(self._buffer))
+            self._buffer = []
+            self._size = 0
+        self.stream.flush()
+        self._last_flush = time.monotonic()
@@ -17,6 +17,9 @@ class UnassignedReport(ClinvReport):
     Parameters:
         inventory (Inventory): Clinv inventory object.
 
+    Public class methods:
+        resource_types: Return the resource types needed by the report.
+
     Public methods:
         output: Print the report to stdout.
 
@@ -38,11 +41,47 @@ class UnassignedReport(ClinvReport):
 
     Public attributes:
         inv (Inventory): Clinv inventory.
+
+    Class attributes:
+        assigners (dict): Resource type that the resources of each type are
+            assigned to.
     """
 
+    assigners = {
+        'ec2': 'services',
+        'iam_groups': 'services',
+        'iam_users': 'people',
+        'informations': 'projects',
+        'people': 'projects',
+        'rds': 'services',
+        'route53': 'services',
+        's3': 'services',
+        'services': 'projects',
+    }
+
     def __init__(self, inventory):
         super().__init__(inventory)
 
+    @classmethod
+    def resource_types(cls, resource_type):
+        """
+        Return the resource types needed to find the unassigned resources of
+        resource_type: the resource type itself and the one its resources are
+        assigned to.
+
+        Parameters:
+            resource_type (str): Type of clinv resource to be processed.
+
+        Returns:
+            list: Resource types needed by the report, or None if it needs
+            all of them.
+        """
+
+        try:
+            return [resource_type, cls.assigners[resource_type]]
+        except KeyError:
+            return None
+
     def _unassigned_aws_resource(self, resource_type):
         """
         Do aggregation of data to print the resource_type resources that are
@@ -71,10 +110,9 @@ class UnassignedReport(ClinvReport):
             except KeyError:
                 pass
 
-        for instance_id, instance in sorted(self.inv[resource_type].items()):
-            if instance_id not in all_assigned_instances:
-                if instance.state != 'terminated':
-                    instance.short_print()
+        for instance in self._resources(resource_type, 'terminated'):
+            if instance.id not in all_assigned_instances:
+                instance.short_print()
 
     def _unassigned_ec2(self):
         """
@@ -118,8 +156,8 @@ class UnassignedReport(ClinvReport):
             except KeyError:
                 pass
 
-        for instance_id, instance in sorted(self.inv[resource_type].items()):
-            if instance_id not in all_assigned_instances:
+        for instance in self._resources(resource_type):
+            if instance.id not in all_assigned_instances:
                 if instance.type != 'SOA' and instance.type != 'NS':
                     instance.print()
 
@@ -160,9 +198,8 @@ class UnassignedReport(ClinvReport):
                     all_assigned_resources.append(resource_id)
 
         unassigned_resources = []
-        for resource_id, resource in sorted(self.inv[resource_type].items()):
-            if resource_id not in all_assigned_resources and \
-                    resource.state != 'terminated':
+        for resource in self._resources(resource_type, 'terminated'):
+            if resource.id not in all_assigned_resources:
                 unassigned_resources.append(resource)
         self.short_print_resources(unassigned_resources)
 
@@ -215,8 +252,8 @@ class UnassignedReport(ClinvReport):
                 all_assigned_resources.append(person.iam_user)
 
         unassigned_resources = []
-        for resource_id, resource in sorted(self.inv['iam_users'].items()):
-            if resource_id not in all_assigned_resources:
+        for resource in self._resources('iam_users'):
+            if resource.id not in all_assigned_resources:
                 unassigned_resources.append(resource)
         self.short_print_resources(unassigned_resources)
 
@@ -0,0 +1,824 @@
+"""
+Module to store the indexes of the search.
+
+Classes:
+    ResourceIndex: Abstract class to gather the common methods and attributes
+        of the indexes of the inventory resources.
+    TrigramIndex: Index of the trigrams of the values that the search method
+        of each resource matches.
+    IPIndex: Index of the ip addresses of the resources, to search them by
+        network.
+    FieldIndex: Hash index of the values of the exact match fields of the
+        field queries.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+import ipaddress
+import logging
+import os
+import pickle
+import re
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+
+class ResourceIndex():
+    """
+    Abstract class to gather the common methods and attributes of the indexes
+    of the inventory resources.
+
+    Each resource is identified in the index by its number, its position in
+    the indexed inventory, so the index stores arrays of numbers instead of
+    ids. The indexed inventory may be in another order than the loaded one,
+    so the users of the candidates must iterate the loaded inventory to
+    keep its order.
+
+    Parameters:
+        index_path (str): Path to the file of the index.
+
+    Public methods:
+        save: Save the index to its file.
+        load: Load the index from its file.
+
+    Internal methods:
+        _state: Return the data of the index to save.
+        _set_state: Set the data of the index loaded from its file.
+        _resource_ids: Return the ids of some resource numbers by type.
+
+    Public attributes:
+        index_path (str): Path to the file of the index.
+        signature (object): Signature of the stored data the index was built
+            from, to check if the index is up to date.
+        resources (list): Pairs of the indexed types and the ids of their
+            resources, in the order they were indexed.
+        log (logging object):
+
+    Class attributes:
+        index_version (int): Version of the index file format, bump it when
+            its structure changes.
+    """
+
+    index_version = 2
+
+    def __init__(self, index_path):
+        self.index_path = os.path.expanduser(index_path)
+        self.log = logging.getLogger('main')
+        self.signature = None
+        self.resources = []
+
+    def save(self):
+        """
+        Save the index to its file. It's written to a temporary file that
+        is renamed over the old one.
+
+        The index is only a cache of the inventory, so if it can't be written
+        the error is logged and ignored.
+
+        Returns:
+            Nothing.
+        """
+
+        tmp_path = '{}.tmp'.format(self.index_path)
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(
+                    {
+                        'version': self.index_version,
+                        'signature': self.signature,
+                        'resources': self.resources,
+                        **self._state(),
+                    },
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            self.log.debug(
+                'Could not save the search index {}: {}'.format(
+                    self.index_path,
+                    e,
+                )
+            )
+
+    def load(self):
+        """
+        Load the index from its file.
+
+        Returns:
+            bool: If the index was loaded, False if the file doesn't exist,
+            can't be read or has another version.
+        """
+
+        try:
+            with open(self.index_path, 'rb') as f:
+                index = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            self.log.debug(
+                'Discarding the search index {}: {}'.format(
+                    self.index_path,
+                    e,
+                )
+            )
+            return False
+
+        if not isinstance(index, dict) or \
+                index.get('version') != self.index_version:
+            return False
+
+        self.signature = index['signature']
+        self.resources = index['resources']
+        self._set_state(index)
+        return True
+
+    def _state(self):
+        """
+        Return the data of the index to save, besides its version, signature
+        and resources.
+
+        Returns:
+            dict: Data of the index.
+        """
+
+        raise NotImplementedError
+
+    def _set_state(self, index):
+        """
+        Set the data of the index loaded from its file.
+
+        Parameters:
+            index (dict): Data of the index file, as returned by _state.
+
+        Returns:
+            Nothing.
+        """
+
+        raise NotImplementedError
+
+    def _resource_ids(self, numbers):
+        """
+        Return the ids of some resource numbers by type.
+
+        Parameters:
+            numbers (list): Sorted numbers of the resources.
+
+        Returns:
+            dict: Ids of the resources of each indexed type, in the order
+            they were indexed.
+        """
+
+        resource_ids = {}
+        offset = 0
+        position = 0
+        for resource_type, type_ids in self.resources:
+            end = offset + len(type_ids)
+            selected = []
+            while position < len(numbers) and numbers[position] < end:
+                selected.append(type_ids[numbers[position] - offset])
+                position += 1
+            resource_ids[resource_type] = selected
+            offset = end
+        return resource_ids
+
+
+class TrigramIndex(ResourceIndex):
+    """
+    Index of the trigrams of the values that the search method of each
+    resource matches, like ids, names, descriptions, ips, security groups,
+    Route53 values, emails or IAM policies. See the search_values method of
+    the resources.
+
+    Any string matched by a regular expression contains the literal
+    characters that the regular expression requires, so the resources that
+    don't have all the trigrams of those literals can't match it. The index
+    is only a prefilter: the candidates it returns still have to be
+    verified with their search method.
+
+    The values and the trigrams are case folded, so the same index works for
+    the case sensitive and case insensitive matches. Only the ASCII literals
+    of the queries are used, as the rest may match several characters when
+    the case is ignored.
+
+    Parameters:
+        index_path (str): Path to the file of the index.
+
+    Public methods:
+        build: Index the resources of an inventory.
+        candidates: Return the resources that may match a search.
+
+    Internal methods:
+        _state: Return the postings and the unindexed resources.
+        _set_state: Set the postings and the unindexed resources.
+        _fold: Case fold a string.
+        _resource_trigrams: Return the trigrams of the values of a resource.
+        _string_trigrams: Return the trigrams of some strings.
+        _literal_runs: Return the literal strings required by a parsed
+            regular expression.
+        _regexp_trigrams: Return the trigrams required by a regular
+            expression.
+        _literal_trigrams: Return the trigrams of a search string taken as a
+            literal string.
+        _run_trigrams: Return the trigrams of some literal strings.
+        _resources_with: Return the resources that have all the trigrams.
+
+    Public attributes:
+        index_path (str): Path to the file of the index.
+        signature (object): Signature of the stored data the index was built
+            from, to check if the index is up to date.
+        resources (list): Pairs of the indexed types and the ids of their
+            resources, in the order they were indexed.
+        log (logging object):
+    """
+
+    def __init__(self, index_path):
+        super().__init__(index_path)
+        self._postings = {}
+        self._unindexed = array('I')
+
+    def build(self, inventory, signature=None):
+        """
+        Index the resources of an inventory.
+
+        The resources whose values can't be read are not indexed, and they're
+        always returned as candidates.
+
+        Parameters:
+            inventory (Mapping): Resource objects of each type, with the type
+                as key, like Inventory.inv.
+            signature (object): Signature of the stored data of the
+                inventory.
+
+        Returns:
+            Nothing.
+        """
+
+        postings = defaultdict(list)
+        self.signature = signature
+        self.resources = []
+        self._unindexed = array('I')
+        number = 0
+        for resource_type in inventory:
+            resource_ids = []
+            for resource_id, resource in inventory[resource_type].items():
+                resource_ids.append(resource_id)
+                trigrams = self._resource_trigrams(resource)
+                if trigrams is None:
+                    self._unindexed.append(number)
+                else:
+                    for trigram in trigrams:
+                        postings[trigram].append(number)
+                number += 1
+            self.resources.append((resource_type, resource_ids))
+        self._postings = {
+            trigram: array('I', numbers)
+            for trigram, numbers in postings.items()
+        }
+        self.log.debug(
+            'Indexed {} trigrams of {} resources'.format(
+                len(self._postings),
+                number,
+            )
+        )
+
+    def _state(self):
+        """
+        Return the postings of the trigrams and the unindexed resources.
+
+        Returns:
+            dict: Data of the index.
+        """
+
+        return {'unindexed': self._unindexed, 'postings': self._postings}
+
+    def _set_state(self, index):
+        """
+        Set the postings of the trigrams and the unindexed resources loaded
+        from the index file.
+
+        Parameters:
+            index (dict): Data of the index file.
+
+        Returns:
+            Nothing.
+        """
+
+        self._unindexed = index['unindexed']
+        self._postings = index['postings']
+
+    def candidates(self, search_string):
+        """
+        Return the resources that may match a search, which are the ones that
+        have all the trigrams required by its regular expression, or all the
+        trigrams of the search string taken as a literal string, as some
+        searches compare it literally.
+
+        Parameters:
+            search_string (str): Regular expression of the search.
+
+        Returns:
+            dict: Ids of the candidate resources of each indexed type, in the
+            order they were indexed, or None if the search doesn't have enough
+            literal characters to use the index.
+        """
+
+        regexp_trigrams = self._regexp_trigrams(search_string)
+        literal_trigrams = self._literal_trigrams(search_string)
+        if regexp_trigrams == set() or literal_trigrams == set():
+            return None
+
+        numbers = sorted(
+            self._resources_with(regexp_trigrams)
+            | self._resources_with(literal_trigrams)
+            | set(self._unindexed)
+        )
+
+        return self._resource_ids(numbers)
+
+    def _fold(self, string):
+        """
+        Case fold a string, also mapping the non ASCII characters that a case
+        insensitive regular expression matches with an ASCII letter.
+
+        Parameters:
+            string (str): String to fold.
+
+        Returns:
+            str: Folded string.
+        """
+
+        return string.replace('\u0130', 'i') \
+            .replace('\u0131', 'i') \
+            .replace('\u017f', 's') \
+            .lower()
+
+    def _resource_trigrams(self, resource):
+        """
+        Return the trigrams of the values of a resource.
+
+        Parameters:
+            resource (ClinvGenericResource): Resource to index.
+
+        Returns:
+            set: Folded trigrams of the resource, or None if its values can't
+            be indexed.
+        """
+
+        try:
+            values = resource.search_values()
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            return None
+
+        strings = []
+        for value in values:
+            if value is None:
+                continue
+            if isinstance(value, str):
+                strings.append(value)
+            elif isinstance(value, (list, tuple)) and \
+                    all(isinstance(element, str) for element in value):
+                strings.extend(value)
+            else:
+                return None
+        return self._string_trigrams(strings)
+
+    def _string_trigrams(self, strings):
+        """
+        Return the folded trigrams of some strings.
+
+        Parameters:
+            strings (list): Strings to split.
+
+        Returns:
+            set: Trigrams of the strings.
+        """
+
+        text = self._fold('\n'.join(strings))
+        return {text[index:index + 3] for index in range(len(text) - 2)}
+
+    def _literal_runs(self, pattern, runs):
+        """
+        Add to runs the strings of consecutive ASCII literals that every match
+        of a parsed regular expression contains.
+
+        Only the literals that are always matched are taken: the ones outside
+        branches, optional repeats and lookarounds.
+
+        Parameters:
+            pattern (sre_parse.SubPattern): Parsed regular expression.
+            runs (list): Folded literal strings found.
+
+        Returns:
+            Nothing.
+        """
+
+        run = ''
+        for operation, argument in pattern:
+            if operation == sre_constants.LITERAL and argument < 128:
+                run += chr(argument).lower()
+                continue
+            runs.append(run)
+            run = ''
+            if operation == sre_constants.SUBPATTERN:
+                self._literal_runs(argument[-1], runs)
+            elif operation in [
+                sre_constants.MAX_REPEAT,
+                sre_constants.MIN_REPEAT,
+            ] and argument[0] >= 1:
+                self._literal_runs(argument[2], runs)
+        runs.append(run)
+
+    def _regexp_trigrams(self, search_string):
+        """
+        Return the trigrams that every match of a regular expression
+        contains.
+
+        Parameters:
+            search_string (str): Regular expression.
+
+        Returns:
+            set: Folded trigrams.
+        """
+
+        runs = []
+        self._literal_runs(sre_parse.parse(search_string), runs)
+        return self._run_trigrams(runs)
+
+    def _literal_trigrams(self, search_string):
+        """
+        Return the trigrams of the ASCII parts of a search string taken as a
+        literal string.
+
+        Parameters:
+            search_string (str): Search string.
+
+        Returns:
+            set: Folded trigrams.
+        """
+
+        return self._run_trigrams(
+            [run.lower() for run in re.split(r'[^\x00-\x7f]+', search_string)]
+        )
+
+    def _run_trigrams(self, runs):
+        """
+        Return the trigrams of some literal strings.
+
+        Parameters:
+            runs (list): Folded literal strings.
+
+        Returns:
+            set: Trigrams of the runs.
+        """
+
+        return {
+            run[index:index + 3]
+            for run in runs
+            for index in range(len(run) - 2)
+        }
+
+    def _resources_with(self, trigrams):
+        """
+        Return the resources that have all the trigrams.
+
+        Parameters:
+            trigrams (set): Folded trigrams.
+
+        Returns:
+            set: Numbers of the resources, their position in the index.
+        """
+
+        postings = []
+        for trigram in trigrams:
+            posting = self._postings.get(trigram)
+            if posting is None:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+
+        numbers = set(postings[0])
+        for posting in postings[1:]:
+            numbers.intersection_update(posting)
+            if numbers == set():
+                break
+        return numbers
+
+
+class IPIndex(ResourceIndex):
+    """
+    Index of the ip addresses of the resources, like the private and public
+    ips of the EC2 instances, the RDS endpoints or the values of the Route53
+    A and AAAA records. See the ip_addresses method of the resources.
+
+    The addresses of each ip version are stored sorted as integers, and the
+    addresses of a network are a contiguous range of them, so a network is
+    searched with two binary searches instead of going through all the
+    resources.
+
+    Parameters:
+        index_path (str): Path to the file of the index.
+
+    Public methods:
+        build: Index the resources of an inventory.
+        candidates: Return the resources that have an address in a network.
+
+    Internal methods:
+        _state: Return the addresses and their resources.
+        _set_state: Set the addresses and their resources.
+        _resource_addresses: Return the ip addresses of a resource.
+
+    Public attributes:
+        index_path (str): Path to the file of the index.
+        signature (object): Signature of the stored data the index was built
+            from, to check if the index is up to date.
+        resources (list): Pairs of the indexed types and the ids of their
+            resources, in the order they were indexed.
+        log (logging object):
+
+    Class attributes:
+        resource_types (list): Types of the resources that have ip addresses.
+    """
+
+    resource_types = ['ec2', 'rds', 'route53']
+
+    def __init__(self, index_path):
+        super().__init__(index_path)
+        self._addresses = {4: array('L'), 6: []}
+        self._numbers = {4: array('I'), 6: array('I')}
+
+    def build(self, inventory, signature=None):
+        """
+        Index the resources of an inventory.
+
+        Parameters:
+            inventory (Mapping): Resource objects of each type, with the type
+                as key, like Inventory.inv.
+            signature (object): Signature of the stored data of the
+                inventory.
+
+        Returns:
+            Nothing.
+        """
+
+        entries = {4: [], 6: []}
+        self.signature = signature
+        self.resources = []
+        number = 0
+        for resource_type in inventory:
+            resource_ids = []
+            for resource_id, resource in inventory[resource_type].items():
+                resource_ids.append(resource_id)
+                for address in self._resource_addresses(resource):
+                    entries[address.version].append((int(address), number))
+                number += 1
+            self.resources.append((resource_type, resource_ids))
+
+        for version, version_entries in entries.items():
+            version_entries.sort()
+            addresses = [address for address, _ in version_entries]
+            if version == 4:
+                addresses = array('L', addresses)
+            self._addresses[version] = addresses
+            self._numbers[version] = array(
+                'I',
+                [number for _, number in version_entries],
+            )
+        self.log.debug(
+            'Indexed {} ip addresses of {} resources'.format(
+                len(entries[4]) + len(entries[6]),
+                number,
+            )
+        )
+
+    def _state(self):
+        """
+        Return the sorted addresses of each ip version and their resources.
+
+        Returns:
+            dict: Data of the index.
+        """
+
+        return {'addresses': self._addresses, 'numbers': self._numbers}
+
+    def _set_state(self, index):
+        """
+        Set the sorted addresses of each ip version and their resources
+        loaded from the index file.
+
+        Parameters:
+            index (dict): Data of the index file.
+
+        Returns:
+            Nothing.
+        """
+
+        self._addresses = index['addresses']
+        self._numbers = index['numbers']
+
+    def candidates(self, network):
+        """
+        Return the resources that have an address in a network.
+
+        Parameters:
+            network (str or ipaddress.IPv4Network or IPv6Network): Network
+                in CIDR notation, like 10.12.0.0/16 or 2001:db8::/32. The
+                host bits are ignored.
+
+        Returns:
+            dict: Ids of the resources of each indexed type, in the order
+            they were indexed.
+        """
+
+        network = ipaddress.ip_network(network, strict=False)
+        addresses = self._addresses[network.version]
+        start = bisect_left(addresses, int(network.network_address))
+        end = bisect_right(addresses, int(network.broadcast_address))
+        return self._resource_ids(
+            sorted(set(self._numbers[network.version][start:end]))
+        )
+
+    def _resource_addresses(self, resource):
+        """
+        Return the ip addresses of a resource. The values that are not ip
+        addresses, like the hostnames of the RDS endpoints or the Route53
+        alias records, are skipped.
+
+        Parameters:
+            resource (ClinvGenericResource): Resource to index.
+
+        Returns:
+            list: ipaddress.IPv4Address or IPv6Address objects.
+        """
+
+        try:
+            values = list(resource.ip_addresses())
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            return []
+
+        addresses = []
+        for value in values:
+            try:
+                addresses.append(ipaddress.ip_address(value))
+            except ValueError:
+                continue
+        return addresses
+
+
+class FieldIndex(ResourceIndex):
+    """
+    Hash index of the values of the fields of the field queries that have few
+    distinct values, like the region or the state of the resources, so the
+    exact matches of those fields, like `state:running`, are looked up
+    instead of checked on every resource. See the field_values method of the
+    resources.
+
+    The values are case folded, like the matches of the field queries.
+
+    Parameters:
+        index_path (str): Path to the file of the index.
+
+    Public methods:
+        build: Index the resources of an inventory.
+        candidates: Return the resources that may have a value in a field.
+
+    Internal methods:
+        _state: Return the postings and the unindexed resources.
+        _set_state: Set the postings and the unindexed resources.
+        _resource_values: Return the indexed field values of a resource.
+
+    Public attributes:
+        index_path (str): Path to the file of the index.
+        signature (object): Signature of the stored data the index was built
+            from, to check if the index is up to date.
+        resources (list): Pairs of the indexed types and the ids of their
+            resources, in the order they were indexed.
+        log (logging object):
+
+    Class attributes:
+        indexed_fields (list): Fields whose values are indexed.
+    """
+
+    indexed_fields = ['instance_type', 'record_type', 'region', 'state']
+
+    def __init__(self, index_path):
+        super().__init__(index_path)
+        self._postings = {}
+        self._unindexed = array('I')
+
+    def build(self, inventory, signature=None):
+        """
+        Index the resources of an inventory.
+
+        The resources whose values can't be read are not indexed, and they're
+        always returned as candidates.
+
+        Parameters:
+            inventory (Mapping): Resource objects of each type, with the type
+                as key, like Inventory.inv.
+            signature (object): Signature of the stored data of the
+                inventory.
+
+        Returns:
+            Nothing.
+        """
+
+        postings = {field: defaultdict(list) for field in self.indexed_fields}
+        self.signature = signature
+        self.resources = []
+        self._unindexed = array('I')
+        number = 0
+        for resource_type in inventory:
+            resource_ids = []
+            for resource_id, resource in inventory[resource_type].items():
+                resource_ids.append(resource_id)
+                values = self._resource_values(resource)
+                if values is None:
+                    self._unindexed.append(number)
+                else:
+                    for field, value in values.items():
+                        postings[field][value].append(number)
+                number += 1
+            self.resources.append((resource_type, resource_ids))
+        self._postings = {
+            field: {
+                value: array('I', numbers)
+                for value, numbers in field_postings.items()
+            }
+            for field, field_postings in postings.items()
+        }
+        self.log.debug('Indexed the fields of {} resources'.format(number))
+
+    def _state(self):
+        """
+        Return the postings of the field values and the unindexed resources.
+
+        Returns:
+            dict: Data of the index.
+        """
+
+        return {'unindexed': self._unindexed, 'postings': self._postings}
+
+    def _set_state(self, index):
+        """
+        Set the postings of the field values and the unindexed resources
+        loaded from the index file.
+
+        Parameters:
+            index (dict): Data of the index file.
+
+        Returns:
+            Nothing.
+        """
+
+        self._unindexed = index['unindexed']
+        self._postings = index['postings']
+
+    def candidates(self, field, value):
+        """
+        Return the resources that may have a value in a field.
+
+        Parameters:
+            field (str): Field of the field queries, one of indexed_fields.
+            value (str): Value of the field.
+
+        Returns:
+            dict: Ids of the candidate resources of each indexed type, in the
+            order they were indexed.
+        """
+
+        numbers = self._postings[field].get(value.lower(), array('I'))
+        if len(self._unindexed) > 0:
+            numbers = sorted(set(numbers) | set(self._unindexed))
+        return self._resource_ids(numbers)
+
+    def _resource_values(self, resource):
+        """
+        Return the indexed field values of a resource.
+
+        Parameters:
+            resource (ClinvGenericResource): Resource to index.
+
+        Returns:
+            dict: Folded value of each indexed field that the resource has,
+            or None if its values can't be indexed.
+        """
+
+        try:
+            values = resource.field_values()
+            if not isinstance(values, dict):
+                return None
+            return {
+                field: values[field].lower()
+                for field in self.indexed_fields
+                if isinstance(values.get(field), str)
+            }
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
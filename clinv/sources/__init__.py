@@ -5,6 +5,8 @@ Classes:
     ClinvSourcesrc: Class to gather the common methods for the Clinv sources.
     ClinvGenericResource: Abstract class to gather common method and attributes
         for all Clinv resources.
+    SearchQuery: Regular expression of a search, compiled once for all the
+        resources.
 """
 
 import logging
@@ -27,14 +29,38 @@ class ClinvSourcesrc():
         self.log = logging.getLogger('main')
 
 
+class SearchQuery():
+    """
+    Regular expression of a search, compiled once with and without case
+    sensitivity so the resources don't compile it again for each field they
+    match.
+
+    Parameters:
+        search_string (str): Regular expression to search.
+
+    Public attributes:
+        search_string (str): Regular expression to search.
+        regexp (re.Pattern): Case sensitive compiled regular expression.
+        iregexp (re.Pattern): Case insensitive compiled regular expression.
+    """
+
+    def __init__(self, search_string):
+        self.search_string = search_string
+        self.regexp = re.compile(search_string)
+        self.iregexp = re.compile(search_string, re.IGNORECASE)
+
+
 class ClinvGenericResource():
     """
     Abstract class to gather common method and attributes for all Clinv
     resources.
 
     Public methods:
+        field_values: Return the values of the fields of the field queries.
+        ip_addresses: Return the ip addresses of the resource.
         print: Prints information of the resource
         search: Search in the resource data if a string matches.
+        search_values: Return the values that the search method matches.
         short_print: Print the id and name of the resource.
         state: Returns the state of the resource.
         to_destroy: Returns if the resource must be destroyed.
@@ -42,8 +68,20 @@ class ClinvGenericResource():
     Public properties:
         description: Returns the description of the resource.
         name: Returns the name of the resource.
+
+    Class attributes:
+        search_fields (dict): Property of the resource that each field of the
+            field queries of the search matches, like `state:running`. The
+            subclasses extend it with their own properties.
+
+    The resources only store their id and raw data, declared in __slots__ so
+    they don't need a per instance __dict__. The subclasses must declare their
+    own __slots__ to keep it that way, empty unless they add attributes.
     """
 
+    __slots__ = ('id', 'raw')
+    search_fields = {'name': 'name', 'state': 'state'}
+
     def __init__(self, raw_data):
         """
         Sets attributes for the object.
@@ -155,20 +193,37 @@ class ClinvGenericResource():
 
         return value
 
+    def _search_query(self, search_string):
+        """
+        Return the compiled query of a search.
+
+        Parameters:
+            search_string (str|SearchQuery): Regular expression to search, or
+                its already compiled query.
+
+        Returns:
+            SearchQuery: Compiled query.
+        """
+
+        if isinstance(search_string, SearchQuery):
+            return search_string
+        return SearchQuery(search_string)
+
     def _match_list(self, search_term, list_to_search):
         """
         Check if regular expression matches the contents of a list.
 
         Parameters:
-            search_term (str): Regular expression to search.
+            search_term (str|SearchQuery): Regular expression to search.
             list_to_search (list): List to perform the list
 
         Returns:
             bool: If it matches.
         """
 
+        query = self._search_query(search_term)
         for element in list_to_search:
-            if re.match(search_term, element, re.IGNORECASE):
+            if query.iregexp.match(element):
                 return True
         return False
 
@@ -227,28 +282,69 @@ class ClinvGenericResource():
             description
 
         Parameters:
-            search_string (str): Regular expression to match with the
-                resource data.
+            search_string (str|SearchQuery): Regular expression to match with
+                the resource data, or its compiled query.
 
         Returns:
             bool: If the search_string matches resource data.
         """
 
+        query = self._search_query(search_string)
+
         # Search by id
-        if re.match(search_string, self.id):
+        if query.regexp.match(self.id):
             return True
 
         # Search by name
-        if self.name is not None and \
-                re.match(search_string, self.name, re.IGNORECASE):
+        if self.name is not None and query.iregexp.match(self.name):
             return True
 
         # Search by description
-        if re.match(search_string, self.description, re.IGNORECASE):
+        if query.iregexp.match(self.description):
             return True
 
         return False
 
+    def search_values(self):
+        """
+        Return the values that the search method matches, used to index
+        the resource.
+
+        Returns:
+            list: Values of the resource, each one a string, a list of
+            strings or None.
+        """
+
+        return [self.id, self.name, self.description]
+
+    def field_values(self):
+        """
+        Return the values of the fields that the field queries of the search
+        match, the id of the resource and the properties of search_fields.
+
+        Returns:
+            dict: Value of each field, or None if the resource doesn't have
+            it.
+        """
+
+        values = {'id': self.id}
+        for field, attribute in self.search_fields.items():
+            try:
+                values[field] = getattr(self, attribute)
+            except (KeyError, TypeError, ValueError):
+                values[field] = None
+        return values
+
+    def ip_addresses(self):
+        """
+        Return the ip addresses of the resource, used to search it by network.
+
+        Returns:
+            list: Ip addresses of the resource, as strings.
+        """
+
+        return []
+
     def short_print(self):
         """
         Do aggregation of data to print the id and name of the resource.
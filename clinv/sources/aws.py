@@ -2,7 +2,10 @@
 Module to store the AWS sources used by Clinv.
 
 Classes:
+    AWSThrottler: Class to limit the rate of the AWS API calls of each service
+        and to retry the throttled ones.
     AWSBasesrc: Class to gather the common methods for the AWS sources.
+    IAMBasesrc: Class to gather the common methods for the IAM sources.
     Route53src: Class to gather and manipulate the AWS Route53 resources.
     RDSsrc: Class to gather and manipulate the AWS RDS resources.
 
@@ -16,40 +19,931 @@ Classes:
         attributes for the Route53 resources.
 """
 
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
 from clinv.sources import ClinvSourcesrc, ClinvGenericResource
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
+from yaml import YAMLError
 import boto3
+import logging
+import os
+import pickle
+import random
 import re
+import threading
+import time
+import yaml
+
+
+class AWSThrottler():
+    """
+    Class to limit the rate of the AWS API calls of each service and to retry
+    the throttled ones.
+
+    Each AWS service has its own token bucket, shared by all the clients and
+    threads of that service. A request waits until there is a token
+    available, and if AWS throttles it anyway, the rate of the service is
+    halved and the request is retried after a jittered exponential backoff.
+    Each successful request increases the rate again until it reaches the
+    maximum rate of the service.
+
+    The maximum rate of a service is max_rate, or its value in service_rates
+    if it's lower, for the services whose AWS limit is below the default
+    one, like Route53 which allows only 5 requests per second per account.
+
+    The requests that fail with a transient error, like a connection error
+    or an internal error of AWS, are retried with the same backoff without
+    changing the rate.
+
+    The throttler works through the before-send and needs-retry events of
+    the registered boto3 clients, so it applies to each request sent by the
+    client, both the API calls and the page requests of the paginators. The
+    retries of the boto3 clients must be disabled, so that the throttled
+    requests are only retried by the throttler.
+
+    Parameters:
+        max_rate (float): Maximum number of requests per second of each
+            service.
+        max_retries (int): Maximum number of retries of a throttled request.
+        max_attempts (int): Maximum number of retries of a request that
+            fails with a transient error.
+        service_rates (dict): Maximum number of requests per second of the
+            services with a lower limit, with the service name as key.
+
+    Public methods:
+        register: Make the requests of a client go through the throttler.
+        log_stats: Log the throttled calls and waited time of each service.
+
+    Internal methods:
+        _before_send: Wait for a token before a request is sent.
+        _needs_retry: Return the seconds to wait before retrying a request.
+        _max_rate: Return the maximum rate of a service.
+        _acquire: Wait until the service has a token available.
+        _throttled: Adapt the rate of the service after a throttled request.
+        _succeeded: Adapt the rate of the service after a successful request.
+        _backoff: Return the seconds to wait before retrying a request.
+        _is_throttling: Check if an error is a throttling one.
+        _is_transient: Check if an error is a transient one.
+
+    Public attributes:
+        max_rate (float): Maximum number of requests per second of each
+            service, and size of its token bucket.
+        max_retries (int): Maximum number of retries of a throttled request.
+        max_attempts (int): Maximum number of retries of a request that
+            fails with a transient error.
+        service_rates (dict): Maximum number of requests per second of the
+            services with a lower limit, with the service name as key.
+        stats (dict): Counters of each service with the following structure:
+            {
+                'ec2': {
+                    'calls': 10,
+                    'throttles': 1,
+                    'wait_time': 1.5,
+                },
+            }
+        log (logging object):
+
+    Class attributes:
+        throttling_codes (set): Error codes that AWS returns when a request is
+            throttled.
+        transient_codes (set): Error codes that AWS returns when a request
+            fails due to a transient error.
+        transient_errors (tuple): botocore errors raised when a request fails
+            due to a transient connection error.
+        min_rate (float): Minimum number of requests per second of each
+            service.
+        rate_increase (float): Requests per second added to the rate of a
+            service after each successful request.
+        backoff_base (float): Seconds of the first backoff.
+        backoff_cap (float): Maximum seconds of a backoff.
+    """
+
+    throttling_codes = {
+        'BandwidthLimitExceeded',
+        'EC2ThrottledException',
+        'PriorRequestNotComplete',
+        'ProvisionedThroughputExceededException',
+        'RequestLimitExceeded',
+        'RequestThrottled',
+        'RequestThrottledException',
+        'SlowDown',
+        'ThrottledException',
+        'Throttling',
+        'ThrottlingException',
+        'TooManyRequestsException',
+    }
+    transient_codes = {
+        'InternalError',
+        'InternalFailure',
+        'RequestTimeout',
+        'RequestTimeoutException',
+        'ServiceUnavailable',
+    }
+    transient_errors = (BotoConnectionError, HTTPClientError)
+    min_rate = 0.5
+    rate_increase = 0.1
+    backoff_base = 0.5
+    backoff_cap = 20
+
+    def __init__(
+        self,
+        max_rate=20,
+        max_retries=8,
+        max_attempts=5,
+        service_rates=None,
+    ):
+        self.max_rate = max_rate
+        self.max_retries = max_retries
+        self.max_attempts = max_attempts
+        self.service_rates = service_rates or {}
+        self.stats = {}
+        self.log = logging.getLogger('main')
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def register(self, service, client):
+        """
+        Make the requests of a boto3 client go through the throttler, by
+        handling its before-send and needs-retry events. The events of each
+        client are independent, so only the requests of this client are
+        affected.
+
+        Parameters:
+            service (str): AWS service name, for example 'ec2'.
+            client (boto3 client): Client of the service.
+
+        Returns:
+            boto3 client: The same client.
+        """
+
+        client.meta.events.register(
+            'before-send',
+            lambda **kwargs: self._before_send(service, **kwargs),
+        )
+        client.meta.events.register(
+            'needs-retry',
+            lambda **kwargs: self._needs_retry(service, **kwargs),
+        )
+        return client
+
+    def log_stats(self):
+        """
+        Log the number of calls, throttled calls and seconds spent waiting of
+        each service, to help to tune the concurrency of generate.
+
+        Returns:
+            Nothing.
+        """
+
+        for service in sorted(self.stats.keys()):
+            stats = self.stats[service]
+            message = '{}: {} calls, {} throttled, {:.2f}s waiting'.format(
+                service,
+                stats['calls'],
+                stats['throttles'],
+                stats['wait_time'],
+            )
+            if stats['throttles'] > 0:
+                self.log.warning(message)
+            else:
+                self.log.info(message)
+
+    def _before_send(self, service, **kwargs):
+        """
+        Handle the before-send event of a client, emitted before each
+        attempt of a request, waiting until the service has a token
+        available.
+
+        Parameters:
+            service (str): AWS service name, for example 'ec2'.
+            **kwargs: Arguments of the event.
+
+        Returns:
+            None: So botocore sends the request.
+        """
+
+        self._acquire(service)
+        return None
+
+    def _needs_retry(
+        self,
+        service,
+        response=None,
+        caught_exception=None,
+        request_dict=None,
+        **kwargs
+    ):
+        """
+        Handle the needs-retry event of a client, emitted after each attempt
+        of a request, to adapt the rate of the service and decide if the
+        request is retried.
+
+        The throttled requests are retried up to max_retries times, and the
+        ones that failed with a transient error up to max_attempts times.
+        The retries of each kind are counted in the context of the request,
+        which is kept between its attempts.
+
+        Parameters:
+            service (str): AWS service name, for example 'ec2'.
+            response (tuple): HTTP response and parsed response of the
+                attempt, or None if it raised an exception.
+            caught_exception (Exception): Exception raised by the attempt, or
+                None if AWS answered.
+            request_dict (dict): Request, with its context.
+            **kwargs: Other arguments of the event.
+
+        Returns:
+            float: Seconds to wait before retrying the request, or None if
+            it's not retried.
+        """
+
+        context = request_dict['context']
+        if caught_exception is not None:
+            if not isinstance(caught_exception, self.transient_errors):
+                return None
+            throttled = False
+        else:
+            http_response, parsed = response
+            code = parsed.get('Error', {}).get('Code')
+            status = http_response.status_code
+            if code is None and status < 300:
+                self._succeeded(service)
+                return None
+            throttled = self._is_throttling(code)
+            if not throttled and not self._is_transient(code, status):
+                return None
+
+        if throttled:
+            self._throttled(service)
+            if context.get('clinv_throttles', 0) >= self.max_retries:
+                return None
+            context['clinv_throttles'] = context.get('clinv_throttles', 0) + 1
+        else:
+            if context.get('clinv_failures', 0) >= self.max_attempts:
+                return None
+            context['clinv_failures'] = context.get('clinv_failures', 0) + 1
+
+        backoff = self._backoff(
+            context.get('clinv_throttles', 0) +
+            context.get('clinv_failures', 0) - 1
+        )
+        with self._lock:
+            self.stats[service]['wait_time'] += backoff
+        return backoff
+
+    def _max_rate(self, service):
+        """
+        Return the maximum number of requests per second of the service, and
+        size of its token bucket.
+
+        Parameters:
+            service (str): AWS service name, for example 'ec2'.
+
+        Returns:
+            float: Maximum rate of the service.
+        """
+
+        return min(
+            self.max_rate,
+            self.service_rates.get(service, self.max_rate),
+        )
+
+    def _acquire(self, service):
+        """
+        Take a token of the service bucket, waiting until there is one
+        available.
+
+        The token is reserved under the lock and the wait is done outside of
+        it, so the threads of other services are not blocked.
+
+        Parameters:
+            service (str): AWS service name, for example 'ec2'.
+
+        Returns:
+            Nothing.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            max_rate = self._max_rate(service)
+            try:
+                bucket = self._buckets[service]
+            except KeyError:
+                bucket = {
+                    'rate': max_rate,
+                    'tokens': max_rate,
+                    'last_refill': now,
+                }
+                self._buckets[service] = bucket
+                self.stats[service] = {
+                    'calls': 0,
+                    'throttles': 0,
+                    'wait_time': 0,
+                }
+
+            bucket['tokens'] = min(
+                max_rate,
+                bucket['tokens'] +
+                (now - bucket['last_refill']) * bucket['rate'],
+            )
+            bucket['last_refill'] = now
+            bucket['tokens'] -= 1
+            wait = max(0, -bucket['tokens'] / bucket['rate'])
+            self.stats[service]['calls'] += 1
+            self.stats[service]['wait_time'] += wait
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def _throttled(self, service):
+        """
+        Halve the rate of the service after AWS throttled one of its
+        requests.
+
+        Parameters:
+            service (str): AWS service name, for example 'ec2'.
+
+        Returns:
+            Nothing.
+        """
+
+        with self._lock:
+            bucket = self._buckets[service]
+            bucket['rate'] = max(self.min_rate, bucket['rate'] / 2)
+            self.stats[service]['throttles'] += 1
+
+    def _succeeded(self, service):
+        """
+        Increase the rate of the service after a successful request, up to
+        its maximum rate.
+
+        Parameters:
+            service (str): AWS service name, for example 'ec2'.
+
+        Returns:
+            Nothing.
+        """
+
+        with self._lock:
+            bucket = self._buckets[service]
+            bucket['rate'] = min(
+                self._max_rate(service),
+                bucket['rate'] + self.rate_increase,
+            )
+
+    def _is_throttling(self, code):
+        """
+        Check if the error code of a request means that AWS throttled it.
+
+        Parameters:
+            code (str): Error code of the response.
+
+        Returns:
+            bool: If the request was throttled.
+        """
+
+        return code in self.throttling_codes
+
+    def _is_transient(self, code, status):
+        """
+        Check if the error of a request is a transient one that may not
+        happen again, like an internal error of AWS.
+
+        Parameters:
+            code (str): Error code of the response.
+            status (int): HTTP status code of the response.
+
+        Returns:
+            bool: If the request may succeed if it's retried.
+        """
+
+        return code in self.transient_codes or status >= 500
+
+    def _backoff(self, attempt):
+        """
+        Return the seconds to wait before retrying a request, using an
+        exponential backoff with full jitter.
+
+        Parameters:
+            attempt (int): Number of retries already done.
+
+        Returns:
+            float: Seconds to wait.
+        """
+
+        return random.uniform(
+            0,
+            min(self.backoff_cap, self.backoff_base * 2 ** attempt),
+        )
 
 
 class AWSBasesrc(ClinvSourcesrc):
     """
     Class to gather the common methods for the AWS sources.
 
+    The settings and caches that need to be shared by all the AWS sources
+    during a generate are stored as class attributes, and are set with the
+    configure class method.
+
+    The resources built by generate_inventory see their user data layered
+    over their source data with a ChainMap, so neither is copied nor
+    modified, and the saved source data doesn't store the user data again.
+
+    Public class methods:
+        configure: Set the AWS settings and reset the shared caches.
+        log_throttling_stats: Log the throttling counters of each service.
+
     Public properties:
         regions (list): List of the AWS regions.
 
+    Internal methods:
+        _client: Return the shared client of a service and region.
+        _discover_regions: Fetch the AWS regions enabled in the account.
+        _load_region_cache: Load the AWS regions from the disk cache.
+        _save_region_cache: Save the AWS regions to the disk cache.
+        _fetch_regions: Fetch the resources of all the regions concurrently.
+        _region_checkpoint_path: Return the path of a region checkpoint.
+        _load_region_checkpoint: Load the resources of a region from its
+            checkpoint.
+        _save_region_checkpoint: Save the resources of a region to its
+            checkpoint.
+        _write_file: Write the content of a file atomically.
+        _paginate: Iterate over the pruned elements of a paginated operation.
+        _prune: Remove the unneeded keys of a resource.
+
     Public attributes:
         source_data (dict): Aggregated source supplied data.
         user_data (dict): Aggregated user supplied data.
         log (logging object):
+        max_region_workers (int): Maximum number of regions fetched at the
+            same time. By default, is set to None to fetch all the regions
+            at once.
+        region_errors (dict): Errors of the regions that failed in the last
+            fetch, with the region as key and the error message as value.
+
+    Class attributes:
+        default_settings (dict): Default values of the AWS settings.
+        settings (dict): AWS settings shared by all the AWS sources:
+            regions (list): Allowlist of regions to fetch. If None, all the
+                regions enabled in the account are fetched.
+            region_cache_path (str): Path to the file where the regions are
+                cached.
+            region_cache_ttl (int): Seconds the cached regions are valid. If
+                0, the disk cache is not used.
+            max_pool_connections (int): Maximum number of HTTPS connections
+                kept open by each client.
+            max_attempts (int): Maximum number of retries of an API call
+                that fails with a transient error.
+            max_request_rate (float): Maximum number of API calls per second
+                of each service.
+            throttle_retries (int): Maximum number of retries of a
+                throttled call.
+            route53_request_rate (float): Maximum number of Route53 API
+                calls per second, as AWS allows only 5 per account.
+            max_zone_workers (int): Maximum number of Route53 hosted zones
+                fetched at the same time.
+            checkpoint_dir (str): Path to the directory where the resources
+                of each region are saved as soon as they are fetched. If
+                None, the regions are not checkpointed.
+            resume (bool): Load the regions that have a checkpoint instead of
+                fetching them again.
     """
 
+    default_settings = {
+        'regions': None,
+        'region_cache_path': None,
+        'region_cache_ttl': 0,
+        'max_pool_connections': 20,
+        'max_attempts': 5,
+        'max_request_rate': 20,
+        'throttle_retries': 8,
+        'route53_request_rate': 5,
+        'max_zone_workers': 4,
+        'checkpoint_dir': None,
+        'resume': False,
+    }
+    settings = dict(default_settings)
+    _regions = None
+    _authorization_details = None
+    _session = None
+    _clients = {}
+    _throttler = AWSThrottler()
+    _lock = threading.Lock()
+    _iam_lock = threading.Lock()
+    _client_lock = threading.Lock()
+
     def __init__(self, source_data={}, user_data={}):
         super().__init__(source_data, user_data)
+        self.max_region_workers = None
+        self.region_errors = {}
+
+    @classmethod
+    def configure(cls, **settings):
+        """
+        Set the AWS settings shared by all the AWS sources, and reset the
+        shared caches so they are filled again on the next access.
+
+        Parameters:
+            **settings: Values of the AWS settings to change, see the
+                default_settings class attribute for the supported ones.
+
+        Returns:
+            Nothing.
+        """
+
+        for setting in settings.keys():
+            if setting not in AWSBasesrc.default_settings:
+                raise TypeError('Unknown AWS setting {}'.format(setting))
+
+        with AWSBasesrc._lock, AWSBasesrc._iam_lock, AWSBasesrc._client_lock:
+            AWSBasesrc.settings = {**AWSBasesrc.default_settings, **settings}
+            AWSBasesrc._regions = None
+            AWSBasesrc._authorization_details = None
+            AWSBasesrc._session = None
+            AWSBasesrc._clients = {}
+            AWSBasesrc._throttler = AWSThrottler(
+                max_rate=AWSBasesrc.settings['max_request_rate'],
+                max_retries=AWSBasesrc.settings['throttle_retries'],
+                max_attempts=AWSBasesrc.settings['max_attempts'],
+                service_rates={
+                    'route53': AWSBasesrc.settings['route53_request_rate'],
+                },
+            )
+
+    @classmethod
+    def log_throttling_stats(cls):
+        """
+        Log the number of calls, throttled calls and seconds spent waiting of
+        each AWS service since the last configure call.
+
+        Returns:
+            Nothing.
+        """
+
+        AWSBasesrc._throttler.log_stats()
+
+    def _client(self, service, region=None):
+        """
+        Return the client of a service and region.
+
+        The clients are created from a single boto3 session and cached by
+        (service, region), so the sources share the loaded service models and
+        the pools of HTTPS connections. boto3 clients are thread safe, but the
+        creation of the clients is not, so it's done under a lock.
+
+        The clients are registered in the shared AWSThrottler, so the
+        requests of all the sources share the rate limit of their service.
+        The botocore retries are disabled, so the throttled and failed
+        requests are retried only by the throttler, which counts and adapts
+        to the throttles.
+
+        Parameters:
+            service (str): AWS service name, for example 'ec2'.
+            region (str): AWS region name. By default, is set to None to use
+                the default region of the AWS configuration.
+
+        Returns:
+            boto3 client: Client of the service and region.
+        """
+
+        with AWSBasesrc._client_lock:
+            if AWSBasesrc._session is None:
+                AWSBasesrc._session = boto3.session.Session()
+
+            try:
+                return AWSBasesrc._clients[(service, region)]
+            except KeyError:
+                config = Config(
+                    max_pool_connections=self.settings['max_pool_connections'],
+                    retries={'max_attempts': 0},
+                )
+                client = AWSBasesrc._throttler.register(
+                    service,
+                    AWSBasesrc._session.client(
+                        service,
+                        region_name=region,
+                        config=config,
+                    ),
+                )
+                AWSBasesrc._clients[(service, region)] = client
+                return client
 
     @property
     def regions(self):
         """
         Do aggregation of the AWS regions to generate the self.regions list.
 
+        If the regions setting is set, it's used instead of asking AWS.
+        Otherwise the enabled regions are discovered once and shared by all
+        the AWS sources until the next configure call.
+
         Returns:
             list: AWS Regions.
         """
-        ec2 = boto3.client('ec2')
-        return [
-            region['RegionName']
-            for region in ec2.describe_regions()['Regions']
-        ]
+
+        with AWSBasesrc._lock:
+            if AWSBasesrc._regions is None:
+                if self.settings['regions'] is not None:
+                    AWSBasesrc._regions = list(self.settings['regions'])
+                else:
+                    AWSBasesrc._regions = self._discover_regions()
+            return AWSBasesrc._regions
+
+    def _discover_regions(self):
+        """
+        Fetch the AWS regions enabled in the account, using the disk cache if
+        it's still valid.
+
+        Returns:
+            list: AWS Regions.
+        """
+
+        regions = self._load_region_cache()
+        if regions is None:
+            ec2 = self._client('ec2')
+            regions = [
+                region['RegionName']
+                for region in ec2.describe_regions()['Regions']
+            ]
+            self._save_region_cache(regions)
+        return regions
+
+    def _load_region_cache(self):
+        """
+        Load the AWS regions from the region_cache_path file if the disk
+        cache is enabled and the cache is younger than region_cache_ttl.
+
+        Returns:
+            list: AWS Regions, or None if there is no valid cache.
+        """
+
+        cache_path = self.settings['region_cache_path']
+        if cache_path is None or self.settings['region_cache_ttl'] <= 0:
+            return None
+
+        try:
+            with open(os.path.expanduser(cache_path), 'r') as f:
+                cache = yaml.safe_load(f)
+            if time.time() - cache['fetch_time'] < \
+                    self.settings['region_cache_ttl']:
+                return cache['regions']
+        except (FileNotFoundError, KeyError, TypeError, YAMLError):
+            pass
+        return None
+
+    def _save_region_cache(self, regions):
+        """
+        Save the AWS regions to the region_cache_path file if the disk cache
+        is enabled. The file is written atomically, so an interrupted
+        generate doesn't leave a truncated cache.
+
+        Parameters:
+            regions (list): AWS Regions.
+
+        Returns:
+            Nothing.
+        """
+
+        cache_path = self.settings['region_cache_path']
+        if cache_path is None or self.settings['region_cache_ttl'] <= 0:
+            return
+
+        self._write_file(
+            os.path.expanduser(cache_path),
+            yaml.dump(
+                {'fetch_time': time.time(), 'regions': regions},
+                default_flow_style=False,
+            ).encode('utf-8'),
+        )
+
+    def _fetch_regions(self, fetch_region, service=None):
+        """
+        Run fetch_region for each AWS region on a bounded thread pool and merge
+        the results with the following structure:
+        {
+            'us-east-1': fetch_region('us-east-1'),
+            'eu-west-1': fetch_region('eu-west-1'),
+        }
+
+        If a region fails, the error is logged and saved in
+        self.region_errors, and the region keeps the data of the previous
+        self.source_data if there was any, so one bad region doesn't abort
+        the whole fetch.
+
+        If the checkpoint_dir setting is set, the resources of each region
+        are checkpointed as soon as they are fetched, and with the resume
+        setting the checkpointed regions are loaded instead of fetched.
+
+        If service is set, the clients of that service are created for each
+        region before submitting the work, so the worker threads only use
+        already created clients.
+
+        Parameters:
+            fetch_region (function): Function that receives a region name and
+                returns the resources of that region.
+            service (str): AWS service name of the clients used by
+                fetch_region. By default, is set to None to not create them
+                beforehand.
+
+        Returns:
+            dict: Resources of each region.
+        """
+
+        regions = self.regions
+        previous_source_data = self.source_data
+        source_data = {}
+        self.region_errors = {}
+
+        if len(regions) == 0:
+            return source_data
+
+        def fetch_and_checkpoint_region(region):
+            if self.settings['resume']:
+                region_data = self._load_region_checkpoint(region)
+                if region_data is not None:
+                    return region_data
+            region_data = fetch_region(region)
+            self._save_region_checkpoint(region, region_data)
+            return region_data
+
+        if service is not None:
+            for region in regions:
+                self._client(service, region)
+
+        max_workers = self.max_region_workers or len(regions)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(fetch_and_checkpoint_region, region)
+                for region in regions
+            ]
+
+        for region, future in zip(regions, futures):
+            try:
+                source_data[region] = future.result()
+            except (BotoCoreError, ClientError) as e:
+                self.log.error(
+                    'Error fetching {} inventory of region {}: {}'.format(
+                        self.id,
+                        region,
+                        e,
+                    )
+                )
+                self.region_errors[region] = str(e)
+                try:
+                    source_data[region] = previous_source_data[region]
+                except KeyError:
+                    pass
+
+        return source_data
+
+    def _region_checkpoint_path(self, region):
+        """
+        Return the path of the checkpoint of a region of this source.
+
+        Parameters:
+            region (str): AWS region name.
+
+        Returns:
+            str: Path of the checkpoint, or None if the checkpoints are
+            disabled.
+        """
+
+        checkpoint_dir = self.settings['checkpoint_dir']
+        if checkpoint_dir is None:
+            return None
+
+        return os.path.join(
+            os.path.expanduser(checkpoint_dir),
+            self.id,
+            '{}.pickle'.format(region),
+        )
+
+    def _load_region_checkpoint(self, region):
+        """
+        Load the resources of a region from its checkpoint.
+
+        Parameters:
+            region (str): AWS region name.
+
+        Returns:
+            list: Resources of the region, or None if there is no valid
+            checkpoint.
+        """
+
+        checkpoint_path = self._region_checkpoint_path(region)
+        if checkpoint_path is None:
+            return None
+
+        try:
+            with open(checkpoint_path, 'rb') as f:
+                return pickle.load(f)['region_data']
+        except (
+            AttributeError,
+            EOFError,
+            ImportError,
+            KeyError,
+            OSError,
+            TypeError,
+            pickle.UnpicklingError,
+        ):
+            return None
+
+    def _save_region_checkpoint(self, region, region_data):
+        """
+        Save the resources of a region to its checkpoint.
+
+        The checkpoints are only read back by clinv, so they are pickled,
+        which is much faster than dumping them to yaml. They are written
+        atomically, so an interrupted generate never leaves a truncated
+        checkpoint.
+
+        Parameters:
+            region (str): AWS region name.
+            region_data (list): Resources of the region.
+
+        Returns:
+            Nothing.
+        """
+
+        checkpoint_path = self._region_checkpoint_path(region)
+        if checkpoint_path is None:
+            return
+
+        os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+        self._write_file(
+            checkpoint_path,
+            pickle.dumps(
+                {'region_data': region_data},
+                protocol=pickle.HIGHEST_PROTOCOL,
+            ),
+        )
+
+    def _write_file(self, file_path, content):
+        """
+        Write the content of a file to a temporary file, flush it to disk and
+        rename it over the file, so a crash while writing leaves either the
+        old or the new file, never a truncated one.
+
+        Parameters:
+            file_path (str): Path to the file to write.
+            content (bytes): Content of the file.
+
+        Returns:
+            Nothing.
+        """
+
+        with open(file_path + '.tmp', 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(file_path + '.tmp', file_path)
+
+    def _paginate(self, client, operation, result_key, prune=None, **kwargs):
+        """
+        Iterate over the elements of all the pages of a paginated AWS
+        operation.
+
+        Each page is pruned as it arrives, so the memory needed depends on
+        the page size and the pruned elements rather than on the raw
+        responses.
+
+        Parameters:
+            client (boto3 client): Client of the service.
+            operation (str): Name of the paginated operation, for example
+                'describe_instances'.
+            result_key (str): Key of the page with the list of elements, for
+                example 'Reservations'.
+            prune (function): Optional function that receives an element and
+                removes the unneeded information in place.
+            **kwargs: Arguments of the operation.
+
+        Returns:
+            generator: Pruned elements of the operation.
+        """
+
+        paginator = client.get_paginator(operation)
+        for page in paginator.paginate(**kwargs):
+            for element in page[result_key]:
+                if prune is not None:
+                    prune(element)
+                yield element
+
+    def _prune(self, resource, prune_keys):
+        """
+        Remove the prune_keys from the resource dictionary.
+
+        Parameters:
+            resource (dict): Resource information.
+            prune_keys (list): Keys to remove.
+
+        Returns:
+            Nothing.
+        """
+
+        for prune_key in prune_keys:
+            resource.pop(prune_key, None)
 
 
 class EC2src(AWSBasesrc):
@@ -68,16 +962,70 @@ class EC2src(AWSBasesrc):
         generate_inventory: Generates the inventory dictionary with the source
             resource.
 
+    Internal methods:
+        _fetch_region: Fetch the resources of a region.
+        _prune_reservation: Remove the unneeded information of a reservation.
+
     Public attributes:
         id (str): ID of the resource.
+        resource_obj (class): Class of the resources of the source.
         source_data (dict): Aggregated source supplied data.
         user_data (dict): Aggregated user supplied data.
         log (logging object):
+
+    Class attributes:
+        prune_keys (list): Keys of the instances that are not stored in the
+            source data.
+        network_prune_keys (list): Keys of the instance network interfaces
+            that are not stored in the source data.
     """
 
+    prune_keys = [
+        'AmiLaunchIndex',
+        'Architecture',
+        'BlockDeviceMappings',
+        'CapacityReservationSpecification',
+        'ClientToken',
+        'CpuOptions',
+        'EbsOptimized',
+        'HibernationOptions',
+        'Hypervisor',
+        'KeyName',
+        'Monitoring',
+        'Placement',
+        'PrivateDnsName',
+        'PrivateIpAddress',
+        'ProductCodes',
+        'PublicDnsName',
+        'PublicIpAddress',
+        'RootDeviceName',
+        'RootDeviceType',
+        'SourceDestCheck',
+        'SubnetId',
+        'VirtualizationType',
+    ]
+    network_prune_keys = [
+        'Association',
+        'Attachment',
+        'Description',
+        'Groups',
+        'InterfaceType',
+        'Ipv6Addresses',
+        'MacAddress',
+        'NetworkInterfaceId',
+        'OwnerId',
+        'PrivateDnsName',
+        'PrivateIpAddress',
+        'SourceDestCheck',
+        'Status',
+        'SubnetId',
+        'VpcId',
+    ]
+
     def __init__(self, source_data={}, user_data={}):
         super().__init__(source_data, user_data)
         self.id = 'ec2'
+        self.resource_obj = EC2
 
     def generate_source_data(self):
         """
@@ -138,70 +1086,45 @@ class EC2src(AWSBasesrc):
         """
 
         self.log.info('Fetching EC2 inventory')
-        self.source_data = {}
+        self.source_data = self._fetch_regions(self._fetch_region, 'ec2')
+        return self.source_data
 
-        for region in self.regions:
-            ec2 = boto3.client('ec2', region_name=region)
-            self.source_data[region] = \
-                ec2.describe_instances()['Reservations']
-
-        prune_keys = [
-            'AmiLaunchIndex',
-            'Architecture',
-            'BlockDeviceMappings',
-            'CapacityReservationSpecification',
-            'ClientToken',
-            'CpuOptions',
-            'EbsOptimized',
-            'HibernationOptions',
-            'Hypervisor',
-            'KeyName',
-            'Monitoring',
-            'Placement',
-            'PrivateDnsName',
-            'PrivateIpAddress',
-            'ProductCodes',
-            'PublicDnsName',
-            'PublicIpAddress',
-            'RootDeviceName',
-            'RootDeviceType',
-            'SourceDestCheck',
-            'SubnetId',
-            'VirtualizationType',
-        ]
-        network_prune_keys = [
-            'Association',
-            'Attachment',
-            'Description',
-            'Groups',
-            'InterfaceType',
-            'Ipv6Addresses',
-            'MacAddress',
-            'NetworkInterfaceId',
-            'OwnerId',
-            'PrivateDnsName',
-            'PrivateIpAddress',
-            'SourceDestCheck',
-            'Status',
-            'SubnetId',
-            'VpcId',
-        ]
+    def _fetch_region(self, region):
+        """
+        Fetch the EC2 reservations of a region.
 
-        for region in self.source_data.keys():
-            for resource in self.source_data[region]:
-                for instance in resource['Instances']:
-                    for prune_key in prune_keys:
-                        try:
-                            instance.pop(prune_key)
-                        except KeyError:
-                            pass
-                    for interface in instance['NetworkInterfaces']:
-                        for prune_key in network_prune_keys:
-                            try:
-                                interface.pop(prune_key)
-                            except KeyError:
-                                pass
-        return self.source_data
+        Parameters:
+            region (str): AWS region name.
+
+        Returns:
+            list: Reservations of the region.
+        """
+
+        ec2 = self._client('ec2', region)
+        return list(
+            self._paginate(
+                ec2,
+                'describe_instances',
+                'Reservations',
+                self._prune_reservation,
+            )
+        )
+
+    def _prune_reservation(self, reservation):
+        """
+        Remove the unneeded information of the instances of a reservation.
+
+        Parameters:
+            reservation (dict): describe_instances reservation.
+
+        Returns:
+            Nothing.
+        """
+
+        for instance in reservation['Instances']:
+            self._prune(instance, self.prune_keys)
+            for interface in instance['NetworkInterfaces']:
+                self._prune(interface, self.network_prune_keys)
 
     def generate_user_data(self):
         """
@@ -250,13 +1173,12 @@ class EC2src(AWSBasesrc):
                 for instance in resource['Instances']:
                     instance_id = instance['InstanceId']
 
-                    for key, value in \
-                            self.user_data[instance_id].items():
-                        instance[key] = value
-
                     inventory[instance_id] = EC2(
                         {
-                            instance_id: instance
+                            instance_id: ChainMap(
+                                self.user_data[instance_id],
+                                instance,
+                            )
                         }
                     )
         return inventory
@@ -278,16 +1200,46 @@ class RDSsrc(AWSBasesrc):
         generate_inventory: Generates the inventory dictionary with the source
             resource.
 
+    Internal methods:
+        _fetch_region: Fetch the resources of a region.
+
     Public attributes:
         id (str): ID of the resource.
+        resource_obj (class): Class of the resources of the source.
         source_data (dict): Aggregated source supplied data.
         user_data (dict): Aggregated user supplied data.
         log (logging object):
+
+    Class attributes:
+        prune_keys (list): Keys of the database instances that are not stored
+            in the source data.
     """
 
+    prune_keys = [
+        'CopyTagsToSnapshot',
+        'DBParameterGroups',
+        'DbInstancePort',
+        'DomainMemberships',
+        'EnhancedMonitoringResourceArn',
+        'IAMDatabaseAuthenticationEnabled',
+        'LatestRestorableTime',
+        'LicenseModel',
+        'MonitoringInterval',
+        'MonitoringRoleArn',
+        'OptionGroupMemberships',
+        'PendingModifiedValues',
+        'PerformanceInsightsEnabled',
+        'PerformanceInsightsKMSKeyId',
+        'PerformanceInsightsRetentionPeriod',
+        'ReadReplicaDBInstanceIdentifiers',
+        'StorageType',
+        'VpcSecurityGroups',
+    ]
+
     def __init__(self, source_data={}, user_data={}):
         super().__init__(source_data, user_data)
         self.id = 'rds'
+        self.resource_obj = RDS
 
     def generate_source_data(self):
         """
@@ -357,43 +1309,29 @@ class RDSsrc(AWSBasesrc):
         """
 
         self.log.info('Fetching RDS inventory')
-        self.source_data = {}
+        self.source_data = self._fetch_regions(self._fetch_region, 'rds')
+        return self.source_data
 
-        for region in self.regions:
-            rds = boto3.client('rds', region_name=region)
-            self.source_data[region] = \
-                rds.describe_db_instances()['DBInstances']
-
-        prune_keys = [
-            'CopyTagsToSnapshot',
-            'DBParameterGroups',
-            'DbInstancePort',
-            'DomainMemberships',
-            'EnhancedMonitoringResourceArn',
-            'IAMDatabaseAuthenticationEnabled',
-            'LatestRestorableTime',
-            'LicenseModel',
-            'MonitoringInterval',
-            'MonitoringRoleArn',
-            'OptionGroupMemberships',
-            'PendingModifiedValues',
-            'PerformanceInsightsEnabled',
-            'PerformanceInsightsKMSKeyId',
-            'PerformanceInsightsRetentionPeriod',
-            'ReadReplicaDBInstanceIdentifiers',
-            'StorageType',
-            'VpcSecurityGroups',
-        ]
+    def _fetch_region(self, region):
+        """
+        Fetch the RDS instances of a region.
 
-        for region in self.source_data.keys():
-            for resource in self.source_data[region]:
-                for prune_key in prune_keys:
-                    try:
-                        resource.pop(prune_key)
-                    except KeyError:
-                        pass
+        Parameters:
+            region (str): AWS region name.
 
-        return self.source_data
+        Returns:
+            list: Database instances of the region.
+        """
+
+        rds = self._client('rds', region)
+        return list(
+            self._paginate(
+                rds,
+                'describe_db_instances',
+                'DBInstances',
+                lambda instance: self._prune(instance, self.prune_keys),
+            )
+        )
 
     def generate_user_data(self):
         """
@@ -441,13 +1379,12 @@ class RDSsrc(AWSBasesrc):
             for resource in self.source_data[region]:
                 resource_id = resource['DbiResourceId']
 
-                for key, value in \
-                        self.user_data[resource_id].items():
-                    resource[key] = value
-
                 inventory[resource_id] = RDS(
                     {
-                        resource_id: resource
+                        resource_id: ChainMap(
+                            self.user_data[resource_id],
+                            resource,
+                        )
                     }
                 )
 
@@ -458,6 +1395,9 @@ class Route53src(AWSBasesrc):
     """
     Class to gather and manipulate the AWS Route53 resources.
 
+    The records of up to max_zone_workers hosted zones, an AWS setting, are
+    fetched at the same time, under the route53_request_rate limit.
+
     Parameters:
         source_data (dict): Route53src compatible source_data dictionary.
         user_data (dict): Route53src compatible user_data dictionary.
@@ -469,16 +1409,27 @@ class Route53src(AWSBasesrc):
         generate_inventory: Generates the inventory dictionary with the source
             resource.
 
+    Internal methods:
+        _fetch_zone_records: Fetch the records of a hosted zone.
+
     Public attributes:
         id (str): ID of the resource.
+        resource_obj (class): Class of the resources of the source.
         source_data (dict): Aggregated source supplied data.
         user_data (dict): Aggregated user supplied data.
         log (logging object):
+
+    Class attributes:
+        prune_keys (list): Keys of the hosted zones that are not stored in the
+            source data.
     """
 
+    prune_keys = ['CallerReference']
+
     def __init__(self, source_data={}, user_data={}):
         super().__init__(source_data, user_data)
         self.id = 'route53'
+        self.resource_obj = Route53
 
     def generate_source_data(self):
         """
@@ -520,39 +1471,66 @@ class Route53src(AWSBasesrc):
         self.log.info('Fetching Route53 inventory')
         self.source_data = {}
 
-        route53 = boto3.client('route53')
+        route53 = self._client('route53')
 
         # Fetch the hosted zones
-        self.source_data['hosted_zones'] = \
-            route53.list_hosted_zones()['HostedZones']
+        self.source_data['hosted_zones'] = list(
+            self._paginate(
+                route53,
+                'list_hosted_zones',
+                'HostedZones',
+                lambda zone: self._prune(zone, self.prune_keys),
+            )
+        )
+
+        # Fetch the records of the zones concurrently
+        with ThreadPoolExecutor(
+            max_workers=self.settings['max_zone_workers'],
+        ) as executor:
+            zones_records = list(
+                executor.map(
+                    lambda zone: self._fetch_zone_records(route53, zone),
+                    self.source_data['hosted_zones'],
+                )
+            )
 
-        # Prune unneeded information
-        prune_keys = ['CallerReference']
-        for zone in self.source_data['hosted_zones']:
-            for prune_key in prune_keys:
-                try:
-                    zone.pop(prune_key)
-                except KeyError:
-                    pass
+        for zone, records in zip(
+            self.source_data['hosted_zones'],
+            zones_records,
+        ):
+            zone['records'] = records
 
-        # Fetch the records
-        for zone in self.source_data['hosted_zones']:
+        return self.source_data
+
+    def _fetch_zone_records(self, route53, zone):
+        """
+        Fetch the records of a hosted zone, following the record pages in
+        order.
+
+        Parameters:
+            route53 (boto3 client): Route53 client.
+            zone (dict): Hosted zone information.
+
+        Returns:
+            list: Record sets of the hosted zone.
+        """
+
+        raw_records = route53.list_resource_record_sets(
+            HostedZoneId=zone['Id'],
+        )
+
+        records = raw_records['ResourceRecordSets']
+
+        while raw_records['IsTruncated']:
             raw_records = route53.list_resource_record_sets(
                 HostedZoneId=zone['Id'],
+                StartRecordName=raw_records['NextRecordName'],
+                StartRecordType=raw_records['NextRecordType'],
             )
+            for record in raw_records['ResourceRecordSets']:
+                records.append(record)
 
-            zone['records'] = raw_records['ResourceRecordSets']
-
-            while raw_records['IsTruncated']:
-                raw_records = route53.list_resource_record_sets(
-                    HostedZoneId=zone['Id'],
-                    StartRecordName=raw_records['NextRecordName'],
-                    StartRecordType=raw_records['NextRecordType'],
-                )
-                for record in raw_records['ResourceRecordSets']:
-                    zone['records'].append(record)
-
-        return self.source_data
+        return records
 
     def generate_user_data(self):
         """
@@ -608,18 +1586,22 @@ class Route53src(AWSBasesrc):
                     record['Type'].lower(),
                 )
 
-                # Load the user_data into the source_data record
-                for key, value in self.user_data[record_id].items():
-                    record[key] = value
-
-                # Add clinv needed information
-                record['hosted_zone'] = {
-                    'id': zone['Id'],
-                    'name': zone['Name'],
-                    'private': zone['Config']['PrivateZone'],
-                }
-
-                inventory[record_id] = Route53({record_id: record})
+                inventory[record_id] = Route53(
+                    {
+                        record_id: ChainMap(
+                            self.user_data[record_id],
+                            # Add clinv needed information
+                            {
+                                'hosted_zone': {
+                                    'id': zone['Id'],
+                                    'name': zone['Name'],
+                                    'private': zone['Config']['PrivateZone'],
+                                },
+                            },
+                            record,
+                        )
+                    }
+                )
         return inventory
 
 
@@ -639,16 +1621,24 @@ class S3src(AWSBasesrc):
         generate_inventory: Generates the inventory dictionary with the source
             resource.
 
+    Internal methods:
+        _fetch_bucket_acl: Fetch and classify the ACL of a bucket.
+
     Public attributes:
         id (str): ID of the resource.
+        resource_obj (class): Class of the resources of the source.
         source_data (dict): Aggregated source supplied data.
         user_data (dict): Aggregated user supplied data.
         log (logging object):
+        max_acl_workers (int): Maximum number of bucket ACLs fetched at the
+            same time.
     """
 
     def __init__(self, source_data={}, user_data={}):
         super().__init__(source_data, user_data)
         self.id = 's3'
+        self.resource_obj = S3
+        self.max_acl_workers = 10
 
     def generate_source_data(self):
         """
@@ -700,45 +1690,90 @@ class S3src(AWSBasesrc):
         self.log.info('Fetching S3 inventory')
         self.source_data = {}
 
+        # Create S3 client, describe buckets.
+        s3 = self._client('s3')
+        list_bucket_response = s3.list_buckets()
+
+        # Inspect the bucket ACLs concurrently
+        with ThreadPoolExecutor(max_workers=self.max_acl_workers) as executor:
+            buckets = list(
+                executor.map(
+                    lambda bucket: self._fetch_bucket_acl(s3, bucket),
+                    list_bucket_response['Buckets'],
+                )
+            )
+
+        for bucket_dictionary in buckets:
+            self.source_data[bucket_dictionary['Name']] = bucket_dictionary
+        return self.source_data
+
+    def _fetch_bucket_acl(self, s3, bucket_dictionary):
+        """
+        Fetch the ACL of a bucket and classify its read and write permissions
+        as 'public' or 'private'.
+
+        If the ACL can't be fetched, for example due to an AccessDenied error
+        or a connection error, the error code, or the name of the botocore
+        error, is stored in the 'AclError' key of the bucket and the
+        permissions are set to 'unknown'.
+
+        Parameters:
+            s3 (boto3 client): S3 client.
+            bucket_dictionary (dict): list_buckets information of the bucket.
+
+        Returns:
+            dict: bucket_dictionary with the 'Grants' and 'permissions' keys.
+        """
+
         public_acl_indicator = \
             'http://acs.amazonaws.com/groups/global/AllUsers'
         permissions_to_check = ['READ', 'WRITE']
 
-        # Create S3 client, describe buckets.
-        s3 = boto3.client('s3')
-        list_bucket_response = s3.list_buckets()
+        bucket_dictionary['permissions'] = {}
 
-        for bucket_dictionary in list_bucket_response['Buckets']:
+        try:
             bucket_dictionary['Grants'] = s3.get_bucket_acl(
                 Bucket=bucket_dictionary['Name']
             )['Grants']
-            bucket_dictionary['permissions'] = {}
-
-            # Check if there is any public access to the bucket
-            for grant in bucket_dictionary['Grants']:
-                for (key, value) in grant.items():
-                    if key == 'Permission' and any(
-                        permission in value
-                        for permission in permissions_to_check
-                    ):
-                        for (grantee_attribute_key, grantee_attribute_value) \
-                                in grant['Grantee'].items():
-                            if 'URI' in grantee_attribute_key and \
-                                    grant['Grantee']['URI'] == \
-                                    public_acl_indicator:
-                                bucket_dictionary['permissions'][value] = \
-                                    'public'
-
-            # If there is no public access, it means it's private
+        except (BotoCoreError, ClientError) as e:
+            self.log.error(
+                'Error fetching the ACL of bucket {}: {}'.format(
+                    bucket_dictionary['Name'],
+                    e,
+                )
+            )
+            bucket_dictionary['Grants'] = []
+            if isinstance(e, ClientError):
+                bucket_dictionary['AclError'] = e.response['Error']['Code']
+            else:
+                bucket_dictionary['AclError'] = type(e).__name__
             for permission in permissions_to_check:
-                try:
-                    bucket_dictionary['permissions'][permission]
-                except KeyError:
-                    bucket_dictionary['permissions'][permission] = \
-                        'private'
+                bucket_dictionary['permissions'][permission] = 'unknown'
+            return bucket_dictionary
+
+        # Check if there is any public access to the bucket
+        for grant in bucket_dictionary['Grants']:
+            for (key, value) in grant.items():
+                if key == 'Permission' and any(
+                    permission in value
+                    for permission in permissions_to_check
+                ):
+                    for (grantee_attribute_key, grantee_attribute_value) \
+                            in grant['Grantee'].items():
+                        if 'URI' in grantee_attribute_key and \
+                                grant['Grantee']['URI'] == \
+                                public_acl_indicator:
+                            bucket_dictionary['permissions'][value] = \
+                                'public'
+
+        # If there is no public access, it means it's private
+        for permission in permissions_to_check:
+            try:
+                bucket_dictionary['permissions'][permission]
+            except KeyError:
+                bucket_dictionary['permissions'][permission] = 'private'
 
-            self.source_data[bucket_dictionary['Name']] = bucket_dictionary
-        return self.source_data
+        return bucket_dictionary
 
     def generate_user_data(self):
         """
@@ -785,16 +1820,90 @@ class S3src(AWSBasesrc):
 
         inventory = {}
         for resource_id, resource in self.source_data.items():
-            # Load the user_data into the source_data record
-            for key, value in self.user_data[resource_id].items():
-                resource[key] = value
-
-            inventory[resource_id] = S3({resource_id: resource})
+            inventory[resource_id] = S3(
+                {
+                    resource_id: ChainMap(
+                        self.user_data[resource_id],
+                        resource,
+                    )
+                }
+            )
 
         return inventory
 
 
-class IAMGroupsrc(AWSBasesrc):
+class IAMBasesrc(AWSBasesrc):
+    """
+    Class to gather the common methods for the IAM sources.
+
+    The users, groups, memberships and policies of the account are fetched
+    with a single paginated get_account_authorization_details sweep, which is
+    shared by all the IAM sources until the next AWSBasesrc.configure call.
+
+    Internal methods:
+        _fetch_authorization_details: Fetch the IAM users and groups of the
+            account.
+
+    Public attributes:
+        source_data (dict): Aggregated source supplied data.
+        user_data (dict): Aggregated user supplied data.
+        log (logging object):
+    """
+
+    def __init__(self, source_data={}, user_data={}):
+        super().__init__(source_data, user_data)
+
+    def _fetch_authorization_details(self):
+        """
+        Do aggregation of the get_account_authorization_details pages to
+        return the IAM users and groups of the account with the following
+        structure:
+            {
+                'UserDetailList': [
+                    {
+                        'Arn': 'arn:aws:iam::XXXXXXXXXXXX:user/user_1',
+                        'GroupList': ['Administrator'],
+                        'UserName': 'User 1',
+                        ...
+                    },
+                ],
+                'GroupDetailList': [
+                    {
+                        'Arn': 'arn:aws:iam::XXXXXXXXXXXX:group/Administrator',
+                        'AttachedManagedPolicies': [...],
+                        'GroupName': 'Administrator',
+                        'GroupPolicyList': [...],
+                        ...
+                    },
+                ],
+            }
+
+        The result is shared, so it must not be modified.
+
+        Returns:
+            dict: IAM users and groups of the account.
+        """
+
+        with AWSBasesrc._iam_lock:
+            if AWSBasesrc._authorization_details is None:
+                authorization_details = {
+                    'UserDetailList': [],
+                    'GroupDetailList': [],
+                }
+
+                iam = self._client('iam')
+                paginator = iam.get_paginator(
+                    'get_account_authorization_details'
+                )
+                for page in paginator.paginate(Filter=['User', 'Group']):
+                    for key in authorization_details.keys():
+                        authorization_details[key].extend(page.get(key, []))
+
+                AWSBasesrc._authorization_details = authorization_details
+            return AWSBasesrc._authorization_details
+
+
+class IAMGroupsrc(IAMBasesrc):
     """
     Class to gather and manipulate the IAMGroup resources.
 
@@ -812,20 +1921,49 @@ class IAMGroupsrc(AWSBasesrc):
 
     Public attributes:
         id (str): ID of the resource.
+        resource_obj (class): Class of the resources of the source.
         source_data (dict): Aggregated source supplied data.
         user_data (dict): Aggregated user supplied data.
         log (logging object):
+
+    Class attributes:
+        prune_keys (list): Keys of the get_account_authorization_details
+            groups that are not stored in the source data.
     """
 
+    prune_keys = [
+        'Arn',
+        'AttachedManagedPolicies',
+        'GroupPolicyList',
+    ]
+
     def __init__(self, source_data={}, user_data={}):
         super().__init__(source_data, user_data)
         self.id = 'iam_groups'
+        self.resource_obj = IAMGroup
 
     def generate_source_data(self):
         """
         Do aggregation of the source data to generate the source dictionary
         into self.source_data, with the following structure:
             {
+                'arn:aws:iam::XXXXXXXXXXXX:group/Administrator': {
+                    'CreateDate': datetime.datetime(
+                        2019, 11, 4, 12, 41, 24, tzinfo=tzutc()
+                    ),
+                    'GroupId': 'XXXXXXXXXXXXXXXXXXXXX',
+                    'GroupName': 'Administrator',
+                    'Path': '/',
+                    'Users': [
+                        'arn:aws:iam::XXXXXXXXXXXX:user/user_1',
+                    ],
+                    'InlinePolicies': [
+                        'Inlinepolicy',
+                    ],
+                    'AttachedPolicies': [
+                        'arn:aws:iam::aws:policy/Attachedpolicy',
+                    ],
+                },
             }
 
         Returns:
@@ -835,32 +1973,31 @@ class IAMGroupsrc(AWSBasesrc):
         self.log.info('Fetching IAMGroup inventory')
         self.source_data = {}
 
-        iam = boto3.client('iam')
-        iam_group_names = [
-            group['GroupName']
-            for group in iam.list_groups()['Groups']
-        ]
+        authorization_details = self._fetch_authorization_details()
 
-        for group_name in iam_group_names:
-            group_data = iam.get_group(GroupName=group_name)
-            group_id = group_data['Group']['Arn']
-            self.source_data[group_id] = group_data['Group']
-            self.source_data[group_id].pop('Arn')
-            self.source_data[group_id]['Users'] = [
-                user['Arn']
-                for user in group_data['Users']
-            ]
+        group_users = {}
+        for user in authorization_details['UserDetailList']:
+            for group_name in user.get('GroupList', []):
+                group_users.setdefault(group_name, []).append(user['Arn'])
+
+        for group in authorization_details['GroupDetailList']:
+            group_id = group['Arn']
+            self.source_data[group_id] = {
+                key: value
+                for key, value in group.items()
+                if key not in self.prune_keys
+            }
+            self.source_data[group_id]['Users'] = group_users.get(
+                group['GroupName'],
+                [],
+            )
             self.source_data[group_id]['InlinePolicies'] = [
-                policy
-                for policy in iam.list_group_policies(
-                    GroupName=group_name
-                )['PolicyNames']
+                policy['PolicyName']
+                for policy in group.get('GroupPolicyList', [])
             ]
             self.source_data[group_id]['AttachedPolicies'] = [
                 policy['PolicyArn']
-                for policy in iam.list_attached_group_policies(
-                    GroupName=group_name
-                )['AttachedPolicies']
+                for policy in group.get('AttachedManagedPolicies', [])
             ]
 
         return self.source_data
@@ -908,16 +2045,19 @@ class IAMGroupsrc(AWSBasesrc):
         inventory = {}
 
         for resource_id, resource in self.source_data.items():
-            # Load the user_data into the source_data record
-            for key, value in self.user_data[resource_id].items():
-                resource[key] = value
-
-            inventory[resource_id] = IAMGroup({resource_id: resource})
+            inventory[resource_id] = IAMGroup(
+                {
+                    resource_id: ChainMap(
+                        self.user_data[resource_id],
+                        resource,
+                    )
+                }
+            )
 
         return inventory
 
 
-class IAMUsersrc(AWSBasesrc):
+class IAMUsersrc(IAMBasesrc):
     """
     Class to gather and manipulate the IAM User resources.
 
@@ -935,14 +2075,28 @@ class IAMUsersrc(AWSBasesrc):
 
     Public attributes:
         id (str): ID of the resource.
+        resource_obj (class): Class of the resources of the source.
         source_data (dict): Aggregated source supplied data.
         user_data (dict): Aggregated user supplied data.
         log (logging object):
+
+    Class attributes:
+        prune_keys (list): Keys of the get_account_authorization_details
+            users that are not stored in the source data.
     """
 
+    prune_keys = [
+        'Arn',
+        'AttachedManagedPolicies',
+        'GroupList',
+        'PasswordLastUsed',
+        'UserPolicyList',
+    ]
+
     def __init__(self, source_data={}, user_data={}):
         super().__init__(source_data, user_data)
         self.id = 'iam_users'
+        self.resource_obj = IAMUser
 
     def generate_source_data(self):
         """
@@ -974,17 +2128,14 @@ class IAMUsersrc(AWSBasesrc):
         self.log.info('Fetching IAM users inventory')
         self.source_data = {}
 
-        iam = boto3.client('iam')
-        iam_users = iam.list_users()['Users']
+        authorization_details = self._fetch_authorization_details()
 
-        for record in iam_users:
-            user_id = record['Arn']
-            record.pop('Arn')
-            try:
-                record.pop('PasswordLastUsed')
-            except KeyError:
-                pass
-            self.source_data[user_id] = record
+        for user in authorization_details['UserDetailList']:
+            self.source_data[user['Arn']] = {
+                key: value
+                for key, value in user.items()
+                if key not in self.prune_keys
+            }
 
         return self.source_data
 
@@ -1030,11 +2181,14 @@ class IAMUsersrc(AWSBasesrc):
         inventory = {}
 
         for resource_id, resource in self.source_data.items():
-            # Load the user_data into the source_data record
-            for key, value in self.user_data[resource_id].items():
-                resource[key] = value
-
-            inventory[resource_id] = IAMUser({resource_id: resource})
+            inventory[resource_id] = IAMUser(
+                {
+                    resource_id: ChainMap(
+                        self.user_data[resource_id],
+                        resource,
+                    )
+                }
+            )
 
         return inventory
 
@@ -1046,11 +2200,18 @@ class ClinvAWSResource(ClinvGenericResource):
 
     Public methods:
         search: Search in the resource data if a string matches.
+        search_values: Return the values that the search method matches.
 
     Public properties:
         region: Returns the region of the resource.
+
+    Class attributes:
+        search_fields (dict): Extend the parent fields with the region.
     """
 
+    __slots__ = ()
+    search_fields = {**ClinvGenericResource.search_fields, 'region': 'region'}
+
     def __init__(self, raw_data):
         """
         Execute the __init__ of the parent class ClinvActiveResource.
@@ -1080,31 +2241,48 @@ class ClinvAWSResource(ClinvGenericResource):
 
 
         Parameters:
-            search_string (str): Regular expression to match with the
-                resource data.
+            search_string (str|SearchQuery): Regular expression to match with
+                the resource data, or its compiled query.
 
         Returns:
             bool: If the search_string matches resource data.
         """
 
+        query = self._search_query(search_string)
+
         # Perform the ClinvGenericResource searches
-        if super().search(search_string):
+        if super().search(query):
             return True
 
         # Search by security groups
-        if search_string in self.security_groups:
+        if query.search_string in self.security_groups:
             return True
 
         # Search by region
-        if re.match(search_string, self.region):
+        if query.regexp.match(self.region):
             return True
 
         # Search by type
-        if re.match(search_string, self.type):
+        if query.regexp.match(self.type):
             return True
 
         return False
 
+    def search_values(self):
+        """
+        Extend the parent method with the security groups, region and type.
+
+        Returns:
+            list: Values of the resource, each one a string, a list of
+            strings or None.
+        """
+
+        return super().search_values() + [
+            self.security_groups,
+            self.region,
+            self.type,
+        ]
+
 
 class EC2(ClinvAWSResource):
     """
@@ -1113,6 +2291,8 @@ class EC2(ClinvAWSResource):
 
     Public methods:
         search: Search in the resource data if a string matches.
+        search_values: Return the values that the search method matches.
+        ip_addresses: Return the private and public ips of the resource.
         print: Prints information of the resource
 
     Public properties:
@@ -1123,8 +2303,22 @@ class EC2(ClinvAWSResource):
         state: Returns the state of the resource.
         type: Returns the type of the resource.
         state_transition: Returns the reason of the transition of the resource.
+
+    Class attributes:
+        search_fields (dict): Extend the parent fields with the instance
+            type.
+
+    The name, security groups and ips are aggregated from the nested tags,
+    security groups and network interfaces of the raw data the first time
+    they're accessed, and cached in their slots for the next accesses.
     """
 
+    __slots__ = ('_name', '_security_groups', '_private_ips', '_public_ips')
+    search_fields = {
+        **ClinvAWSResource.search_fields,
+        'instance_type': 'type',
+    }
+
     def __init__(self, raw_data):
         """
         Execute the __init__ of the parent class ClinvActiveResource.
@@ -1142,15 +2336,22 @@ class EC2(ClinvAWSResource):
             str: Name of the resource.
         """
 
+        try:
+            return self._name
+        except AttributeError:
+            pass
+
+        self._name = 'none'
         try:
             for tag in self.raw['Tags']:
                 if tag['Key'] == 'Name':
-                    return tag['Value']
+                    self._name = tag['Value']
+                    break
         except KeyError:
             pass
         except TypeError:
             pass
-        return 'none'
+        return self._name
 
     @property
     def security_groups(self):
@@ -1162,11 +2363,19 @@ class EC2(ClinvAWSResource):
         """
 
         try:
-            return [security_group['GroupId']
-                    for security_group in self.raw['SecurityGroups']
-                    ]
+            return self._security_groups
+        except AttributeError:
+            pass
+
+        self._security_groups = None
+        try:
+            self._security_groups = [
+                security_group['GroupId']
+                for security_group in self.raw['SecurityGroups']
+            ]
         except KeyError:
             pass
+        return self._security_groups
 
     @property
     def private_ips(self):
@@ -1177,14 +2386,19 @@ class EC2(ClinvAWSResource):
             list: Private ips of the resource.
         """
 
-        private_ips = []
+        try:
+            return self._private_ips
+        except AttributeError:
+            pass
+
+        self._private_ips = []
         try:
             for interface in self.raw['NetworkInterfaces']:
                 for address in interface['PrivateIpAddresses']:
-                    private_ips.append(address['PrivateIpAddress'])
+                    self._private_ips.append(address['PrivateIpAddress'])
         except KeyError:
             pass
-        return private_ips
+        return self._private_ips
 
     @property
     def public_ips(self):
@@ -1192,17 +2406,24 @@ class EC2(ClinvAWSResource):
         Do aggregation of data to return the public ips of the resource.
 
         Returns:
-            list: Private ips of the resource.
+            list: Public ips of the resource.
         """
 
-        public_ips = []
+        try:
+            return self._public_ips
+        except AttributeError:
+            pass
+
+        self._public_ips = []
         try:
             for interface in self.raw['NetworkInterfaces']:
                 for association in interface['PrivateIpAddresses']:
-                    public_ips.append(association['Association']['PublicIp'])
+                    self._public_ips.append(
+                        association['Association']['PublicIp']
+                    )
         except KeyError:
             pass
-        return public_ips
+        return self._public_ips
 
     @property
     def state(self):
@@ -1270,41 +2491,78 @@ class EC2(ClinvAWSResource):
             Private Ips
 
         Parameters:
-            search_string (str): Regular expression to match with the
-                resource data.
+            search_string (str|SearchQuery): Regular expression to match with
+                the resource data, or its compiled query.
 
         Returns:
             bool: If the search_string matches resource data.
         """
 
+        query = self._search_query(search_string)
+
         # Perform the ClinvAWSResource searches
-        if super().search(search_string):
+        if super().search(query):
             return True
 
         # Search by public IP
-        if self._match_list(search_string, self.public_ips):
+        if self._match_list(query, self.public_ips):
             return True
 
         # Search by private IP
-        if self._match_list(search_string, self.private_ips):
+        if self._match_list(query, self.private_ips):
             return True
 
         return False
 
+    def search_values(self):
+        """
+        Extend the parent method with the public and private ips.
+
+        Returns:
+            list: Values of the resource, each one a string, a list of
+            strings or None.
+        """
+
+        return super().search_values() + [self.public_ips, self.private_ips]
+
+    def ip_addresses(self):
+        """
+        Override the parent method to return the private and public ips of
+        the resource.
+
+        Returns:
+            list: Ip addresses of the resource, as strings.
+        """
+
+        return self.private_ips + self.public_ips
+
 
 class RDS(ClinvAWSResource):
     """
     Abstract class to extend ClinvAWSResource, it gathers method and attributes
     for the RDS resources.
 
+    Public methods:
+        ip_addresses: Return the address of the endpoint of the resource.
+
     Public properties:
         endpoint: Return the database endpoint.
         name: Returns the name of the resource.
         security_groups: Returns the security groups of the resource.
         type: Returns the type of the resource.
         state: Returns the state of the resource.
+
+    Class attributes:
+        search_fields (dict): Extend the parent fields with the instance
+            class.
     """
 
+    __slots__ = ()
+    search_fields = {
+        **ClinvAWSResource.search_fields,
+        'instance_type': 'type',
+    }
+
     def __init__(self, raw_data):
         """
         Execute the __init__ of the parent class ClinvActiveResource.
@@ -1370,6 +2628,18 @@ class RDS(ClinvAWSResource):
         endpoint_dict = self._get_field('Endpoint', 'dict')
         return '{}:{}'.format(endpoint_dict['Address'], endpoint_dict['Port'])
 
+    def ip_addresses(self):
+        """
+        Override the parent method to return the address of the endpoint of
+        the resource. It's usually a hostname, so it's only searchable by
+        network when the endpoint is an ip.
+
+        Returns:
+            list: Address of the endpoint.
+        """
+
+        return [self._get_field('Endpoint', 'dict')['Address']]
+
     def print(self):
         """
         Override parent method to do aggregation of data to print information
@@ -1403,8 +2673,19 @@ class Route53(ClinvGenericResource):
         private: Returns if the resource is private.
         print: Prints the name of the resource
         short_print: Prints information of the resource
+        search_values: Return the values that the search method matches.
+        ip_addresses: Return the addresses of the A and AAAA records.
+
+    Class attributes:
+        search_fields (dict): Extend the parent fields with the record type.
     """
 
+    __slots__ = ()
+    search_fields = {
+        **ClinvGenericResource.search_fields,
+        'record_type': 'type',
+    }
+
     def __init__(self, raw_data):
         """
         Execute the __init__ of the parent class ClinvActiveResource.
@@ -1542,28 +2823,54 @@ class Route53(ClinvGenericResource):
             Record type
 
         Parameters:
-            search_string (str): Regular expression to match with the
-                resource data.
+            search_string (str|SearchQuery): Regular expression to match with
+                the resource data, or its compiled query.
 
         Returns:
             bool: If the search_string matches resource data.
         """
 
+        query = self._search_query(search_string)
+
         # Perform the parent searches
-        if super().search(search_string):
+        if super().search(query):
             return True
 
         # Search by value
         for value in self.value:
-            if re.match(search_string, value):
+            if query.regexp.match(value):
                 return True
 
         # Search by type
-        if re.match(search_string, self.type, re.IGNORECASE):
+        if query.iregexp.match(self.type):
             return True
 
         return False
 
+    def search_values(self):
+        """
+        Extend the parent method with the record value and type.
+
+        Returns:
+            list: Values of the resource, each one a string, a list of
+            strings or None.
+        """
+
+        return super().search_values() + [self.value, self.type]
+
+    def ip_addresses(self):
+        """
+        Override the parent method to return the values of the A and AAAA
+        records.
+
+        Returns:
+            list: Ip addresses of the record, as strings.
+        """
+
+        if self.type not in ['A', 'AAAA']:
+            return []
+        return self.value
+
 
 class S3(ClinvGenericResource):
     """
@@ -1576,6 +2883,8 @@ class S3(ClinvGenericResource):
         short_print: Prints information of the resource
     """
 
+    __slots__ = ()
+
     def __init__(self, raw_data):
         """
         Execute the __init__ of the parent class ClinvActiveResource.
@@ -1631,6 +2940,7 @@ class IAMGroup(ClinvGenericResource):
     Public methods:
         print: Prints the name of the resource
         short_print: Prints information of the resource
+        search_values: Return the values that the search method matches.
 
     Public properties:
         name: Returns the name of the record.
@@ -1640,6 +2950,8 @@ class IAMGroup(ClinvGenericResource):
         attached_policies: Return the attached policies of the group.
     """
 
+    __slots__ = ()
+
     def __init__(self, raw_data):
         """
         Execute the __init__ of the parent class ClinvActiveResource.
@@ -1739,29 +3051,47 @@ class IAMGroup(ClinvGenericResource):
             Policies ids
 
         Parameters:
-            search_string (str): Regular expression to match with the
-                resource data.
+            search_string (str|SearchQuery): Regular expression to match with
+                the resource data, or its compiled query.
 
         Returns:
             bool: If the search_string matches resource data.
         """
 
+        query = self._search_query(search_string)
+
         # Perform the ClinvAWSResource searches
-        if super().search(search_string):
+        if super().search(query):
             return True
 
         # Search by user ids
-        if self._match_list(search_string, self.users) or \
-                self._match_list(search_string, self.desired_users):
+        if self._match_list(query, self.users) or \
+                self._match_list(query, self.desired_users):
             return True
 
         # Search by policy ids
-        if self._match_list(search_string, self.attached_policies) or \
-                self._match_list(search_string, self.inline_policies):
+        if self._match_list(query, self.attached_policies) or \
+                self._match_list(query, self.inline_policies):
             return True
 
         return False
 
+    def search_values(self):
+        """
+        Extend the parent method with the users and policies ids.
+
+        Returns:
+            list: Values of the resource, each one a string, a list of
+            strings or None.
+        """
+
+        return super().search_values() + [
+            self.users,
+            self.desired_users,
+            self.attached_policies,
+            self.inline_policies,
+        ]
+
 
 class IAMUser(ClinvGenericResource):
     """
@@ -1776,6 +3106,8 @@ class IAMUser(ClinvGenericResource):
         short_print: Prints information of the resource
     """
 
+    __slots__ = ()
+
     def __init__(self, raw_data):
         """
         Execute the __init__ of the parent class ClinvActiveResource.
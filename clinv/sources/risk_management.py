@@ -17,8 +17,6 @@ Classes:
 """
 from clinv.sources import ClinvSourcesrc, ClinvGenericResource
 
-import re
-
 
 class RiskManagementBasesrc(ClinvSourcesrc):
     """
@@ -38,6 +36,7 @@ class RiskManagementBasesrc(ClinvSourcesrc):
 
     Public attributes:
         id (str): ID of the resource.
+        resource_obj (class): Class of the resources of the source.
         source_data (dict): Aggregated source supplied data.
         user_data (dict): Aggregated user supplied data.
         log (logging object):
@@ -110,6 +109,7 @@ class Projectsrc(RiskManagementBasesrc):
 
     Public attributes:
         id (str): ID of the resource.
+        resource_obj (class): Class of the resources of the source.
         source_data (dict): Aggregated source supplied data.
         user_data (dict): Aggregated user supplied data.
         log (logging object):
@@ -139,6 +139,7 @@ class Servicesrc(RiskManagementBasesrc):
 
     Public attributes:
         id (str): ID of the resource.
+        resource_obj (class): Class of the resources of the source.
         source_data (dict): Aggregated source supplied data.
         user_data (dict): Aggregated user supplied data.
         log (logging object):
@@ -168,6 +169,7 @@ class Informationsrc(RiskManagementBasesrc):
 
     Public attributes:
         id (str): ID of the resource.
+        resource_obj (class): Class of the resources of the source.
         source_data (dict): Aggregated source supplied data.
         user_data (dict): Aggregated user supplied data.
         log (logging object):
@@ -197,6 +199,7 @@ class Peoplesrc(RiskManagementBasesrc):
 
     Public attributes:
         id (str): ID of the resource.
+        resource_obj (class): Class of the resources of the source.
         source_data (dict): Aggregated source supplied data.
         user_data (dict): Aggregated user supplied data.
         log (logging object):
@@ -217,6 +220,8 @@ class ClinvActiveResource(ClinvGenericResource):
         responsible: Returns the person responsible of the resource.
     """
 
+    __slots__ = ()
+
     def __init__(self, raw_data):
         """
         Execute the __init__ of the parent class ClinvGenericResource.
@@ -247,6 +252,7 @@ class Project(ClinvActiveResource):
 
     Public methods:
         print: Print information of the resource.
+        search_values: Return the values that the search method matches.
 
     Public properties:
         aliases: Returns the aliases of the project.
@@ -255,6 +261,8 @@ class Project(ClinvActiveResource):
         people: Returns a list of people ids of the project.
     """
 
+    __slots__ = ()
+
     def __init__(self, raw_data):
         """
         Execute the __init__ of the parent class ClinvActiveResource.
@@ -317,21 +325,34 @@ class Project(ClinvActiveResource):
             aliases
 
         Parameters:
-            search_string (str): Regular expression to match with the
-                resource data.
+            search_string (str|SearchQuery): Regular expression to match with
+                the resource data, or its compiled query.
 
         Returns:
             bool: If the search_string matches resource data.
         """
 
+        query = self._search_query(search_string)
+
         # Perform the ClinvGenericResource searches
-        if super().search(search_string):
+        if super().search(query):
             return True
 
         # Search by aliases
-        if self.aliases is not None and search_string in self.aliases:
+        if self.aliases is not None and query.search_string in self.aliases:
             return True
 
+    def search_values(self):
+        """
+        Extend the parent method with the aliases.
+
+        Returns:
+            list: Values of the resource, each one a string, a list of
+            strings or None.
+        """
+
+        return super().search_values() + [self.aliases]
+
     def print(self):
         """
         Override parent method to do aggregation of data to print information
@@ -365,6 +386,8 @@ class Information(ClinvActiveResource):
         personal_data: Returns if the information contains personal data.
     """
 
+    __slots__ = ()
+
     def __init__(self, raw_data):
         """
         Execute the __init__ of the parent class ClinvActiveResource.
@@ -411,6 +434,7 @@ class Service(ClinvActiveResource):
     Public methods:
         print: Print information of the resource.
         search: Extends parent method to search by aws resources
+        search_values: Return the values that the search method matches.
 
     Public properties:
         access: Returns the level of exposure of the service.
@@ -418,6 +442,8 @@ class Service(ClinvActiveResource):
         aws: Returns a dict of aws resources used by the service.
     """
 
+    __slots__ = ()
+
     def __init__(self, raw_data):
         """
         Execute the __init__ of the parent class ClinvActiveResource.
@@ -469,15 +495,17 @@ class Service(ClinvActiveResource):
             AWS resources
 
         Parameters:
-            search_string (str): Regular expression to match with the
-                resource data.
+            search_string (str|SearchQuery): Regular expression to match with
+                the resource data, or its compiled query.
 
         Returns:
             bool: If the search_string matches resource data.
         """
 
+        query = self._search_query(search_string)
+
         # Perform the ClinvGenericResource searches
-        if super().search(search_string):
+        if super().search(query):
             return True
 
         # Search by email
@@ -486,9 +514,26 @@ class Service(ClinvActiveResource):
             for resource_type in self.aws
             for resource_id in self.aws[resource_type]
         ]
-        if self._match_list(search_string, service_aws_resources):
+        if self._match_list(query, service_aws_resources):
             return True
 
+    def search_values(self):
+        """
+        Extend the parent method with the AWS resources ids.
+
+        Returns:
+            list: Values of the resource, each one a string, a list of
+            strings or None.
+        """
+
+        return super().search_values() + [
+            [
+                resource_id
+                for resource_type in self.aws
+                for resource_id in self.aws[resource_type]
+            ],
+        ]
+
     def print(self):
         """
         Override parent method to do aggregation of data to print information
@@ -522,12 +567,15 @@ class People(ClinvActiveResource):
     Public methods:
         print: Print information of the resource.
         search: Extends parent method to search by email and iam user
+        search_values: Return the values that the search method matches.
 
     Public properties:
         iam_user: Returns IAM user of the person.
         email: Returns IAM user email.
     """
 
+    __slots__ = ()
+
     def __init__(self, raw_data):
         """
         Execute the __init__ of the parent class ClinvActiveResource.
@@ -566,25 +614,38 @@ class People(ClinvActiveResource):
             iam_user
 
         Parameters:
-            search_string (str): Regular expression to match with the
-                resource data.
+            search_string (str|SearchQuery): Regular expression to match with
+                the resource data, or its compiled query.
 
         Returns:
             bool: If the search_string matches resource data.
         """
 
+        query = self._search_query(search_string)
+
         # Perform the ClinvGenericResource searches
-        if super().search(search_string):
+        if super().search(query):
             return True
 
         # Search by email
-        if re.match(search_string, self.email):
+        if query.regexp.match(self.email):
             return True
 
         # Search by iam_user
-        if re.match(search_string, self.iam_user):
+        if query.regexp.match(self.iam_user):
             return True
 
+    def search_values(self):
+        """
+        Extend the parent method with the email and IAM user.
+
+        Returns:
+            list: Values of the resource, each one a string, a list of
+            strings or None.
+        """
+
+        return super().search_values() + [self.email, self.iam_user]
+
     def print(self):
         """
         Override parent method to do aggregation of data to print information
@@ -0,0 +1,607 @@
+"""
+Module to store the SQLite backend of the inventory.
+
+Classes:
+    SQLiteStore: Class to save and query the inventory in a SQLite database.
+    SQLiteInventory: Mapping of resource types to the resource objects stored
+        in a SQLite database, that reads each type on first access.
+"""
+
+from collections.abc import MutableMapping
+import logging
+import os
+import pickle
+import sqlite3
+
+
+class SQLiteStore():
+    """
+    Class to save and query the inventory in a SQLite database, with the
+    following tables:
+
+    * sources: Position, source data and fetch time of each source, and the
+        user data, the signature of its user data file and the resource class
+        its resources were built with.
+    * resources: One row per resource with its type, id, position, name,
+        region and state, and the plain data of the resource, its source and
+        user data.
+
+    The resources table is indexed by id, type, name, region and state, so
+    the reports can select the resources they need without reading the
+    whole inventory. The resources are returned in the order they were
+    saved, the one of the inventory, so the reports print the same output
+    as with the yaml files.
+
+    The resources are stored as plain data and rebuilt with the resource
+    class of their type when they are queried, so the stored rows don't
+    depend on the layout of the resource classes. The user data is edited
+    in the user_data yaml files, the database only keeps the copy the
+    resources were built with, and the signature of the file it was read
+    from to detect its changes.
+
+    The resources of the types in memory_resources are returned from that
+    mapping instead of the database, so the inventory can use the resources
+    it built from the edited user data without writing them.
+
+    Parameters:
+        database_path (str): Path to the SQLite database.
+        resource_classes (dict): Class of the resources of each type, with
+            the type as key, like {'ec2': EC2}.
+
+    Public methods:
+        exists: Check if the database exists.
+        save: Save the data and the resources of the sources.
+        load_sources: Load the data of the stored sources.
+        resource_types: Return the stored resource types.
+        stale_sources: Return the sources whose resources were built with
+            another resource class or user data file.
+        query: Return the resources that match the selected fields.
+
+    Internal methods:
+        _connect: Open the database and create its schema.
+        _class_name: Return the name of the resource class of a type.
+        _index_field: Return the value of an indexed field of a resource.
+        _matches: Check if a resource matches the selected fields.
+
+    Public attributes:
+        database_path (str): Path to the SQLite database.
+        resource_classes (dict): Class of the resources of each type.
+        memory_resources (Mapping): Resources of the types that are not read
+            from the database, with the type as key, like Inventory.inv.
+        log (logging object):
+
+    Class attributes:
+        schema_version (int): Version of the database schema, stored in the
+            user_version pragma.
+        indexed_fields (list): Resource fields with their own column and
+            index.
+    """
+
+    schema_version = 1
+    indexed_fields = ['name', 'region', 'state']
+
+    def __init__(self, database_path, resource_classes):
+        self.database_path = os.path.expanduser(database_path)
+        self.resource_classes = resource_classes
+        self.memory_resources = {}
+        self.log = logging.getLogger('main')
+        self._connection = None
+
+    def exists(self):
+        """
+        Check if the database exists.
+
+        Returns:
+            bool: If the database file exists.
+        """
+
+        return os.path.isfile(self.database_path)
+
+    def _connect(self):
+        """
+        Open the database, creating its schema if it's empty.
+
+        Exceptions:
+            ValueError: If the database has an unsupported schema version.
+
+        Returns:
+            sqlite3.Connection: Connection to the database.
+        """
+
+        if self._connection is not None:
+            return self._connection
+
+        os.makedirs(os.path.dirname(self.database_path), exist_ok=True)
+        connection = sqlite3.connect(self.database_path)
+        version = connection.execute('PRAGMA user_version').fetchone()[0]
+        if version == 0:
+            with connection:
+                connection.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS sources (
+                        id TEXT PRIMARY KEY,
+                        position INTEGER NOT NULL,
+                        fetch_time REAL,
+                        source_data BLOB NOT NULL,
+                        user_data BLOB NOT NULL,
+                        user_data_signature BLOB NOT NULL,
+                        resource_class TEXT
+                    );
+                    CREATE TABLE IF NOT EXISTS resources (
+                        type TEXT NOT NULL,
+                        id TEXT NOT NULL,
+                        position INTEGER NOT NULL,
+                        name TEXT,
+                        region TEXT,
+                        state TEXT,
+                        data BLOB NOT NULL,
+                        PRIMARY KEY (type, id)
+                    );
+                    CREATE INDEX IF NOT EXISTS resources_id
+                        ON resources (id);
+                    CREATE INDEX IF NOT EXISTS resources_position
+                        ON resources (type, position);
+                    CREATE INDEX IF NOT EXISTS resources_name
+                        ON resources (name);
+                    CREATE INDEX IF NOT EXISTS resources_region
+                        ON resources (region);
+                    CREATE INDEX IF NOT EXISTS resources_state
+                        ON resources (state);
+                    """
+                )
+                connection.execute(
+                    'PRAGMA user_version = {}'.format(self.schema_version)
+                )
+        elif version != self.schema_version:
+            connection.close()
+            raise ValueError(
+                'Unsupported inventory database version {}'.format(version)
+            )
+
+        self._connection = connection
+        return connection
+
+    def _class_name(self, resource_type):
+        """
+        Return the name of the resource class of a type.
+
+        Parameters:
+            resource_type (str): Type of the resources.
+
+        Returns:
+            str: Module and name of the class, or None if the type has no
+            resource class.
+        """
+
+        try:
+            resource_class = self.resource_classes[resource_type]
+        except KeyError:
+            return None
+        return '{}.{}'.format(
+            resource_class.__module__,
+            resource_class.__qualname__,
+        )
+
+    def _index_field(self, resource, field):
+        """
+        Return the value of an indexed field of a resource.
+
+        Parameters:
+            resource (ClinvGenericResource): Resource to index.
+            field (str): Field to return, one of self.indexed_fields.
+
+        Returns:
+            str: Value of the field, or None if the resource doesn't have it.
+        """
+
+        try:
+            value = getattr(resource, field)
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            return None
+        if value is None:
+            return None
+        return str(value)
+
+    def save(
+        self,
+        source_data,
+        user_data,
+        fetch_times,
+        inventory,
+        user_data_signatures=None,
+    ):
+        """
+        Save the data and the resources of the sources in one transaction,
+        replacing the stored rows of those sources.
+
+        The sources whose source data, user data and resource class didn't
+        change only update their position, fetch time and user data
+        signature, their resources are not written again.
+
+        Parameters:
+            source_data (dict): Source data of each source, with the source
+                id as key.
+            user_data (dict): User data of each source, with the source id as
+                key.
+            fetch_times (dict): Epoch time of the last fetch of each source,
+                with the source id as key.
+            inventory (Mapping): Resource objects of each source, with the
+                source id as key, like Inventory.inv. The sources and their
+                resources are stored in its order.
+            user_data_signatures (dict): Signature of the file the user data
+                of each source was read from, with the source id as key. By
+                default, is set to None to store no signatures.
+
+        Returns:
+            Nothing.
+        """
+
+        if user_data_signatures is None:
+            user_data_signatures = {}
+
+        # Membership is checked on the keys, as `in` on a lazy mapping would
+        # hide the errors raised while building the resources.
+        inventory_ids = list(inventory)
+
+        source_ids = sorted(
+            set(source_data) | set(user_data),
+            key=lambda source_id: (
+                inventory_ids.index(source_id)
+                if source_id in inventory_ids else len(inventory_ids),
+                source_id,
+            ),
+        )
+        source_rows = [
+            (
+                source_id,
+                position,
+                fetch_times.get(source_id),
+                pickle.dumps(
+                    source_data.get(source_id, {}),
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                ),
+                pickle.dumps(
+                    user_data.get(source_id, {}),
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                ),
+                pickle.dumps(
+                    user_data_signatures.get(source_id),
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                ),
+                self._class_name(source_id),
+            )
+            for position, source_id in enumerate(source_ids)
+        ]
+
+        connection = self._connect()
+        saved_sources = 0
+        with connection:
+            for source_row in source_rows:
+                source_id, position, fetch_time, source_blob, user_blob, \
+                    signature_blob, class_name = source_row
+                stored = connection.execute(
+                    'SELECT source_data, user_data, resource_class '
+                    'FROM sources WHERE id = ?',
+                    (source_id,),
+                ).fetchone()
+                if stored == (source_blob, user_blob, class_name):
+                    connection.execute(
+                        'UPDATE sources SET position = ?, fetch_time = ?, '
+                        'user_data_signature = ? WHERE id = ?',
+                        (position, fetch_time, signature_blob, source_id),
+                    )
+                    continue
+                saved_sources += 1
+                connection.execute(
+                    'INSERT OR REPLACE INTO sources (id, position, '
+                    'fetch_time, source_data, user_data, user_data_signature, '
+                    'resource_class) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    source_row,
+                )
+                connection.execute(
+                    'DELETE FROM resources WHERE type = ?',
+                    (source_id,),
+                )
+                if source_id not in inventory_ids:
+                    continue
+                connection.executemany(
+                    'INSERT INTO resources (type, id, position, name, region, '
+                    'state, data) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (
+                        (
+                            source_id,
+                            resource_id,
+                            resource_position,
+                            self._index_field(resource, 'name'),
+                            self._index_field(resource, 'region'),
+                            self._index_field(resource, 'state'),
+                            pickle.dumps(
+                                dict(resource.raw),
+                                protocol=pickle.HIGHEST_PROTOCOL,
+                            ),
+                        )
+                        for resource_position, (resource_id, resource)
+                        in enumerate(inventory[source_id].items())
+                    ),
+                )
+        self.log.debug(
+            'Saved {} of {} sources to {}'.format(
+                saved_sources,
+                len(source_ids),
+                self.database_path,
+            )
+        )
+
+    def load_sources(self, source_ids=None):
+        """
+        Load the source data, user data and fetch times of the selected
+        sources. The user data is the copy the stored resources were built
+        with.
+
+        Parameters:
+            source_ids (list): Ids of the sources to load. By default, is set
+                to None to load all the stored sources.
+
+        Exceptions:
+            FileNotFoundError: If the database doesn't exist.
+
+        Returns:
+            tuple: source_data, user_data and fetch_times dictionaries, with
+            the source id as key.
+        """
+
+        if not self.exists():
+            raise FileNotFoundError(self.database_path)
+
+        source_data = {}
+        user_data = {}
+        fetch_times = {}
+        for source_id, fetch_time, source_blob, user_blob in \
+                self._connect().execute(
+                    'SELECT id, fetch_time, source_data, user_data '
+                    'FROM sources ORDER BY position'
+                ):
+            if source_ids is not None and source_id not in source_ids:
+                continue
+            source_data[source_id] = pickle.loads(source_blob)
+            user_data[source_id] = pickle.loads(user_blob)
+            if fetch_time is not None:
+                fetch_times[source_id] = fetch_time
+        return source_data, user_data, fetch_times
+
+    def resource_types(self):
+        """
+        Return the stored resource types, which are the ids of their sources.
+
+        Returns:
+            list: Resource types, in the order they were saved.
+        """
+
+        return [
+            row[0]
+            for row in self._connect().execute(
+                'SELECT id FROM sources ORDER BY position'
+            )
+        ]
+
+    def stale_sources(self, user_data_signatures=None):
+        """
+        Return the sources whose stored resources are out of date, because
+        they were built with another resource class than the current one of
+        their type, or with another user data file than the current one.
+
+        Parameters:
+            user_data_signatures (dict): Signature of the current user data
+                file of each source, with the source id as key. The sources
+                that are not stored are stale if they have a user data file.
+                By default, is set to None to check only the resource classes.
+
+        Returns:
+            list: Ids of the stale sources, in the order they were saved.
+        """
+
+        if user_data_signatures is None:
+            user_data_signatures = {}
+
+        stale_ids = []
+        stored_ids = []
+        for source_id, class_name, signature_blob in self._connect().execute(
+            'SELECT id, resource_class, user_data_signature FROM sources '
+            'ORDER BY position'
+        ):
+            stored_ids.append(source_id)
+            if class_name != self._class_name(source_id):
+                stale_ids.append(source_id)
+            elif source_id in user_data_signatures and \
+                    user_data_signatures[source_id] != \
+                    pickle.loads(signature_blob):
+                stale_ids.append(source_id)
+
+        for source_id, signature in user_data_signatures.items():
+            if source_id not in stored_ids and signature is not None:
+                stale_ids.append(source_id)
+        return stale_ids
+
+    def query(
+        self,
+        resource_type=None,
+        id_prefix=None,
+        exclude_state=None,
+        **fields
+    ):
+        """
+        Return the resources that match all the selected fields, using the
+        indexes of the resources table.
+
+        The resources of the types in self.memory_resources are filtered in
+        memory instead.
+
+        Parameters:
+            resource_type (str): Type of the resources. By default, is set to
+                None to return all types.
+            id_prefix (str): Prefix of the resource ids.
+            exclude_state (str): Skip the resources with this state. The
+                resources without state are returned.
+            **fields: Value of the indexed fields, for example
+                region='us-east-1' or state='active'.
+
+        Exceptions:
+            ValueError: If a field is not indexed.
+
+        Returns:
+            list: Resource objects in the order they were saved. The
+            resources of the types without resource class are skipped.
+        """
+
+        conditions = []
+        values = []
+        if resource_type is not None:
+            conditions.append('resources.type = ?')
+            values.append(resource_type)
+        if id_prefix:
+            conditions.append('resources.id >= ? AND resources.id < ?')
+            values.extend([id_prefix, id_prefix + '\U0010ffff'])
+        if exclude_state is not None:
+            conditions.append(
+                '(resources.state IS NULL OR resources.state != ?)'
+            )
+            values.append(exclude_state)
+        for field, value in sorted(fields.items()):
+            if field not in self.indexed_fields:
+                raise ValueError('Unindexed resource field {}'.format(field))
+            conditions.append('resources.{} = ?'.format(field))
+            values.append(value)
+
+        memory_types = [
+            memory_type
+            for memory_type in self.memory_resources
+            if resource_type is None or memory_type == resource_type
+        ]
+        if memory_types != []:
+            conditions.append(
+                'resources.type NOT IN ({})'.format(
+                    ', '.join('?' * len(memory_types))
+                )
+            )
+            values.extend(memory_types)
+
+        sql = 'SELECT resources.type, resources.id, resources.data ' \
+            'FROM resources JOIN sources ON sources.id = resources.type'
+        if conditions != []:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY sources.position, resources.position'
+
+        connection = self._connect()
+        resources = [
+            (
+                row_type,
+                self.resource_classes[row_type]({row_id: pickle.loads(data)}),
+            )
+            for row_type, row_id, data in connection.execute(sql, values)
+            if row_type in self.resource_classes
+        ]
+        if memory_types == []:
+            return [resource for row_type, resource in resources]
+
+        for memory_type in memory_types:
+            resources.extend(
+                (memory_type, resource)
+                for resource in self.memory_resources[memory_type].values()
+                if self._matches(resource, id_prefix, exclude_state, fields)
+            )
+        positions = dict(
+            connection.execute('SELECT id, position FROM sources')
+        )
+        resources.sort(
+            key=lambda row: positions.get(row[0], len(positions))
+        )
+        return [resource for row_type, resource in resources]
+
+    def _matches(self, resource, id_prefix, exclude_state, fields):
+        """
+        Check if a resource matches the selected fields, like the conditions
+        of the query method.
+
+        Parameters:
+            resource (ClinvGenericResource): Resource to check.
+            id_prefix (str): Prefix of the resource ids.
+            exclude_state (str): State of the resources to skip.
+            fields (dict): Value of the indexed fields.
+
+        Returns:
+            bool: If the resource matches.
+        """
+
+        if id_prefix and not resource.id.startswith(id_prefix):
+            return False
+        if exclude_state is not None and \
+                self._index_field(resource, 'state') == exclude_state:
+            return False
+        return all(
+            self._index_field(resource, field) == value
+            for field, value in fields.items()
+        )
+
+
+class SQLiteInventory(MutableMapping):
+    """
+    Mapping of resource types to the dictionaries of resource objects stored
+    in a SQLite database, with the same structure as the Inventory.inv
+    dictionary.
+
+    The resources of a type are read from the database the first time they
+    are accessed.
+
+    Parameters:
+        store (SQLiteStore): Database of the inventory.
+        resource_types (list): Types of the mapping, the ones without stored
+            resources are empty. By default, is set to None to use all the
+            stored types.
+
+    Public attributes:
+        store (SQLiteStore): Database of the inventory.
+    """
+
+    def __init__(self, store, resource_types=None):
+        self.store = store
+        if resource_types is None:
+            resource_types = store.resource_types()
+        self._types = list(resource_types)
+        self._objects = {}
+
+    def __getitem__(self, resource_type):
+        try:
+            return self._objects[resource_type]
+        except KeyError:
+            pass
+        if resource_type not in self._types:
+            raise KeyError(resource_type)
+        self._objects[resource_type] = {
+            resource.id: resource
+            for resource in self.store.query(resource_type)
+        }
+        return self._objects[resource_type]
+
+    def __setitem__(self, resource_type, resources):
+        self._objects[resource_type] = resources
+
+    def __delitem__(self, resource_type):
+        if resource_type not in self._types and \
+                resource_type not in self._objects:
+            raise KeyError(resource_type)
+        if resource_type in self._types:
+            self._types.remove(resource_type)
+        self._objects.pop(resource_type, None)
+
+    def __iter__(self):
+        for resource_type in self._types:
+            yield resource_type
+        for resource_type in self._objects:
+            if resource_type not in self._types:
+                yield resource_type
+
+    def __len__(self):
+        return len(set(self._types) | set(self._objects))
+
+    def __repr__(self):
+        return 'SQLiteInventory({})'.format(list(self))
@@ -50,6 +50,12 @@ class ClinvReportBaseTestClass(object):
                 'inf_01': Mock()
             },
         }
+        self.inventory.store = None
+        self.inventory.load_search_index.return_value.candidates\
+            .return_value = None
+        for resources in self.inventory.inv.values():
+            for resource_id, resource in resources.items():
+                resource.id = resource_id
         self.ec2instance = self.inventory.inv['ec2']['i-023desldk394995ss']
         self.s3instance = self.inventory.inv['s3']['s3_bucket_name']
         self.iamuser = self.inventory.inv['iam_users'][
@@ -355,3 +355,18 @@ class TestExportReport(ClinvReportBaseTestClass, unittest.TestCase):
             ),
             None,
         )
+
+    def test_resource_types_returns_the_exported_types(self):
+        self.assertEqual(
+            sorted(ExportReport.resource_types('file.ods')),
+            [
+                'ec2',
+                'informations',
+                'people',
+                'projects',
+                'rds',
+                'route53',
+                's3',
+                'services',
+            ],
+        )
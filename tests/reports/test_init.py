@@ -1,5 +1,6 @@
 from clinv.reports import ClinvReport
 from tests.reports import ClinvReportBaseTestClass
+from unittest.mock import Mock
 import unittest
 
 
@@ -36,3 +37,43 @@ class TestClinvReport(ClinvReportBaseTestClass, unittest.TestCase):
             name,
             self.inventory.inv['informations']['inf_01'].name
         )
+
+    def test_report_needs_all_resource_types_by_default(self):
+        self.assertEqual(ClinvReport.resource_types('argument'), None)
+
+    def test_resources_returns_the_resources_sorted_by_id(self):
+        self.inventory.inv['people']['peo_00'] = Mock()
+        self.assertEqual(
+            self.report._resources('people'),
+            [
+                self.inventory.inv['people']['peo_00'],
+                self.person,
+            ],
+        )
+
+    def test_resources_can_exclude_a_state(self):
+        self.person.state = 'terminated'
+        self.assertEqual(self.report._resources('people', 'terminated'), [])
+
+    def test_resources_are_queried_from_the_store_if_there_is_one(self):
+        self.report.store = Mock()
+        self.report.store.query.return_value = [self.person]
+
+        result = self.report._resources('people', 'terminated')
+
+        self.report.store.query.assert_called_with(
+            'people',
+            exclude_state='terminated',
+        )
+        self.assertEqual(result, [self.person])
+
+    def test_resources_from_the_store_are_sorted_by_id(self):
+        self.report.store = Mock()
+        second_person = Mock()
+        second_person.id = 'peo_00'
+        self.report.store.query.return_value = [self.person, second_person]
+
+        self.assertEqual(
+            self.report._resources('people'),
+            [second_person, self.person],
+        )
@@ -1,5 +1,6 @@
 from tests.reports import ClinvReportBaseTestClass
 from clinv.reports.list import ListReport
+from unittest.mock import Mock
 import unittest
 
 
@@ -32,3 +33,18 @@ class TestListReport(ClinvReportBaseTestClass, unittest.TestCase):
         self.assertFalse(
             self.inventory.inv['projects']['pro_01'].short_print.called
         )
+
+    def test_resource_types_returns_the_listed_type(self):
+        self.assertEqual(ListReport.resource_types('ec2'), ['ec2'])
+
+    def test_resource_types_returns_all_types_if_none_is_listed(self):
+        self.assertEqual(ListReport.resource_types(), None)
+
+    def test_output_queries_the_store_if_there_is_one(self):
+        self.report.store = Mock()
+        self.report.store.query.return_value = [self.ec2instance]
+
+        self.report.output('ec2')
+
+        self.report.store.query.assert_called_with('ec2', exclude_state=None)
+        self.assertTrue(self.ec2instance.short_print.called)
@@ -1,5 +1,6 @@
 from tests.reports import ClinvReportBaseTestClass
 from clinv.reports.print import PrintReport
+from unittest.mock import Mock
 import unittest
 
 
@@ -20,3 +21,32 @@ class TestPrintReport(ClinvReportBaseTestClass, unittest.TestCase):
         self.assertTrue(
             self.inventory.inv['ec2']['i-023desldk394995ss'].print.called
         )
+
+    def test_output_queries_the_store_by_id_prefix(self):
+        self.report.store = Mock()
+        self.report.store.query.return_value = [
+            self.ec2instance,
+            self.rdsinstance,
+        ]
+
+        self.report.output('i-023.*')
+
+        self.report.store.query.assert_called_with(id_prefix='i-023')
+        self.assertTrue(self.ec2instance.print.called)
+        self.assertFalse(self.rdsinstance.print.called)
+
+    def test_id_prefix_of_a_literal_is_the_literal(self):
+        self.assertEqual(
+            self.report._id_prefix('i-023desldk394995ss'),
+            'i-023desldk394995ss',
+        )
+
+    def test_id_prefix_stops_at_the_first_special_character(self):
+        self.assertEqual(self.report._id_prefix('db-[A-Z]+'), 'db-')
+
+    def test_id_prefix_drops_the_character_of_a_quantifier(self):
+        self.assertEqual(self.report._id_prefix('i-023?'), 'i-02')
+        self.assertEqual(self.report._id_prefix('i-0{2}'), 'i-')
+
+    def test_id_prefix_of_an_alternation_is_empty(self):
+        self.assertEqual(self.report._id_prefix('i-023|db-'), '')
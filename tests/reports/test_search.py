@@ -1,6 +1,8 @@
 from tests.reports import ClinvReportBaseTestClass
-from clinv.reports.search import SearchReport
-from unittest.mock import patch, call
+from clinv.reports.search import BufferedStdout, SearchReport
+from clinv.sources import SearchQuery
+from unittest.mock import patch, call, Mock
+import io
 import unittest
 
 
@@ -27,3 +29,287 @@ class TestSearchReport(ClinvReportBaseTestClass, unittest.TestCase):
 
         self.assertEqual(printMock.mock_calls, [call('\nType: ec2')])
         self.assertTrue(self.ec2instance.short_print.called)
+
+    @patch('clinv.reports.search.print')
+    def test_output_compiles_the_search_once(self, printMock):
+        self.report.output('ec2')
+
+        queries = [
+            resource.search.mock_calls[0][1][0]
+            for resource in [self.ec2instance, self.rdsinstance]
+        ]
+        self.assertIsInstance(queries[0], SearchQuery)
+        self.assertIs(queries[0], queries[1])
+        self.assertEqual(queries[0].search_string, 'ec2')
+
+    @patch('clinv.reports.search.print')
+    def test_output_only_searches_the_index_candidates(self, printMock):
+        self.report.index = Mock()
+        self.report.index.candidates.return_value = {
+            'ec2': ['i-023desldk394995ss'],
+            'rds': [],
+        }
+        self.ec2instance.search.return_value = True
+
+        self.report.output('i-023')
+
+        self.report.index.candidates.assert_called_with('i-023')
+        self.assertTrue(self.ec2instance.search.called)
+        self.assertFalse(self.rdsinstance.search.called)
+        self.assertTrue(self.s3instance.search.called)
+        self.assertIn(call('\nType: ec2'), printMock.mock_calls)
+
+    @patch('clinv.reports.search.print')
+    def test_output_keeps_the_inventory_order_of_the_index_candidates(
+        self,
+        printMock,
+    ):
+        other_ec2instance = Mock()
+        other_ec2instance.id = 'i-01'
+        self.inventory.inv['ec2']['i-01'] = other_ec2instance
+        self.report.index = Mock()
+        self.report.index.candidates.return_value = {
+            'ec2': ['i-01', 'i-023desldk394995ss'],
+        }
+        manager = Mock()
+        for resource in [self.ec2instance, other_ec2instance]:
+            resource.search.return_value = True
+            manager.attach_mock(resource.short_print, resource.id)
+
+        self.report.output('i-0', limit=1)
+
+        self.assertEqual(
+            manager.mock_calls,
+            [getattr(call, 'i-023desldk394995ss')()],
+        )
+
+    @patch('clinv.reports.search.print')
+    def test_output_loads_the_search_index_once(self, printMock):
+        self.report.output('ec2')
+        self.report.output('rds')
+
+        self.assertEqual(
+            self.report.index,
+            self.inventory.load_search_index.return_value,
+        )
+        self.assertEqual(self.inventory.load_search_index.call_count, 1)
+        self.assertFalse(self.inventory.load_ip_index.called)
+
+    def test_resource_types_are_all_without_cidr(self):
+        self.assertIsNone(SearchReport.resource_types('ec2'))
+
+    def test_resource_types_are_the_ones_with_ips_with_cidr(self):
+        self.assertEqual(
+            SearchReport.resource_types(None, '10.0.0.0/8'),
+            ['ec2', 'rds', 'route53'],
+        )
+
+    def test_resource_types_include_the_projects_of_the_project_terms(self):
+        self.assertEqual(
+            SearchReport.resource_types('project:billing', '10.0.0.0/8'),
+            ['ec2', 'rds', 'route53', 'projects', 'services'],
+        )
+
+    @patch('clinv.reports.search.print')
+    def test_output_with_field_terms_uses_the_field_query(self, printMock):
+        self.inventory.load_field_index.return_value.indexed_fields = []
+        self.ec2instance.field_values.return_value = {
+            'id': 'i-023desldk394995ss',
+            'state': 'running',
+        }
+
+        self.report.output('type:ec2 state:running')
+
+        self.assertEqual(
+            self.report.field_index,
+            self.inventory.load_field_index.return_value,
+        )
+        self.assertFalse(self.inventory.load_search_index.called)
+        self.assertFalse(self.rdsinstance.field_values.called)
+        self.assertFalse(self.ec2instance.search.called)
+        self.assertEqual(printMock.mock_calls, [call('\nType: ec2')])
+        self.assertTrue(self.ec2instance.short_print.called)
+
+    @patch('clinv.reports.search.print')
+    def test_output_with_field_terms_only_checks_the_candidates(
+        self,
+        printMock,
+    ):
+        self.report.field_index = Mock()
+        self.report.field_index.indexed_fields = ['state']
+        self.report.field_index.candidates.return_value = {'ec2': []}
+
+        self.report.output('type:ec2 state:running')
+
+        self.report.field_index.candidates.assert_called_with(
+            'state',
+            'running',
+        )
+        self.assertFalse(self.ec2instance.field_values.called)
+        self.assertEqual(printMock.mock_calls, [])
+
+    @patch('clinv.reports.search.print')
+    def test_output_with_cidr_prints_the_ip_index_candidates(
+        self,
+        printMock,
+    ):
+        self.inventory.load_ip_index.return_value.candidates.return_value = {
+            'ec2': ['i-023desldk394995ss'],
+            'rds': [],
+            'route53': [],
+        }
+
+        self.report.output(None, '10.0.0.0/8')
+
+        self.inventory.load_ip_index.return_value.candidates\
+            .assert_called_with('10.0.0.0/8')
+        self.assertFalse(self.inventory.load_search_index.called)
+        self.assertFalse(self.ec2instance.search.called)
+        self.assertFalse(self.s3instance.search.called)
+        self.assertEqual(printMock.mock_calls, [call('\nType: ec2')])
+        self.assertTrue(self.ec2instance.short_print.called)
+        self.assertFalse(self.s3instance.short_print.called)
+
+    @patch('clinv.reports.search.print')
+    def test_output_with_cidr_keeps_the_inventory_order_of_the_candidates(
+        self,
+        printMock,
+    ):
+        other_ec2instance = Mock()
+        other_ec2instance.id = 'i-01'
+        self.inventory.inv['ec2']['i-01'] = other_ec2instance
+        self.inventory.load_ip_index.return_value.candidates.return_value = {
+            'ec2': ['i-01', 'i-023desldk394995ss'],
+            'rds': [],
+            'route53': [],
+        }
+        manager = Mock()
+        for resource in [self.ec2instance, other_ec2instance]:
+            manager.attach_mock(resource.short_print, resource.id)
+
+        self.report.output(None, '10.0.0.0/8')
+
+        self.assertEqual(
+            manager.mock_calls,
+            [
+                getattr(call, 'i-023desldk394995ss')(),
+                getattr(call, 'i-01')(),
+            ],
+        )
+
+    @patch('clinv.reports.search.print')
+    def test_output_with_cidr_and_search_string_checks_the_candidates(
+        self,
+        printMock,
+    ):
+        self.inventory.load_ip_index.return_value.candidates.return_value = {
+            'ec2': ['i-023desldk394995ss'],
+            'rds': ['db-YDFL2'],
+            'route53': [],
+        }
+        self.ec2instance.search.return_value = False
+        self.rdsinstance.search.return_value = True
+
+        self.report.output('db', '10.0.0.0/8')
+
+        self.assertTrue(self.ec2instance.search.called)
+        self.assertFalse(self.s3instance.search.called)
+        self.assertEqual(printMock.mock_calls, [call('\nType: rds')])
+
+    @patch('clinv.reports.search.print')
+    def test_output_prints_each_match_as_its_found(self, printMock):
+        manager = Mock()
+        manager.attach_mock(printMock, 'print')
+        for resource in [self.ec2instance, self.rdsinstance]:
+            resource.search.return_value = True
+            manager.attach_mock(resource.short_print, resource.id)
+
+        self.report.output('i-023')
+
+        self.assertEqual(
+            manager.mock_calls[:4],
+            [
+                call.print('\nType: ec2'),
+                getattr(call, 'i-023desldk394995ss')(),
+                call.print('\nType: rds'),
+                getattr(call, 'db-YDFL2')(),
+            ],
+        )
+
+    @patch('clinv.reports.search.print')
+    def test_output_stops_searching_at_the_limit(self, printMock):
+        self.ec2instance.search.return_value = True
+        self.rdsinstance.search.return_value = True
+
+        self.report.output('.*', limit=1)
+
+        self.assertTrue(self.ec2instance.short_print.called)
+        self.assertFalse(self.rdsinstance.search.called)
+        self.assertFalse(self.rdsinstance.short_print.called)
+        self.assertEqual(printMock.mock_calls, [call('\nType: ec2')])
+
+    @patch('clinv.reports.search.print')
+    def test_output_counts_the_matches_without_printing_them(
+        self,
+        printMock,
+    ):
+        self.ec2instance.search.return_value = True
+        self.rdsinstance.search.return_value = True
+
+        self.report.output('.*', count=True)
+
+        self.assertFalse(self.ec2instance.short_print.called)
+        self.assertFalse(self.rdsinstance.short_print.called)
+        self.assertEqual(
+            printMock.mock_calls,
+            [call('ec2: 1'), call('rds: 1'), call('Total: 2')],
+        )
+
+    @patch('clinv.reports.search.print')
+    def test_output_counts_up_to_the_limit(self, printMock):
+        self.ec2instance.search.return_value = True
+        self.rdsinstance.search.return_value = True
+
+        self.report.output('.*', limit=1, count=True)
+
+        self.assertEqual(
+            printMock.mock_calls,
+            [call('ec2: 1'), call('Total: 1')],
+        )
+
+
+class TestBufferedStdout(unittest.TestCase):
+    """
+    Test the BufferedStdout implementation.
+    """
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.output = BufferedStdout(
+            self.stream,
+            buffer_size=10,
+            flush_interval=60,
+        )
+
+    def test_write_gathers_the_small_writes(self):
+        self.assertEqual(self.output.write('line\n'), 5)
+
+        self.assertEqual(self.stream.getvalue(), '')
+
+    def test_write_writes_the_gathered_text_when_it_reaches_the_size(self):
+        self.output.write('line\n')
+        self.output.write('other\n')
+
+        self.assertEqual(self.stream.getvalue(), 'line\nother\n')
+
+    def test_write_writes_the_gathered_text_when_its_old(self):
+        self.output.flush_interval = 0
+        self.output.write('line\n')
+
+        self.assertEqual(self.stream.getvalue(), 'line\n')
+
+    def test_flush_writes_the_gathered_text(self):
+        self.output.write('line\n')
+        self.output.flush()
+
+        self.assertEqual(self.stream.getvalue(), 'line\n')
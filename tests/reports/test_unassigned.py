@@ -1,6 +1,6 @@
 from tests.reports import ClinvReportBaseTestClass
 from clinv.reports.unassigned import UnassignedReport
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 import unittest
 
 
@@ -21,6 +21,29 @@ class TestUnassignedReport(ClinvReportBaseTestClass, unittest.TestCase):
 
         self.assertTrue(self.ec2instance.short_print.called)
 
+    def test_unassigned_ec2_queries_the_active_instances_of_the_store(self):
+        self.report.store = Mock()
+        self.report.store.query.return_value = [self.ec2instance]
+
+        self.report._unassigned_ec2()
+
+        self.report.store.query.assert_called_with(
+            'ec2',
+            exclude_state='terminated',
+        )
+        self.assertTrue(self.ec2instance.short_print.called)
+
+    def test_unassigned_ec2_doesnt_print_assigned_instances_of_the_store(
+        self,
+    ):
+        self.service.raw = {'aws': {'ec2': ['i-023desldk394995ss']}}
+        self.report.store = Mock()
+        self.report.store.query.return_value = [self.ec2instance]
+
+        self.report._unassigned_ec2()
+
+        self.assertFalse(self.ec2instance.short_print.called)
+
     def test_unassigned_rds_prints_instances(self):
         self.rdsinstance.id = 'db-YDFL2'
         self.rdsinstance.name = 'resource_name'
@@ -260,3 +283,16 @@ class TestUnassignedReport(ClinvReportBaseTestClass, unittest.TestCase):
         self.assertTrue(rdsMock.called)
         self.assertTrue(route53Mock.called)
         self.assertTrue(s3Mock.called)
+
+    def test_resource_types_returns_the_type_and_its_assigner(self):
+        self.assertEqual(
+            UnassignedReport.resource_types('iam_users'),
+            ['iam_users', 'people'],
+        )
+        self.assertEqual(
+            UnassignedReport.resource_types('s3'),
+            ['s3', 'services'],
+        )
+
+    def test_resource_types_returns_all_types_for_all(self):
+        self.assertEqual(UnassignedReport.resource_types('all'), None)
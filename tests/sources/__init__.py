@@ -1,3 +1,4 @@
+from clinv.sources import SearchQuery
 from unittest.mock import patch, call
 import shutil
 import tempfile
@@ -182,6 +183,14 @@ class ClinvGenericResourceTests(object):
     def test_get_resource_state(self):
         self.assertEqual(self.resource.state, 'active')
 
+    def test_field_values_are_none_if_the_resource_doesnt_have_them(self):
+        self.resource.raw.pop('state', None)
+        self.resource.raw.pop('State', None)
+        self.resource.raw.pop('DBInstanceStatus', None)
+
+        self.assertEqual(self.resource.field_values()['id'], self.resource.id)
+        self.assertIsNone(self.resource.field_values()['state'])
+
     def test_short_print_resource_information(self):
 
         self.resource.short_print()
@@ -214,3 +223,11 @@ class ClinvGenericResourceTests(object):
 
     def test_match_list_returns_false_if_no_match(self):
         self.assertFalse(self.resource._match_list('a.c', ['0', '1']))
+
+    def test_match_list_accepts_a_compiled_query(self):
+        self.assertTrue(
+            self.resource._match_list(SearchQuery('a.c'), ['AbCd', '1'])
+        )
+
+    def test_search_accepts_a_compiled_query(self):
+        self.assertTrue(self.resource.search(SearchQuery(self.id)))
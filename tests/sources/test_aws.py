@@ -1,4 +1,6 @@
 from clinv.sources.aws import \
+    AWSBasesrc, \
+    AWSThrottler, \
     EC2src, \
     IAMUsersrc,\
     IAMGroupsrc, \
@@ -6,11 +8,24 @@ from clinv.sources.aws import \
     RDSsrc, \
     S3src
 from clinv.sources.aws import EC2, RDS, Route53, S3, IAMUser, IAMGroup
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+from botocore.exceptions import ClientError, EndpointConnectionError, \
+    NoCredentialsError
 from dateutil.tz import tzutc
-from unittest.mock import patch, call, PropertyMock
+from unittest.mock import patch, call, ANY, Mock, PropertyMock
 from tests.sources import ClinvSourceBaseTestClass, ClinvGenericResourceTests
+import boto3
+import copy
 import datetime
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
 import unittest
+import yaml
 
 
 class AWSSourceBaseTestClass(ClinvSourceBaseTestClass):
@@ -28,6 +43,8 @@ class AWSSourceBaseTestClass(ClinvSourceBaseTestClass):
         super().setUp()
         self.boto_patch = patch('clinv.sources.aws.boto3', autospect=True)
         self.boto = self.boto_patch.start()
+        self.boto.session.Session.return_value = self.boto
+        AWSBasesrc.configure()
 
     def tearDown(self):
         super().tearDown()
@@ -47,7 +64,528 @@ class AWSSourceBaseTestClass(ClinvSourceBaseTestClass):
         self.assertEqual(self.src.regions, ['us-east-1', 'eu-west-1'])
 
 
-class TestEC2Source(AWSSourceBaseTestClass, unittest.TestCase):
+class AWSInventorySourceTests(object):
+    '''
+    Tests of the inventory built by the AWS sources.
+
+    Must be combined with an AWSSourceBaseTestClass whose self.src has source
+    data.
+    '''
+
+    def test_generate_inventory_doesnt_modify_the_stored_data(self):
+        self.src.user_data = self.src.generate_user_data()
+        source_data = copy.deepcopy(self.src.source_data)
+        user_data = copy.deepcopy(self.src.user_data)
+
+        self.src.generate_inventory()
+
+        self.assertEqual(self.src.source_data, source_data)
+        self.assertEqual(self.src.user_data, user_data)
+
+
+class TestAWSSettings(unittest.TestCase):
+    '''
+    Test the AWS settings and caches shared by all the AWS sources.
+    '''
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.region_cache_path = os.path.join(self.tmp, 'aws_regions.yaml')
+        self.boto_patch = patch('clinv.sources.aws.boto3', autospect=True)
+        self.boto = self.boto_patch.start()
+        self.boto.session.Session.return_value = self.boto
+        self.boto.client.return_value.describe_regions.return_value = {
+            'Regions': [
+                {
+                    'RegionName': 'us-east-1'
+                },
+                {
+                    'RegionName': 'eu-west-1'
+                },
+            ]
+        }
+        AWSBasesrc.configure()
+
+    def tearDown(self):
+        self.boto_patch.stop()
+        AWSBasesrc.configure()
+        shutil.rmtree(self.tmp)
+
+    def test_configure_raises_error_on_unknown_settings(self):
+        with self.assertRaisesRegex(TypeError, 'Unknown AWS setting'):
+            AWSBasesrc.configure(unexistent='value')
+
+    def test_regions_are_shared_between_sources(self):
+        self.assertEqual(EC2src().regions, ['us-east-1', 'eu-west-1'])
+        self.assertEqual(RDSsrc().regions, ['us-east-1', 'eu-west-1'])
+        self.assertEqual(
+            len(self.boto.client.return_value.describe_regions.mock_calls),
+            1,
+        )
+
+    def test_configure_resets_the_regions_cache(self):
+        EC2src().regions
+        AWSBasesrc.configure()
+        EC2src().regions
+        self.assertEqual(
+            len(self.boto.client.return_value.describe_regions.mock_calls),
+            2,
+        )
+
+    def test_clients_are_shared_between_sources(self):
+        self.assertIs(
+            EC2src()._client('ec2', 'us-east-1'),
+            RDSsrc()._client('ec2', 'us-east-1'),
+        )
+        self.assertEqual(len(self.boto.session.Session.mock_calls), 1)
+        self.assertEqual(self.boto.client.call_count, 1)
+
+    def test_clients_are_cached_by_service_and_region(self):
+        EC2src()._client('ec2', 'us-east-1')
+        EC2src()._client('ec2', 'eu-west-1')
+        EC2src()._client('rds', 'eu-west-1')
+        EC2src()._client('ec2', 'eu-west-1')
+        self.assertEqual(self.boto.client.call_count, 3)
+
+    def test_clients_use_the_connection_settings(self):
+        AWSBasesrc.configure(max_pool_connections=30, max_attempts=3)
+        EC2src()._client('ec2', 'us-east-1')
+        config = self.boto.client.call_args[1]['config']
+        self.assertEqual(config.max_pool_connections, 30)
+        self.assertEqual(AWSBasesrc._throttler.max_attempts, 3)
+
+    def test_clients_dont_retry_the_calls_themselves(self):
+        EC2src()._client('ec2', 'us-east-1')
+        config = self.boto.client.call_args[1]['config']
+        self.assertEqual(config.retries, {'max_attempts': 0})
+
+    def test_configure_resets_the_clients_cache(self):
+        EC2src()._client('ec2', 'us-east-1')
+        AWSBasesrc.configure()
+        EC2src()._client('ec2', 'us-east-1')
+        self.assertEqual(self.boto.client.call_count, 2)
+
+    def test_regions_are_checkpointed_as_they_are_fetched(self):
+        AWSBasesrc.configure(
+            regions=['us-east-1', 'eu-west-1'],
+            checkpoint_dir=self.tmp,
+        )
+        EC2src()._fetch_regions(lambda region: [region])
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.tmp, 'ec2'))),
+            ['eu-west-1.pickle', 'us-east-1.pickle'],
+        )
+        self.assertEqual(
+            EC2src()._load_region_checkpoint('eu-west-1'),
+            ['eu-west-1'],
+        )
+
+    def test_resume_loads_the_checkpointed_regions(self):
+        AWSBasesrc.configure(
+            regions=['us-east-1', 'eu-west-1'],
+            checkpoint_dir=self.tmp,
+        )
+        EC2src()._save_region_checkpoint('us-east-1', ['checkpointed'])
+        AWSBasesrc.configure(
+            regions=['us-east-1', 'eu-west-1'],
+            checkpoint_dir=self.tmp,
+            resume=True,
+        )
+        fetch_region = Mock(return_value=['fetched'])
+
+        self.assertEqual(
+            EC2src()._fetch_regions(fetch_region),
+            {'us-east-1': ['checkpointed'], 'eu-west-1': ['fetched']},
+        )
+        self.assertEqual(fetch_region.mock_calls, [call('eu-west-1')])
+
+    def test_truncated_region_checkpoints_are_ignored(self):
+        AWSBasesrc.configure(checkpoint_dir=self.tmp)
+        EC2src()._save_region_checkpoint('us-east-1', ['checkpointed'])
+        checkpoint_path = EC2src()._region_checkpoint_path('us-east-1')
+        with open(checkpoint_path, 'rb+') as f:
+            f.truncate(10)
+
+        self.assertEqual(EC2src()._load_region_checkpoint('us-east-1'), None)
+
+    def test_regions_are_not_checkpointed_by_default(self):
+        AWSBasesrc.configure(regions=['us-east-1'])
+        EC2src()._fetch_regions(lambda region: [region])
+        self.assertEqual(os.listdir(self.tmp), [])
+
+    def test_region_clients_are_created_before_submitting_the_work(self):
+        AWSBasesrc.configure(regions=['us-east-1', 'eu-west-1'])
+        threads = []
+
+        def client(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return Mock()
+
+        self.boto.client.side_effect = client
+
+        EC2src()._fetch_regions(lambda region: [region], 'ec2')
+
+        self.assertEqual(threads, [threading.main_thread()] * 2)
+
+    def test_clients_share_the_throttler(self):
+        AWSBasesrc.configure(max_request_rate=5, throttle_retries=1)
+        with patch.object(AWSBasesrc._throttler, 'register') as registerMock:
+            EC2src()._client('ec2', 'us-east-1')
+            RDSsrc()._client('rds', 'us-east-1')
+        self.assertEqual(
+            registerMock.mock_calls,
+            [
+                call('ec2', self.boto.client.return_value),
+                call('rds', self.boto.client.return_value),
+            ],
+        )
+        self.assertEqual(AWSBasesrc._throttler.max_rate, 5)
+        self.assertEqual(AWSBasesrc._throttler.max_retries, 1)
+
+    def test_route53_has_its_own_request_rate(self):
+        self.assertEqual(AWSBasesrc._throttler._max_rate('route53'), 5)
+        self.assertEqual(AWSBasesrc._throttler._max_rate('ec2'), 20)
+        AWSBasesrc.configure(route53_request_rate=2)
+        self.assertEqual(AWSBasesrc._throttler._max_rate('route53'), 2)
+
+    def test_regions_allowlist_skips_region_discovery(self):
+        AWSBasesrc.configure(regions=['eu-west-1'])
+        self.assertEqual(EC2src().regions, ['eu-west-1'])
+        self.assertFalse(self.boto.client.return_value.describe_regions.called)
+
+    def test_regions_are_saved_in_the_disk_cache(self):
+        AWSBasesrc.configure(
+            region_cache_path=self.region_cache_path,
+            region_cache_ttl=60,
+        )
+        EC2src().regions
+        with open(self.region_cache_path, 'r') as f:
+            self.assertEqual(
+                yaml.safe_load(f)['regions'],
+                ['us-east-1', 'eu-west-1'],
+            )
+
+    def test_disk_cache_is_written_atomically(self):
+        AWSBasesrc.configure(
+            region_cache_path=self.region_cache_path,
+            region_cache_ttl=60,
+        )
+        with patch('clinv.sources.aws.os.replace', autospect=True) as \
+                replaceMock:
+            EC2src().regions
+
+        replaceMock.assert_called_once_with(
+            self.region_cache_path + '.tmp',
+            self.region_cache_path,
+        )
+        self.assertFalse(os.path.exists(self.region_cache_path))
+
+    def test_regions_are_loaded_from_a_valid_disk_cache(self):
+        with open(self.region_cache_path, 'w') as f:
+            yaml.dump({'fetch_time': time.time(), 'regions': ['eu-west-3']}, f)
+        AWSBasesrc.configure(
+            region_cache_path=self.region_cache_path,
+            region_cache_ttl=60,
+        )
+        self.assertEqual(EC2src().regions, ['eu-west-3'])
+        self.assertFalse(self.boto.client.return_value.describe_regions.called)
+
+    def test_regions_are_discovered_if_disk_cache_is_expired(self):
+        with open(self.region_cache_path, 'w') as f:
+            yaml.dump(
+                {'fetch_time': time.time() - 120, 'regions': ['eu-west-3']},
+                f,
+            )
+        AWSBasesrc.configure(
+            region_cache_path=self.region_cache_path,
+            region_cache_ttl=60,
+        )
+        self.assertEqual(EC2src().regions, ['us-east-1', 'eu-west-1'])
+
+    def test_disk_cache_is_not_used_by_default(self):
+        AWSBasesrc.configure(region_cache_path=self.region_cache_path)
+        EC2src().regions
+        self.assertFalse(os.path.exists(self.region_cache_path))
+
+
+class TestAWSThrottler(unittest.TestCase):
+    '''
+    Test the rate limit and backoff of the AWS API requests.
+    '''
+
+    def setUp(self):
+        self.time_patch = patch('clinv.sources.aws.time', autospect=True)
+        self.time = self.time_patch.start()
+        self.time.monotonic.return_value = 100
+        self.random_patch = patch('clinv.sources.aws.random', autospect=True)
+        self.random = self.random_patch.start()
+        self.random.uniform.side_effect = lambda low, high: high
+        self.throttler = AWSThrottler(max_rate=2, max_retries=2)
+        self.request_dict = {'context': {}}
+
+    def tearDown(self):
+        self.time_patch.stop()
+        self.random_patch.stop()
+
+    def response(self, status=200, code=None):
+        parsed = {'ResponseMetadata': {'HTTPStatusCode': status}}
+        if code is not None:
+            parsed['Error'] = {'Code': code, 'Message': 'Error'}
+        return (Mock(status_code=status), parsed)
+
+    def send(self, service='route53', response=None, exception=None):
+        self.throttler._before_send(service)
+        if response is None and exception is None:
+            response = self.response()
+        return self.throttler._needs_retry(
+            service,
+            response=response,
+            caught_exception=exception,
+            request_dict=self.request_dict,
+            attempts=1,
+        )
+
+    def test_register_handles_the_events_of_the_client(self):
+        client = Mock()
+        self.assertIs(self.throttler.register('route53', client), client)
+        self.assertEqual(
+            [
+                register_call[1][0]
+                for register_call in client.meta.events.register.mock_calls
+            ],
+            ['before-send', 'needs-retry'],
+        )
+
+    def test_successful_requests_are_not_retried(self):
+        self.assertEqual(self.send(), None)
+        self.assertFalse(self.time.sleep.called)
+
+    def test_requests_wait_when_the_service_bucket_is_empty(self):
+        for _ in range(3):
+            self.send()
+        self.assertEqual(self.time.sleep.mock_calls, [call(0.5)])
+        self.assertEqual(self.throttler.stats['route53']['wait_time'], 0.5)
+
+    def test_buckets_are_independent_between_services(self):
+        for _ in range(2):
+            self.send('route53')
+        self.send('s3')
+        self.assertFalse(self.time.sleep.called)
+
+    def test_bucket_is_refilled_with_time(self):
+        for _ in range(2):
+            self.send()
+        self.time.monotonic.return_value = 101
+        self.send()
+        self.assertFalse(self.time.sleep.called)
+
+    def test_throttled_requests_are_retried_with_backoff(self):
+        self.assertEqual(
+            self.send(response=self.response(400, 'Throttling')),
+            0.5,
+        )
+        self.assertEqual(
+            self.send(response=self.response(400, 'Throttling')),
+            1,
+        )
+        self.assertEqual(self.throttler.stats['route53']['throttles'], 2)
+        self.assertEqual(self.throttler.stats['route53']['wait_time'], 1.5)
+
+    def test_backoff_grows_exponentially_up_to_the_cap(self):
+        self.assertEqual(self.throttler._backoff(0), 0.5)
+        self.assertEqual(self.throttler._backoff(2), 2)
+        self.assertEqual(self.throttler._backoff(10), 20)
+
+    def test_throttled_requests_halve_the_service_rate(self):
+        self.send(response=self.response(400, 'Throttling'))
+        self.assertEqual(self.throttler._buckets['route53']['rate'], 1)
+        self.send()
+        self.assertEqual(self.throttler._buckets['route53']['rate'], 1.1)
+
+    def test_service_rates_lower_the_rate_of_their_service(self):
+        self.throttler = AWSThrottler(max_rate=2, service_rates={'route53': 1})
+        for _ in range(2):
+            self.send('route53')
+        self.assertEqual(self.time.sleep.mock_calls, [call(1)])
+        self.send(response=self.response(400, 'Throttling'))
+        self.send()
+        self.assertEqual(self.throttler._buckets['route53']['rate'], 0.6)
+        for _ in range(10):
+            self.send()
+        self.assertEqual(self.throttler._buckets['route53']['rate'], 1)
+
+    def test_service_rates_dont_raise_the_max_rate(self):
+        self.throttler = AWSThrottler(max_rate=2, service_rates={'route53': 5})
+        self.assertEqual(self.throttler._max_rate('route53'), 2)
+        self.assertEqual(self.throttler._max_rate('ec2'), 2)
+
+    def test_throttled_requests_are_not_retried_after_max_retries(self):
+        for _ in range(2):
+            self.send(response=self.response(400, 'Throttling'))
+        self.assertEqual(
+            self.send(response=self.response(400, 'Throttling')),
+            None,
+        )
+        self.assertEqual(self.throttler.stats['route53']['throttles'], 3)
+
+    def test_retries_are_counted_per_request(self):
+        for _ in range(2):
+            self.send(response=self.response(400, 'Throttling'))
+        self.request_dict = {'context': {}}
+        self.assertEqual(
+            self.send(response=self.response(400, 'Throttling')),
+            0.5,
+        )
+
+    def test_other_errors_are_not_retried(self):
+        self.assertEqual(
+            self.send(response=self.response(403, 'AccessDenied')),
+            None,
+        )
+
+    def test_transient_errors_are_retried_without_changing_the_rate(self):
+        self.throttler.max_attempts = 3
+
+        self.assertEqual(
+            self.send(
+                exception=EndpointConnectionError(
+                    endpoint_url='https://route53',
+                ),
+            ),
+            0.5,
+        )
+        self.assertEqual(
+            self.send(response=self.response(500, 'InternalError')),
+            1,
+        )
+        self.assertEqual(
+            self.send(response=self.response(502, 'BadGateway')),
+            2,
+        )
+        self.assertEqual(self.throttler.stats['route53']['throttles'], 0)
+        self.assertEqual(self.throttler._buckets['route53']['rate'], 2)
+
+    def test_transient_errors_are_not_retried_after_max_attempts(self):
+        self.throttler.max_attempts = 1
+        error = EndpointConnectionError(endpoint_url='https://route53')
+
+        self.assertEqual(self.send(exception=error), 0.5)
+        self.assertEqual(self.send(exception=error), None)
+
+    def test_other_botocore_errors_are_not_retried(self):
+        self.assertEqual(self.send(exception=NoCredentialsError()), None)
+
+    def test_log_stats_logs_the_counters_of_each_service(self):
+        self.send(response=self.response(400, 'Throttling'))
+        self.send()
+        self.send('s3')
+        with patch.object(self.throttler, 'log') as log:
+            self.throttler.log_stats()
+        self.assertEqual(
+            log.warning.mock_calls,
+            [call('route53: 2 calls, 1 throttled, 0.50s waiting')],
+        )
+        self.assertEqual(
+            log.info.mock_calls,
+            [call('s3: 1 calls, 0 throttled, 0.00s waiting')],
+        )
+
+
+class TestAWSThrottlerClient(unittest.TestCase):
+    '''
+    Test the throttler on the requests sent by a botocore client.
+    '''
+
+    def setUp(self):
+        self.random_patch = patch('clinv.sources.aws.random', autospect=True)
+        self.random = self.random_patch.start()
+        self.random.uniform.return_value = 0
+        self.throttler = AWSThrottler(max_rate=100)
+        self.client = boto3.session.Session(
+            aws_access_key_id='access_key',
+            aws_secret_access_key='secret_key',
+        ).client(
+            'route53',
+            region_name='us-east-1',
+            config=Config(retries={'max_attempts': 0}),
+        )
+        self.throttler.register('route53', self.client)
+        self.responses = []
+        self.requests = []
+        self.client.meta.events.register('before-send', self.fake_send)
+
+    def tearDown(self):
+        self.random_patch.stop()
+
+    def fake_send(self, request, **kwargs):
+        self.requests.append(request.url)
+        status, body = self.responses.pop(0)
+        raw = Mock()
+        raw.stream.return_value = [body.encode('utf-8')]
+        return AWSResponse(request.url, status, {}, raw)
+
+    def hosted_zones(self, next_marker=None):
+        if next_marker is None:
+            truncated = '<IsTruncated>false</IsTruncated>'
+        else:
+            truncated = '<IsTruncated>true</IsTruncated>' \
+                '<NextMarker>{}</NextMarker>'.format(next_marker)
+        return (
+            200,
+            '<ListHostedZonesResponse xmlns="https://route53.amazonaws.com/'
+            'doc/2013-04-01/"><HostedZones/>{}<MaxItems>100</MaxItems>'
+            '</ListHostedZonesResponse>'.format(truncated),
+        )
+
+    def error(self, status, code):
+        return (
+            status,
+            '<ErrorResponse xmlns="https://route53.amazonaws.com/doc/'
+            '2013-04-01/"><Error><Type>Sender</Type><Code>{}</Code>'
+            '<Message>Error</Message></Error><RequestId>1</RequestId>'
+            '</ErrorResponse>'.format(code),
+        )
+
+    def test_api_calls_are_retried_when_throttled(self):
+        self.responses = [self.error(400, 'Throttling'), self.hosted_zones()]
+
+        self.client.list_hosted_zones()
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.throttler.stats['route53']['calls'], 2)
+        self.assertEqual(self.throttler.stats['route53']['throttles'], 1)
+
+    def test_paginator_page_requests_are_retried_when_throttled(self):
+        self.responses = [
+            self.hosted_zones('next'),
+            self.error(400, 'Throttling'),
+            self.error(503, 'ServiceUnavailable'),
+            self.hosted_zones(),
+        ]
+
+        pages = list(
+            self.client.get_paginator('list_hosted_zones').paginate()
+        )
+
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(len(self.requests), 4)
+        self.assertIn('marker=next', self.requests[-1])
+        self.assertEqual(self.throttler.stats['route53']['throttles'], 1)
+
+    def test_errors_are_raised_after_the_retries(self):
+        self.throttler.max_retries = 1
+        self.responses = [self.error(400, 'Throttling')] * 2
+
+        with self.assertRaises(ClientError):
+            self.client.list_hosted_zones()
+        self.assertEqual(len(self.requests), 2)
+
+
+class TestEC2Source(
+    AWSInventorySourceTests,
+    AWSSourceBaseTestClass,
+    unittest.TestCase,
+):
     '''
     Test the EC2 implementation in the inventory.
     '''
@@ -131,7 +669,7 @@ class TestEC2Source(AWSSourceBaseTestClass, unittest.TestCase):
         regionsMock
     ):
         regionsMock.return_value = ['us-east-1']
-        self.boto.client.return_value.describe_instances.return_value = {
+        page = {
             'Reservations': [
                 {
                     'Groups': [],
@@ -261,6 +799,8 @@ class TestEC2Source(AWSSourceBaseTestClass, unittest.TestCase):
                 }
             ]
         }
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [page]
 
         self.src.source_data = {}
 
@@ -274,6 +814,159 @@ class TestEC2Source(AWSSourceBaseTestClass, unittest.TestCase):
             self.desired_source_data,
         )
 
+    @patch('clinv.sources.aws.EC2src.regions', new_callable=PropertyMock)
+    def test_generate_source_data_fetches_all_regions(self, regionsMock):
+        regionsMock.return_value = ['us-east-1', 'eu-west-1']
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [{'Reservations': []}]
+
+        self.src.source_data = {}
+        self.src.generate_source_data()
+
+        self.assertEqual(
+            self.src.source_data,
+            {'us-east-1': [], 'eu-west-1': []},
+        )
+        self.assertIn(
+            call('ec2', region_name='us-east-1', config=ANY),
+            self.boto.client.mock_calls,
+        )
+        self.assertIn(
+            call('ec2', region_name='eu-west-1', config=ANY),
+            self.boto.client.mock_calls,
+        )
+
+    @patch('clinv.sources.aws.EC2src.regions', new_callable=PropertyMock)
+    def test_generate_source_data_prunes_all_pages(self, regionsMock):
+        regionsMock.return_value = ['us-east-1']
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [
+            {
+                'Reservations': [
+                    {
+                        'Instances': [
+                            {
+                                'InstanceId': 'i-1',
+                                'KeyName': 'ssh_keypair',
+                                'NetworkInterfaces': [
+                                    {'MacAddress': '0a:ff:ff:ff:ff:aa'},
+                                ],
+                            },
+                        ],
+                    },
+                ],
+            },
+            {
+                'Reservations': [
+                    {
+                        'Instances': [
+                            {
+                                'InstanceId': 'i-2',
+                                'KeyName': 'ssh_keypair',
+                                'NetworkInterfaces': [],
+                            },
+                        ],
+                    },
+                ],
+            },
+        ]
+
+        self.src.source_data = {}
+        self.src.generate_source_data()
+
+        self.assertEqual(
+            self.src.source_data,
+            {
+                'us-east-1': [
+                    {
+                        'Instances': [
+                            {
+                                'InstanceId': 'i-1',
+                                'NetworkInterfaces': [{}],
+                            },
+                        ],
+                    },
+                    {
+                        'Instances': [
+                            {
+                                'InstanceId': 'i-2',
+                                'NetworkInterfaces': [],
+                            },
+                        ],
+                    },
+                ],
+            },
+        )
+        self.assertEqual(
+            self.boto.client.return_value.get_paginator.assert_called_with(
+                'describe_instances'
+            ),
+            None,
+        )
+
+    @patch('clinv.sources.aws.EC2src.regions', new_callable=PropertyMock)
+    def test_generate_source_data_respects_max_region_workers(
+        self,
+        regionsMock
+    ):
+        regionsMock.return_value = ['us-east-1', 'eu-west-1']
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [{'Reservations': []}]
+        self.src.max_region_workers = 1
+
+        self.src.source_data = {}
+        self.src.generate_source_data()
+
+        self.assertEqual(
+            self.src.source_data,
+            {'us-east-1': [], 'eu-west-1': []},
+        )
+
+    @patch('clinv.sources.aws.EC2src.regions', new_callable=PropertyMock)
+    def test_generate_source_data_doesnt_abort_on_region_errors(
+        self,
+        regionsMock
+    ):
+        regionsMock.return_value = ['us-east-1', 'eu-west-1']
+        error = ClientError(
+            {'Error': {'Code': 'AuthFailure', 'Message': 'Not enabled'}},
+            'DescribeInstances',
+        )
+
+        clients = {
+            'us-east-1': Mock(),
+            'eu-west-1': Mock(),
+        }
+        working_paginator = clients['us-east-1'].get_paginator.return_value
+        working_paginator.paginate.return_value = [{'Reservations': []}]
+        failing_paginator = clients['eu-west-1'].get_paginator.return_value
+        failing_paginator.paginate.side_effect = error
+        self.boto.client.side_effect = \
+            lambda service, region_name, config: clients[region_name]
+
+        self.src.source_data = {}
+        self.src.generate_source_data()
+
+        self.assertEqual(self.src.source_data, {'us-east-1': []})
+        self.assertEqual(self.src.region_errors, {'eu-west-1': str(error)})
+
+    @patch('clinv.sources.aws.EC2src.regions', new_callable=PropertyMock)
+    def test_generate_source_data_keeps_previous_data_of_failed_regions(
+        self,
+        regionsMock
+    ):
+        regionsMock.return_value = ['us-east-1']
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.side_effect = ClientError(
+            {'Error': {'Code': 'AuthFailure', 'Message': 'Not enabled'}},
+            'DescribeInstances',
+        )
+
+        self.src.generate_source_data()
+
+        self.assertEqual(self.src.source_data, self.desired_source_data)
+        self.assertEqual(list(self.src.region_errors.keys()), ['us-east-1'])
+
     def test_generate_user_data_creates_empty_user_data_if_no_src_data(self):
         self.src.source_data = {'us-east-1': {}}
         self.src.generate_user_data()
@@ -362,7 +1055,11 @@ class TestEC2Source(AWSSourceBaseTestClass, unittest.TestCase):
         )
 
 
-class TestRDSSource(AWSSourceBaseTestClass, unittest.TestCase):
+class TestRDSSource(
+    AWSInventorySourceTests,
+    AWSSourceBaseTestClass,
+    unittest.TestCase,
+):
     '''
     Test the RDS implementation in the inventory.
     '''
@@ -455,7 +1152,7 @@ class TestRDSSource(AWSSourceBaseTestClass, unittest.TestCase):
         regionsMock
     ):
         regionsMock.return_value = ['us-east-1']
-        self.boto.client.return_value.describe_db_instances.return_value = {
+        page = {
             'DBInstances': [
                 {
                     'AllocatedStorage': 100,
@@ -548,6 +1245,8 @@ class TestRDSSource(AWSSourceBaseTestClass, unittest.TestCase):
                 },
             ],
         }
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [page]
 
         self.src.source_data = {}
         generated_source_data = self.src.generate_source_data()
@@ -560,6 +1259,24 @@ class TestRDSSource(AWSSourceBaseTestClass, unittest.TestCase):
             self.desired_source_data,
         )
 
+    @patch('clinv.sources.aws.RDSsrc.regions', new_callable=PropertyMock)
+    def test_generate_source_data_fetches_all_regions(self, regionsMock):
+        regionsMock.return_value = ['us-east-1', 'eu-west-1']
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [{'DBInstances': []}]
+
+        self.src.source_data = {}
+        self.src.generate_source_data()
+
+        self.assertEqual(
+            self.src.source_data,
+            {'us-east-1': [], 'eu-west-1': []},
+        )
+        self.assertIn(
+            call('rds', region_name='eu-west-1', config=ANY),
+            self.boto.client.mock_calls,
+        )
+
     def test_generate_user_data_creates_empty_user_data_if_no_src_data(self):
         self.src.source_data = {'us-east-1': {}}
         self.src.generate_user_data()
@@ -619,7 +1336,11 @@ class TestRDSSource(AWSSourceBaseTestClass, unittest.TestCase):
         )
 
 
-class TestRoute53Source(AWSSourceBaseTestClass, unittest.TestCase):
+class TestRoute53Source(
+    AWSInventorySourceTests,
+    AWSSourceBaseTestClass,
+    unittest.TestCase,
+):
     '''
     Test the Route53 implementation in the inventory.
     '''
@@ -766,7 +1487,7 @@ class TestRoute53SourceFetch(AWSSourceBaseTestClass, unittest.TestCase):
         self.boto_client = self.boto.client.return_value
 
         # Expected boto call to get the hosted zones
-        self.boto_client.list_hosted_zones.return_value = {
+        page = {
             'HostedZones': [
                 {
                     'CallerReference': 'XXXXXXXX-XXXX-XXXX-XXXX-XXXXXXXXXXXX',
@@ -794,6 +1515,8 @@ class TestRoute53SourceFetch(AWSSourceBaseTestClass, unittest.TestCase):
                 'RetryAttempts': 0,
             },
         }
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [page]
 
     def tearDown(self):
         super().tearDown()
@@ -1004,8 +1727,74 @@ class TestRoute53SourceFetch(AWSSourceBaseTestClass, unittest.TestCase):
             ]
         )
 
+    @patch('clinv.sources.aws.ThreadPoolExecutor', autospect=True)
+    def test_generate_source_data_uses_the_max_zone_workers(
+        self,
+        executorMock,
+    ):
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [{'HostedZones': []}]
+        executorMock.return_value.__enter__.return_value.map.return_value = []
+        AWSBasesrc.configure(max_zone_workers=2)
+
+        self.src.generate_source_data()
+
+        self.assertEqual(executorMock.call_args, call(max_workers=2))
+
+    def test_generate_source_data_fetches_zones_concurrently(self):
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [
+            {
+                'HostedZones': [
+                    {
+                        'Config': {'PrivateZone': False},
+                        'Id': '/hostedzone/zone_{}'.format(index),
+                        'Name': 'zone{}.org'.format(index),
+                    }
+                    for index in range(10)
+                ],
+            },
+        ]
+
+        def list_resource_record_sets(HostedZoneId, **kwargs):
+            zone_name = HostedZoneId.replace('/hostedzone/', '')
+            if 'StartRecordName' not in kwargs:
+                return {
+                    'IsTruncated': True,
+                    'NextRecordName': 'record2',
+                    'NextRecordType': 'A',
+                    'ResourceRecordSets': [
+                        {'Name': '{}-record1'.format(zone_name)},
+                    ],
+                }
+            return {
+                'IsTruncated': False,
+                'ResourceRecordSets': [
+                    {'Name': '{}-record2'.format(zone_name)},
+                ],
+            }
+        self.boto_client.list_resource_record_sets.side_effect = \
+            list_resource_record_sets
+        AWSBasesrc.configure(max_zone_workers=3)
+
+        self.src.generate_source_data()
+
+        for index, zone in enumerate(self.src.source_data['hosted_zones']):
+            self.assertEqual(zone['Name'], 'zone{}.org'.format(index))
+            self.assertEqual(
+                zone['records'],
+                [
+                    {'Name': 'zone_{}-record1'.format(index)},
+                    {'Name': 'zone_{}-record2'.format(index)},
+                ],
+            )
 
-class TestS3Source(AWSSourceBaseTestClass, unittest.TestCase):
+
+class TestS3Source(
+    AWSInventorySourceTests,
+    AWSSourceBaseTestClass,
+    unittest.TestCase,
+):
     '''
     Test the S3 implementation in the inventory.
     '''
@@ -1152,6 +1941,86 @@ class TestS3Source(AWSSourceBaseTestClass, unittest.TestCase):
             self.desired_source_data,
         )
 
+    def test_generate_source_data_records_bucket_acl_errors(self):
+        self.boto.client.return_value.list_buckets.return_value = {
+            'Buckets': [
+                {
+                    'CreationDate': datetime.datetime(
+                        2012, 12, 12, 0, 7, 46, tzinfo=tzutc()
+                    ),
+                    'Name': 'denied_bucket'
+                },
+                {
+                    'CreationDate': datetime.datetime(
+                        2012, 12, 12, 0, 7, 46, tzinfo=tzutc()
+                    ),
+                    'Name': 'private_bucket'
+                },
+            ],
+        }
+
+        def get_bucket_acl(Bucket):
+            if Bucket == 'denied_bucket':
+                raise ClientError(
+                    {'Error': {'Code': 'AccessDenied', 'Message': 'Denied'}},
+                    'GetBucketAcl',
+                )
+            return {'Grants': []}
+        self.boto.client.return_value.get_bucket_acl.side_effect = \
+            get_bucket_acl
+
+        self.src.source_data = {}
+        self.src.generate_source_data()
+
+        self.assertEqual(
+            list(self.src.source_data.keys()),
+            ['denied_bucket', 'private_bucket'],
+        )
+        self.assertEqual(
+            self.src.source_data['denied_bucket']['AclError'],
+            'AccessDenied',
+        )
+        self.assertEqual(
+            self.src.source_data['denied_bucket']['permissions'],
+            {'READ': 'unknown', 'WRITE': 'unknown'},
+        )
+        self.assertEqual(
+            self.src.source_data['private_bucket']['permissions'],
+            {'READ': 'private', 'WRITE': 'private'},
+        )
+        self.assertNotIn('AclError', self.src.source_data['private_bucket'])
+
+    def test_generate_source_data_records_connection_errors_per_bucket(self):
+        self.boto.client.return_value.list_buckets.return_value = {
+            'Buckets': [
+                {'Name': 'unreachable_bucket'},
+                {'Name': 'private_bucket'},
+            ],
+        }
+
+        def get_bucket_acl(Bucket):
+            if Bucket == 'unreachable_bucket':
+                raise EndpointConnectionError(endpoint_url='https://s3')
+            return {'Grants': []}
+        self.boto.client.return_value.get_bucket_acl.side_effect = \
+            get_bucket_acl
+
+        self.src.source_data = {}
+        self.src.generate_source_data()
+
+        self.assertEqual(
+            self.src.source_data['unreachable_bucket']['AclError'],
+            'EndpointConnectionError',
+        )
+        self.assertEqual(
+            self.src.source_data['unreachable_bucket']['permissions'],
+            {'READ': 'unknown', 'WRITE': 'unknown'},
+        )
+        self.assertEqual(
+            self.src.source_data['private_bucket']['permissions'],
+            {'READ': 'private', 'WRITE': 'private'},
+        )
+
     def test_generate_user_data_creates_expected_user_data_attrib(self):
         generated_user_data = self.src.generate_user_data()
 
@@ -1211,7 +2080,11 @@ class TestS3Source(AWSSourceBaseTestClass, unittest.TestCase):
         )
 
 
-class TestIAMUserSource(AWSSourceBaseTestClass, unittest.TestCase):
+class TestIAMUserSource(
+    AWSInventorySourceTests,
+    AWSSourceBaseTestClass,
+    unittest.TestCase,
+):
     '''
     Test the IAMUser source implementation in the inventory.
     '''
@@ -1251,22 +2124,27 @@ class TestIAMUserSource(AWSSourceBaseTestClass, unittest.TestCase):
         super().tearDown()
 
     def test_generate_source_data_creates_expected_source_data_attrib(self):
-        self.boto.client.return_value.list_users.return_value = {
-            'Users': [
-                {
-                    'UserName': 'User 1',
-                    'Path': '/',
-                    'CreateDate': datetime.datetime(
-                        2019, 2, 7, 12, 15, 57, tzinfo=tzutc()
-                    ),
-                    'PasswordLastUsed': datetime.datetime(
-                        2019, 11, 5, 9, 10, 59, tzinfo=tzutc()
-                    ),
-                    'UserId': 'XXXXXXXXXXXXXXXXXXXXX',
-                    'Arn': 'arn:aws:iam::XXXXXXXXXXXX:user/user_1'
-                },
-            ]
-        }
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [
+            {
+                'UserDetailList': [
+                    {
+                        'UserName': 'User 1',
+                        'Path': '/',
+                        'CreateDate': datetime.datetime(
+                            2019, 2, 7, 12, 15, 57, tzinfo=tzutc()
+                        ),
+                        'UserId': 'XXXXXXXXXXXXXXXXXXXXX',
+                        'Arn': 'arn:aws:iam::XXXXXXXXXXXX:user/user_1',
+                        'UserPolicyList': [],
+                        'GroupList': ['Administrator'],
+                        'AttachedManagedPolicies': [],
+                    },
+                ],
+                'GroupDetailList': [],
+                'IsTruncated': False,
+            },
+        ]
 
         self.src.source_data = {}
         generated_source_data = self.src.generate_source_data()
@@ -1345,7 +2223,11 @@ class TestIAMUserSource(AWSSourceBaseTestClass, unittest.TestCase):
         )
 
 
-class TestIAMGroupSource(AWSSourceBaseTestClass, unittest.TestCase):
+class TestIAMGroupSource(
+    AWSInventorySourceTests,
+    AWSSourceBaseTestClass,
+    unittest.TestCase,
+):
     '''
     Test the IAMGroup implementation in the inventory.
     '''
@@ -1397,65 +2279,56 @@ class TestIAMGroupSource(AWSSourceBaseTestClass, unittest.TestCase):
         super().tearDown()
 
     def test_generate_source_data_creates_expected_source_data_attrib(self):
-        boto_mock = self.boto.client.return_value
-        boto_mock.list_groups.return_value = {
-            'Groups': [
-                {
-                    'Arn': 'arn:aws:iam::XXXXXXXXXXXX:group/Administrator',
-                    'CreateDate': datetime.datetime(
-                        2019, 11, 4, 12, 41, 24, tzinfo=tzutc()
-                    ),
-                    'GroupId': 'XXXXXXXXXXXXXXXXXXXXX',
-                    'GroupName': 'Administrator',
-                    'Path': '/',
-                }
-            ],
-            'IsTruncated': False,
-            'ResponseMetadata': {},
-        }
-
-        boto_mock.get_group.return_value = {
-            'Group': {
-                'Arn': 'arn:aws:iam::XXXXXXXXXXXX:group/Administrator',
-                'CreateDate': datetime.datetime(
-                    2019, 11, 4, 12, 41, 24, tzinfo=tzutc()
-                ),
-                'GroupId': 'XXXXXXXXXXXXXXXXXXXXX',
-                'GroupName': 'Administrator',
-                'Path': '/',
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [
+            {
+                'UserDetailList': [
+                    {
+                        'UserName': 'User 1',
+                        'Path': '/',
+                        'CreateDate': datetime.datetime(
+                            2019, 2, 7, 12, 15, 57, tzinfo=tzutc()
+                        ),
+                        'UserId': 'XXXXXXXXXXXXXXXXXXXXX',
+                        'Arn': 'arn:aws:iam::XXXXXXXXXXXX:user/user_1',
+                        'UserPolicyList': [],
+                        'GroupList': ['Administrator'],
+                        'AttachedManagedPolicies': [],
+                    },
+                ],
+                'GroupDetailList': [],
+                'IsTruncated': True,
+                'Marker': 'marker',
             },
-            'IsTruncated': False,
-            'ResponseMetadata': {},
-            'Users': [
-                {
-                    'UserName': 'User 1',
-                    'Path': '/',
-                    'CreateDate': datetime.datetime(
-                        2019, 2, 7, 12, 15, 57, tzinfo=tzutc()
-                    ),
-                    'PasswordLastUsed': datetime.datetime(
-                        2019, 11, 5, 9, 10, 59, tzinfo=tzutc()
-                    ),
-                    'UserId': 'XXXXXXXXXXXXXXXXXXXXX',
-                    'Arn': 'arn:aws:iam::XXXXXXXXXXXX:user/user_1'
-                }
-            ],
-        }
-        boto_mock.list_group_policies.return_value = {
-            'PolicyNames': ['Inlinepolicy'],
-            'IsTruncated': False,
-            'ResponseMetadata': {},
-        }
-        boto_mock.list_attached_group_policies.return_value = {
-            'AttachedPolicies': [
-                {
-                    'PolicyArn': 'arn:aws:iam::aws:policy/Attachedpolicy',
-                    'PolicyName': 'AttachedPolicy'
-                },
-            ],
-            'IsTruncated': False,
-            'ResponseMetadata': {},
-        }
+            {
+                'UserDetailList': [],
+                'GroupDetailList': [
+                    {
+                        'Path': '/',
+                        'GroupName': 'Administrator',
+                        'GroupId': 'XXXXXXXXXXXXXXXXXXXXX',
+                        'Arn': 'arn:aws:iam::XXXXXXXXXXXX:group/Administrator',
+                        'CreateDate': datetime.datetime(
+                            2019, 11, 4, 12, 41, 24, tzinfo=tzutc()
+                        ),
+                        'GroupPolicyList': [
+                            {
+                                'PolicyName': 'Inlinepolicy',
+                                'PolicyDocument': {},
+                            },
+                        ],
+                        'AttachedManagedPolicies': [
+                            {
+                                'PolicyName': 'AttachedPolicy',
+                                'PolicyArn':
+                                    'arn:aws:iam::aws:policy/Attachedpolicy',
+                            },
+                        ],
+                    },
+                ],
+                'IsTruncated': False,
+            },
+        ]
 
         self.src.source_data = {}
 
@@ -1470,6 +2343,30 @@ class TestIAMGroupSource(AWSSourceBaseTestClass, unittest.TestCase):
             self.desired_source_data,
         )
 
+    def test_generate_source_data_shares_iam_fetch_with_users_source(self):
+        paginator = self.boto.client.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [
+            {
+                'UserDetailList': [],
+                'GroupDetailList': [],
+                'IsTruncated': False,
+            },
+        ]
+
+        self.src.generate_source_data()
+        IAMUsersrc().generate_source_data()
+
+        self.assertEqual(
+            self.boto.client.return_value.get_paginator.assert_called_with(
+                'get_account_authorization_details'
+            ),
+            None,
+        )
+        self.assertEqual(
+            paginator.paginate.mock_calls,
+            [call(Filter=['User', 'Group'])],
+        )
+
     def test_generate_user_data_creates_expected_user_data_attrib(self):
         generated_user_data = self.src.generate_user_data()
 
@@ -1749,6 +2646,52 @@ class TestEC2(ClinvAWSResourceTests, unittest.TestCase):
             ['32.312.444.22', '32.312.444.23']
         )
 
+    def test_field_values_include_the_region_and_instance_type(self):
+        self.assertEqual(
+            self.resource.field_values(),
+            {
+                'id': 'i-01',
+                'instance_type': 'c4.4xlarge',
+                'name': 'resource_name',
+                'region': 'us-east-1',
+                'state': 'active',
+            },
+        )
+
+    def test_ip_addresses_are_the_private_and_public_ips(self):
+        self.assertEqual(
+            self.resource.ip_addresses(),
+            ['142.33.2.113', '32.312.444.22'],
+        )
+
+    def test_derived_fields_are_cached_on_first_access(self):
+        self.assertEqual(self.resource.name, 'resource_name')
+        self.assertEqual(self.resource.private_ips, ['142.33.2.113'])
+        self.assertEqual(self.resource.public_ips, ['32.312.444.22'])
+        self.assertEqual(
+            self.resource.security_groups,
+            ['sg-f2234gf6', 'sg-cwfccs17'],
+        )
+
+        self.resource.raw['Tags'] = []
+        self.resource.raw['NetworkInterfaces'] = []
+        self.resource.raw['SecurityGroups'] = []
+
+        self.assertEqual(self.resource.name, 'resource_name')
+        self.assertEqual(self.resource.private_ips, ['142.33.2.113'])
+        self.assertEqual(self.resource.public_ips, ['32.312.444.22'])
+        self.assertEqual(
+            self.resource.security_groups,
+            ['sg-f2234gf6', 'sg-cwfccs17'],
+        )
+
+    def test_derived_fields_survive_pickling(self):
+        self.resource.private_ips
+        resource = pickle.loads(pickle.dumps(self.resource))
+
+        self.assertEqual(resource.private_ips, ['142.33.2.113'])
+        self.assertEqual(resource.name, 'resource_name')
+
     def test_get_state_transition_reason(self):
         self.assertEqual(self.resource.state_transition, 'reason')
 
@@ -1871,6 +2814,12 @@ class TestRDS(ClinvAWSResourceTests, unittest.TestCase):
             'rds-name.us-east-1.rds.amazonaws.com:5521',
         )
 
+    def test_ip_addresses_is_the_endpoint_address(self):
+        self.assertEqual(
+            self.resource.ip_addresses(),
+            ['rds-name.us-east-1.rds.amazonaws.com'],
+        )
+
     def test_print_resource_information(self):
         self.resource.print()
         print_calls = (
@@ -1976,6 +2925,27 @@ class TestRoute53(ClinvGenericResourceTests, unittest.TestCase):
     def test_type_property_works_as_expected(self):
         self.assertEqual(self.resource.type, 'CNAME')
 
+    def test_field_values_include_the_record_type(self):
+        self.assertEqual(
+            self.resource.field_values(),
+            {
+                'id': 'hosted_zone_id-record1.clinv.org-cname',
+                'name': 'record1.clinv.org',
+                'record_type': 'CNAME',
+                'state': 'active',
+            },
+        )
+
+    def test_ip_addresses_are_empty_if_not_an_address_record(self):
+        self.assertEqual(self.resource.ip_addresses(), [])
+
+    def test_ip_addresses_are_the_values_of_address_records(self):
+        self.resource.raw['Type'] = 'A'
+        self.assertEqual(
+            self.resource.ip_addresses(),
+            ['127.0.0.1', 'localhost'],
+        )
+
     def test_to_destroy_property_works_as_expected(self):
         self.assertEqual(self.resource.to_destroy, 'tbd')
 
@@ -1,7 +1,9 @@
+import ipaddress
 import logging
 import unittest
 from unittest.mock import call, patch
-from clinv.cli import load_parser, load_logger
+from clinv.cli import load_parser, load_logger, source_ids
+from clinv.inventory import active_source_plugins
 
 
 class TestArgparse(unittest.TestCase):
@@ -19,15 +21,227 @@ class TestArgparse(unittest.TestCase):
             '~/.local/share/clinv',
         )
 
+    def test_default_backend_is_yaml(self):
+        parsed = self.parser.parse_args([])
+        self.assertEqual(parsed.backend, 'yaml')
+
+    def test_can_specify_sqlite_backend(self):
+        parsed = self.parser.parse_args(['--backend', 'sqlite'])
+        self.assertEqual(parsed.backend, 'sqlite')
+
+    def test_compact_is_disabled_by_default(self):
+        parsed = self.parser.parse_args([])
+        self.assertFalse(parsed.compact)
+
+    def test_can_enable_compact(self):
+        parsed = self.parser.parse_args(['--compact'])
+        self.assertTrue(parsed.compact)
+
     def test_can_specify_search_subcommand(self):
         parsed = self.parser.parse_args(['search', 'instance_name'])
         self.assertEqual(parsed.subcommand, 'search')
         self.assertEqual(parsed.search_string, 'instance_name')
+        self.assertEqual(parsed.cidr, None)
+
+    def test_can_search_by_network(self):
+        parsed = self.parser.parse_args(['search', '--cidr', '10.12.1.0/16'])
+        self.assertEqual(parsed.search_string, None)
+        self.assertEqual(parsed.cidr, ipaddress.ip_network('10.12.0.0/16'))
+
+    def test_can_search_by_ipv6_network(self):
+        parsed = self.parser.parse_args(
+            ['search', 'web', '--cidr', '2001:db8::/32'],
+        )
+        self.assertEqual(parsed.search_string, 'web')
+        self.assertEqual(parsed.cidr, ipaddress.ip_network('2001:db8::/32'))
+
+    def test_search_cidr_must_be_a_network(self):
+        with self.assertRaises(SystemExit):
+            self.parser.parse_args(['search', '--cidr', '10.12.0.0/33'])
+
+    def test_search_shows_all_the_matches_by_default(self):
+        parsed = self.parser.parse_args(['search', 'instance_name'])
+        self.assertEqual(parsed.limit, None)
+        self.assertFalse(parsed.count)
+
+    def test_can_specify_search_limit_and_count(self):
+        parsed = self.parser.parse_args(
+            ['search', 'instance_name', '--limit', '10', '--count'],
+        )
+        self.assertEqual(parsed.limit, 10)
+        self.assertTrue(parsed.count)
+
+    def test_search_limit_must_be_a_positive_integer(self):
+        for limit in ['0', '-1', 'ten']:
+            with self.assertRaises(SystemExit):
+                self.parser.parse_args(['search', 'inst', '--limit', limit])
 
     def test_can_specify_generate_subcommand(self):
         parsed = self.parser.parse_args(['generate'])
         self.assertEqual(parsed.subcommand, 'generate')
 
+    def test_generate_subcommand_defaults_to_one_job(self):
+        parsed = self.parser.parse_args(['generate'])
+        self.assertEqual(parsed.jobs, 1)
+
+    def test_can_specify_generate_jobs(self):
+        parsed = self.parser.parse_args(['generate', '--jobs', '4'])
+        self.assertEqual(parsed.jobs, 4)
+
+    def test_generate_jobs_must_be_a_positive_integer(self):
+        for jobs in ['0', '-1', 'four']:
+            with self.assertRaises(SystemExit):
+                with patch('sys.stderr'):
+                    self.parser.parse_args(['generate', '--jobs', jobs])
+
+    def test_generate_subcommand_fetches_all_regions_by_default(self):
+        parsed = self.parser.parse_args(['generate'])
+        self.assertEqual(parsed.regions, None)
+        self.assertEqual(parsed.region_cache_ttl, 0)
+
+    def test_can_specify_generate_regions(self):
+        parsed = self.parser.parse_args(
+            ['generate', '--regions', 'us-east-1,eu-west-1']
+        )
+        self.assertEqual(parsed.regions, ['us-east-1', 'eu-west-1'])
+
+    def test_can_specify_generate_aws_client_settings(self):
+        parsed = self.parser.parse_args(
+            ['generate', '--max-pool-connections', '30', '--max-attempts', '3']
+        )
+        self.assertEqual(parsed.max_pool_connections, 30)
+        self.assertEqual(parsed.max_attempts, 3)
+
+    def test_generate_max_pool_connections_must_be_a_positive_integer(self):
+        for connections in ['0', '-1', '1.5', 'many']:
+            with self.assertRaises(SystemExit):
+                with patch('sys.stderr'):
+                    self.parser.parse_args(
+                        ['generate', '--max-pool-connections', connections],
+                    )
+
+    def test_can_specify_generate_throttling_settings(self):
+        parsed = self.parser.parse_args(
+            [
+                'generate',
+                '--max-request-rate',
+                '2.5',
+                '--throttle-retries',
+                '3',
+            ]
+        )
+        self.assertEqual(parsed.max_request_rate, 2.5)
+        self.assertEqual(parsed.throttle_retries, 3)
+
+    def test_generate_route53_settings_default_to_the_aws_limit(self):
+        parsed = self.parser.parse_args(['generate'])
+        self.assertEqual(parsed.route53_request_rate, 5)
+        self.assertEqual(parsed.max_zone_workers, 4)
+
+    def test_can_specify_generate_route53_settings(self):
+        parsed = self.parser.parse_args(
+            [
+                'generate',
+                '--route53-request-rate',
+                '2.5',
+                '--max-zone-workers',
+                '2',
+            ]
+        )
+        self.assertEqual(parsed.route53_request_rate, 2.5)
+        self.assertEqual(parsed.max_zone_workers, 2)
+
+    def test_generate_max_zone_workers_must_be_a_positive_integer(self):
+        for workers in ['0', '-1', 'many']:
+            with self.assertRaises(SystemExit):
+                with patch('sys.stderr'):
+                    self.parser.parse_args(
+                        ['generate', '--max-zone-workers', workers],
+                    )
+
+    def test_generate_retries_can_be_disabled(self):
+        parsed = self.parser.parse_args(
+            ['generate', '--max-attempts', '0', '--throttle-retries', '0']
+        )
+        self.assertEqual(parsed.max_attempts, 0)
+        self.assertEqual(parsed.throttle_retries, 0)
+
+    def test_generate_retries_must_be_non_negative_integers(self):
+        for option in ['--max-attempts', '--throttle-retries']:
+            for retries in ['-1', '1.5', 'many']:
+                with self.assertRaises(SystemExit):
+                    with patch('sys.stderr'):
+                        self.parser.parse_args(
+                            ['generate', option, retries],
+                        )
+
+    def test_generate_max_request_rate_must_be_a_positive_number(self):
+        for rate in ['0', '-1', 'nan', 'fast']:
+            with self.assertRaises(SystemExit):
+                with patch('sys.stderr'):
+                    self.parser.parse_args(
+                        ['generate', '--max-request-rate', rate],
+                    )
+
+    def test_generate_subcommand_fetches_all_sources_by_default(self):
+        parsed = self.parser.parse_args(['generate'])
+        self.assertEqual(parsed.only, None)
+        self.assertFalse(parsed.stale_only)
+        self.assertEqual(parsed.ttl, None)
+
+    def test_can_specify_generate_sources(self):
+        parsed = self.parser.parse_args(['generate', '--only', 'ec2,rds'])
+        self.assertEqual(parsed.only, ['ec2', 'rds'])
+
+    def test_generate_sources_must_be_known_sources(self):
+        with self.assertRaises(SystemExit):
+            with patch('sys.stderr'):
+                self.parser.parse_args(['generate', '--only', 'ec2,unknown'])
+
+    def test_generate_accepts_all_the_active_sources(self):
+        parsed = self.parser.parse_args(
+            ['generate', '--only', ','.join(source_ids)]
+        )
+        self.assertEqual(
+            sorted(parsed.only),
+            sorted(source().id for source in active_source_plugins),
+        )
+
+    def test_generate_sources_ignore_the_empty_elements(self):
+        parsed = self.parser.parse_args(['generate', '--only', 'ec2, ,rds, '])
+        self.assertEqual(parsed.only, ['ec2', 'rds'])
+
+    def test_generate_ttl_sources_must_be_known_sources(self):
+        with self.assertRaises(SystemExit):
+            with patch('sys.stderr'):
+                self.parser.parse_args(['generate', '--ttl', 'ec3=300'])
+
+    def test_can_specify_generate_stale_sources_and_ttls(self):
+        parsed = self.parser.parse_args(
+            ['generate', '--stale-only', '--ttl', 'ec2=300,rds=3600']
+        )
+        self.assertTrue(parsed.stale_only)
+        self.assertEqual(parsed.ttl, {'ec2': 300, 'rds': 3600})
+
+    def test_generate_ttl_must_be_source_seconds_pairs(self):
+        with self.assertRaises(SystemExit):
+            with patch('sys.stderr'):
+                self.parser.parse_args(['generate', '--ttl', 'ec2'])
+
+    def test_generate_subcommand_does_not_resume_by_default(self):
+        parsed = self.parser.parse_args(['generate'])
+        self.assertFalse(parsed.resume)
+
+    def test_can_specify_generate_resume(self):
+        parsed = self.parser.parse_args(['generate', '--resume'])
+        self.assertTrue(parsed.resume)
+
+    def test_can_specify_generate_region_cache_ttl(self):
+        parsed = self.parser.parse_args(
+            ['generate', '--region-cache-ttl', '3600']
+        )
+        self.assertEqual(parsed.region_cache_ttl, 3600)
+
     def test_unassigned_subcommand_defaults_to_all(self):
         parsed = self.parser.parse_args(['unassigned'])
         self.assertEqual(parsed.subcommand, 'unassigned')
@@ -73,6 +287,10 @@ class TestArgparse(unittest.TestCase):
         self.assertEqual(parsed.subcommand, 'unassigned')
         self.assertEqual(parsed.resource_type, 'route53')
 
+    def test_can_specify_migrate_subcommand(self):
+        parsed = self.parser.parse_args(['migrate'])
+        self.assertEqual(parsed.subcommand, 'migrate')
+
     def test_can_specify_list_rds_subcommand(self):
         parsed = self.parser.parse_args(['list', 'rds'])
         self.assertEqual(parsed.subcommand, 'list')
@@ -32,9 +32,15 @@ class TestMain(unittest.TestCase):
     def test_main_loads_inventory(self):
         self.parser.parse_args = True
         self.parser_args.data_path = 'path'
+        self.parser_args.backend = 'sqlite'
+        self.parser_args.compact = True
         main()
         self.assertEqual(
-            self.inventory.assert_called_with('path'),
+            self.inventory.assert_called_with(
+                'path',
+                backend='sqlite',
+                compact=True,
+            ),
             None,
         )
 
@@ -43,10 +49,48 @@ class TestMain(unittest.TestCase):
         main()
         self.assertTrue(self.inventory.return_value.generate.called)
 
+    def test_generate_subcommand_passes_options(self):
+        self.parser_args.subcommand = 'generate'
+        self.parser_args.jobs = 4
+        self.parser_args.only = ['ec2']
+        self.parser_args.stale_only = True
+        self.parser_args.ttl = {'ec2': 300}
+        self.parser_args.resume = True
+        self.parser_args.regions = ['us-east-1']
+        self.parser_args.region_cache_ttl = 60
+        self.parser_args.max_pool_connections = 30
+        self.parser_args.max_attempts = 3
+        self.parser_args.max_request_rate = 5
+        self.parser_args.throttle_retries = 2
+        self.parser_args.route53_request_rate = 1
+        self.parser_args.max_zone_workers = 2
+        main()
+        self.assertEqual(
+            self.inventory.return_value.generate.assert_called_with(
+                jobs=4,
+                only=['ec2'],
+                stale_only=True,
+                ttls={'ec2': 300},
+                resume=True,
+                regions=['us-east-1'],
+                region_cache_ttl=60,
+                max_pool_connections=30,
+                max_attempts=3,
+                max_request_rate=5,
+                throttle_retries=2,
+                route53_request_rate=1,
+                max_zone_workers=2,
+            ),
+            None,
+        )
+
     @patch('clinv.SearchReport')
     def test_search_subcommand(self, reportMock):
         self.parser_args.subcommand = 'search'
         self.parser_args.search_string = 'inst'
+        self.parser_args.cidr = None
+        self.parser_args.limit = None
+        self.parser_args.count = False
         main()
         self.assertTrue(self.inventory.return_value.load.called)
         self.assertEqual(
@@ -54,9 +98,66 @@ class TestMain(unittest.TestCase):
             None,
         )
         self.assertEqual(
-            reportMock.return_value.output.assert_called_with('inst'),
+            reportMock.return_value.output.assert_called_with(
+                'inst',
+                None,
+                None,
+                False,
+            ),
+            None,
+        )
+
+    @patch('clinv.SearchReport')
+    def test_search_subcommand_passes_the_limit_and_count(self, reportMock):
+        self.parser_args.subcommand = 'search'
+        self.parser_args.search_string = 'inst'
+        self.parser_args.cidr = None
+        self.parser_args.limit = 10
+        self.parser_args.count = True
+        main()
+        reportMock.return_value.output.assert_called_with(
+            'inst',
+            None,
+            10,
+            True,
+        )
+
+    @patch('clinv.SearchReport')
+    def test_search_subcommand_by_network(self, reportMock):
+        self.parser_args.subcommand = 'search'
+        self.parser_args.search_string = None
+        self.parser_args.cidr = '10.12.0.0/16'
+        self.parser_args.limit = None
+        self.parser_args.count = False
+        main()
+        self.inventory.return_value.load.assert_called_with(
+            reportMock.resource_types.return_value,
+        )
+        reportMock.resource_types.assert_called_with(
+            None,
+            '10.12.0.0/16',
             None,
+            False,
         )
+        reportMock.return_value.output.assert_called_with(
+            None,
+            '10.12.0.0/16',
+            None,
+            False,
+        )
+
+    @patch('clinv.SearchReport')
+    def test_search_subcommand_needs_a_search_string_or_a_cidr(
+        self,
+        reportMock,
+    ):
+        self.parser.return_value.error.side_effect = SystemExit
+        self.parser_args.subcommand = 'search'
+        self.parser_args.search_string = None
+        self.parser_args.cidr = None
+        with self.assertRaises(SystemExit):
+            main()
+        self.assertFalse(reportMock.called)
 
     @patch('clinv.UnassignedReport')
     def test_unassigned_subcommand(self, reportMock):
@@ -78,7 +179,16 @@ class TestMain(unittest.TestCase):
         self.parser_args.resource_type = 'ec2'
         self.parser_args.subcommand = 'list'
         main()
-        self.assertTrue(self.inventory.return_value.load.called)
+        self.assertEqual(
+            reportMock.resource_types.assert_called_with('ec2'),
+            None,
+        )
+        self.assertEqual(
+            self.inventory.return_value.load.assert_called_with(
+                reportMock.resource_types.return_value
+            ),
+            None,
+        )
         self.assertEqual(
             reportMock.assert_called_with(self.inventory.return_value),
             None,
@@ -88,6 +198,12 @@ class TestMain(unittest.TestCase):
             None,
         )
 
+    def test_migrate_subcommand(self):
+        self.parser_args.subcommand = 'migrate'
+        main()
+        self.assertTrue(self.inventory.return_value.migrate.called)
+        self.assertFalse(self.inventory.return_value.load.called)
+
     @patch('clinv.ExportReport')
     def test_export_subcommand(self, reportMock):
         self.parser_args.subcommand = 'export'
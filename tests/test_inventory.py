@@ -1,10 +1,19 @@
-from clinv.inventory import Inventory
-from unittest.mock import patch, call
+from clinv.inventory import Inventory, LazyInventory, SafeDumper, SafeLoader
+from clinv.sources.aws import EC2
+from clinv.sources.risk_management import Peoplesrc
+from clinv.store import SQLiteInventory
+from dateutil.tz import tzutc
+from unittest.mock import patch, call, ANY, Mock
 from yaml import YAMLError
+import datetime
 import os
+import pickle
+import time
 import shutil
+import sqlite3
 import tempfile
 import unittest
+import yaml
 
 
 class ClinvBaseTestClass(object):
@@ -73,12 +82,485 @@ class TestInventory(InventoryBaseTestClass, unittest.TestCase):
     def test_init_sets_user_data_path(self):
         self.assertEqual(self.inv.user_data_path, self.user_data_path)
 
+    def test_init_sets_fetch_times_path(self):
+        self.assertEqual(
+            self.inv.fetch_times_path,
+            os.path.join(self.inventory_dir, 'fetch_times.yaml'),
+        )
+
+    def test_init_sets_checkpoint_dir(self):
+        self.assertEqual(
+            self.inv.checkpoint_dir,
+            os.path.join(self.inventory_dir, 'checkpoints'),
+        )
+
+    def test_checkpoints_can_be_saved_and_loaded(self):
+        checkpoint = {'fetch_time': 1.0, 'source_data': {'a': 'b'}}
+        self.inv._save_checkpoint('ec2', checkpoint)
+        self.assertEqual(self.inv._load_checkpoint('ec2'), checkpoint)
+        self.assertEqual(
+            os.listdir(self.inv.checkpoint_dir),
+            ['ec2.pickle'],
+        )
+
+    def test_load_checkpoint_returns_none_if_there_is_no_checkpoint(self):
+        self.assertEqual(self.inv._load_checkpoint('ec2'), None)
+
+    def test_load_checkpoint_doesnt_log_a_missing_checkpoint(self):
+        self.inv._load_checkpoint('ec2')
+        self.assertFalse(self.inv.log.error.called)
+
+    def test_load_checkpoint_returns_none_if_checkpoint_is_invalid(self):
+        os.makedirs(self.inv.checkpoint_dir)
+        checkpoint_path = os.path.join(self.inv.checkpoint_dir, 'ec2.pickle')
+        with open(checkpoint_path, 'wb') as f:
+            pickle.dump({'source_data': {}}, f)
+        self.assertEqual(self.inv._load_checkpoint('ec2'), None)
+
+    def test_load_checkpoint_returns_none_if_checkpoint_is_truncated(self):
+        self.inv._save_checkpoint('ec2', {'fetch_time': 1, 'source_data': {}})
+        checkpoint_path = os.path.join(self.inv.checkpoint_dir, 'ec2.pickle')
+        with open(checkpoint_path, 'rb+') as f:
+            f.truncate(10)
+        self.assertEqual(self.inv._load_checkpoint('ec2'), None)
+
+    def test_clear_checkpoints_removes_the_checkpoints(self):
+        self.inv._save_checkpoint('ec2', {'fetch_time': 1, 'source_data': {}})
+        self.inv._clear_checkpoints()
+        self.assertFalse(os.path.exists(self.inv.checkpoint_dir))
+
+    def test_init_sets_manifest_path(self):
+        self.assertEqual(
+            self.inv.manifest_path,
+            os.path.join(self.inventory_dir, 'manifest.yaml'),
+        )
+
+    def test_init_sets_snapshot_dir(self):
+        self.assertEqual(
+            self.inv.snapshot_dir,
+            os.path.join(self.inventory_dir, 'snapshots'),
+        )
+
+    def write_inventory_files(self):
+        self.inv.source_data = {
+            'ec2': {'i-1': 'a'},
+            's3': {'bucket': 'c'},
+        }
+        self.inv.user_data = {'ec2': {'i-1': 'b'}}
+        self.inv.fetch_times = {'ec2': 1.0}
+        self.inv.save()
+        self.inv.source_data = {}
+        self.inv.user_data = {}
+        self.inv.fetch_times = {}
+
+    def write_legacy_inventory_files(self):
+        self.inv._save_yaml(self.source_data_path, {'ec2': {'i-1': 'a'}})
+        self.inv._save_yaml(self.user_data_path, {'ec2': {'i-1': 'b'}})
+        self.inv._save_yaml(self.inv.fetch_times_path, {'ec2': 1.0})
+
+    def test_save_writes_one_shard_per_source(self):
+        self.write_inventory_files()
+
+        self.assertEqual(
+            self.inv._load_yaml(self.inv._shard_path('source_data', 'ec2')),
+            {'i-1': 'a'},
+        )
+        self.assertEqual(
+            self.inv._load_yaml(self.inv._shard_path('user_data', 'ec2')),
+            {'i-1': 'b'},
+        )
+        self.assertEqual(
+            self.inv._load_yaml(self.inv._shard_path('user_data', 's3')),
+            {},
+        )
+
+    def test_save_only_writes_the_changed_shards(self):
+        self.write_inventory_files()
+        self.inv.source_data = {
+            'ec2': {'i-1': 'changed'},
+            's3': {'bucket': 'c'},
+        }
+        self.inv.user_data = {'ec2': {'i-1': 'b'}}
+
+        with patch('clinv.inventory.os.replace', wraps=os.replace) as \
+                replaceMock:
+            self.inv.save()
+
+        self.assertEqual(
+            [replace_call[1][1] for replace_call in replaceMock.mock_calls],
+            [
+                self.inv._shard_path('source_data', 'ec2'),
+                self.inv.manifest_path,
+            ],
+        )
+
+    def test_save_writes_the_manifest(self):
+        self.write_inventory_files()
+
+        self.assertEqual(
+            self.inv._load_yaml(self.inv.manifest_path),
+            {
+                'version': 1,
+                'sources': {
+                    'ec2': {'fetch_time': 1.0},
+                    's3': {'fetch_time': None},
+                },
+            },
+        )
+
+    def test_load_reads_all_the_shards_by_default(self):
+        self.write_inventory_files()
+
+        self.inv.load()
+
+        self.assertEqual(
+            self.inv.source_data,
+            {'ec2': {'i-1': 'a'}, 's3': {'bucket': 'c'}},
+        )
+        self.assertEqual(self.inv.user_data, {'ec2': {'i-1': 'b'}, 's3': {}})
+        self.assertEqual(self.inv.fetch_times, {'ec2': 1.0})
+
+    def test_compact_shares_the_equal_strings(self):
+        variable = {
+            'i-1': {'region': ''.join(['us-', 'east-1']), 'ports': [22]},
+            'i-2': {'region': ''.join(['us-', 'east-1']), 'ports': [22]},
+        }
+        self.assertIsNot(variable['i-1']['region'], variable['i-2']['region'])
+
+        compacted = self.inv._compact(variable, {})
+
+        self.assertEqual(compacted, variable)
+        self.assertIs(compacted['i-1']['region'], compacted['i-2']['region'])
+        self.assertIs(
+            list(compacted['i-1'].keys())[0],
+            list(compacted['i-2'].keys())[0],
+        )
+
+    def test_load_compacts_each_shard_if_compact(self):
+        self.write_inventory_files()
+        self.inv.compact = True
+
+        with patch.object(
+            self.inv,
+            '_compact',
+            side_effect=lambda variable, strings: variable,
+        ) as compactMock:
+            self.inv.load()
+
+        self.assertEqual(len(compactMock.mock_calls), 4)
+        self.assertEqual(self.inv.source_data['ec2'], {'i-1': 'a'})
+
+    def test_compact_load_reuses_the_compact_snapshots(self):
+        self.write_inventory_files()
+        self.inv.compact = True
+        self.inv.load()
+        shard_path = self.inv._shard_path('source_data', 'ec2')
+        self.assertTrue(self.inv._load_snapshot(shard_path)['compact'])
+
+        with patch.object(self.inv, '_compact') as compactMock:
+            self.inv.load()
+
+        self.assertFalse(compactMock.called)
+        self.assertEqual(self.inv.source_data['ec2'], {'i-1': 'a'})
+
+    def test_compact_load_compacts_the_default_snapshots(self):
+        self.write_inventory_files()
+        self.inv.load()
+        shard_path = self.inv._shard_path('source_data', 'ec2')
+        self.assertFalse(self.inv._load_snapshot(shard_path)['compact'])
+
+        self.inv.compact = True
+        self.inv.load()
+
+        self.assertTrue(self.inv._load_snapshot(shard_path)['compact'])
+        self.assertEqual(self.inv.source_data['ec2'], {'i-1': 'a'})
+
+    def test_load_compacts_the_database_data_if_compact(self):
+        self.inv.store = Mock()
+        self.inv.store.load_sources.return_value = ({'ec2': {}}, {}, {})
+        self.inv.compact = True
+
+        with patch.object(
+            self.inv,
+            '_compact',
+            side_effect=lambda variable, strings: variable,
+        ) as compactMock:
+            self.inv._load_stored_data()
+
+        self.assertEqual(len(compactMock.mock_calls), 2)
+        self.assertIs(
+            compactMock.mock_calls[0][1][1],
+            compactMock.mock_calls[1][1][1],
+        )
+
+    @patch('clinv.inventory.Inventory._compact')
+    def test_load_doesnt_compact_the_data_by_default(self, compactMock):
+        self.write_inventory_files()
+        self.inv.load()
+        self.assertFalse(compactMock.called)
+
+    @patch('clinv.inventory.Inventory._load_cached_yaml')
+    def test_load_reads_only_the_selected_shards(self, loadMock):
+        self.write_inventory_files()
+
+        self.inv.load(['s3'])
+
+        self.assertEqual(
+            loadMock.mock_calls,
+            [
+                call(self.inv._shard_path('source_data', 's3')),
+                call(self.inv._shard_path('user_data', 's3')),
+            ],
+        )
+
+    def test_load_plugins_only_loads_the_selected_sources(self):
+        source = Mock()
+        source.return_value.id = 'ec2'
+        other_source = Mock()
+        other_source.return_value.id = 's3'
+        self.inv._source_plugins = [source, other_source]
+
+        self.inv._load_plugins(['s3'])
+
+        self.assertEqual(self.inv.sources, [other_source.return_value])
+
+    def test_load_raises_error_on_unsupported_manifest_version(self):
+        self.inv._save_yaml(self.inv.manifest_path, {'version': 2})
+
+        with self.assertRaisesRegex(ValueError, 'manifest version 2'):
+            self.inv.load()
+
+    def test_load_reads_the_legacy_layout_if_there_is_no_manifest(self):
+        self.write_legacy_inventory_files()
+
+        self.inv.load()
+
+        self.assertEqual(self.inv.source_data, {'ec2': {'i-1': 'a'}})
+        self.assertEqual(self.inv.user_data, {'ec2': {'i-1': 'b'}})
+        self.assertEqual(self.inv.fetch_times, {'ec2': 1.0})
+
+    def test_load_reads_the_legacy_layout_if_the_manifest_is_empty(self):
+        self.write_legacy_inventory_files()
+        with open(self.inv.manifest_path, 'w') as f:
+            f.write('')
+
+        self.inv.load()
+
+        self.assertEqual(self.inv.source_data, {'ec2': {'i-1': 'a'}})
+        self.assertEqual(self.inv.fetch_times, {'ec2': 1.0})
+
+    def test_load_scans_the_shards_if_the_manifest_is_empty(self):
+        self.write_inventory_files()
+        with open(self.inv.manifest_path, 'w') as f:
+            f.write('')
+
+        self.inv.load()
+
+        self.assertEqual(
+            self.inv.source_data,
+            {'ec2': {'i-1': 'a'}, 's3': {'bucket': 'c'}},
+        )
+        self.assertEqual(self.inv.user_data, {'ec2': {'i-1': 'b'}, 's3': {}})
+        self.assertEqual(self.inv.fetch_times, {})
+
+    def test_load_scans_the_shards_if_the_manifest_is_not_a_dict(self):
+        self.write_inventory_files()
+        self.inv._save_yaml(self.inv.manifest_path, ['ec2'])
+
+        self.inv.load(['ec2'])
+
+        self.assertEqual(self.inv.source_data, {'ec2': {'i-1': 'a'}})
+
+    def test_migrate_rebuilds_an_empty_manifest(self):
+        self.write_inventory_files()
+        with open(self.inv.manifest_path, 'w') as f:
+            f.write('')
+
+        self.inv.migrate()
+
+        self.assertEqual(
+            list(self.inv._load_manifest()['sources']),
+            ['ec2', 's3'],
+        )
+
+    def test_migrate_converts_the_legacy_layout_to_shards(self):
+        self.write_legacy_inventory_files()
+
+        self.inv.migrate()
+
+        for legacy_path in [
+            self.source_data_path,
+            self.user_data_path,
+            self.inv.fetch_times_path,
+        ]:
+            self.assertFalse(os.path.exists(legacy_path))
+        self.inv.load()
+        self.assertEqual(self.inv.source_data, {'ec2': {'i-1': 'a'}})
+        self.assertEqual(self.inv.user_data, {'ec2': {'i-1': 'b'}})
+        self.assertEqual(self.inv.fetch_times, {'ec2': 1.0})
+
+    @patch('clinv.inventory.Inventory.save')
+    def test_migrate_does_nothing_if_already_sharded(self, saveMock):
+        self.inv._save_yaml(self.inv.manifest_path, {'version': 1})
+
+        self.inv.migrate()
+
+        self.assertFalse(saveMock.called)
+
+    def test_load_saves_the_snapshots(self):
+        self.write_inventory_files()
+        self.inv.load()
+
+        shard_path = self.inv._shard_path('source_data', 'ec2')
+        self.assertEqual(
+            self.inv._snapshot_path(shard_path),
+            os.path.join(self.inv.snapshot_dir, 'source_data', 'ec2.pickle'),
+        )
+        self.assertEqual(
+            self.inv._load_snapshot(shard_path)['data'],
+            {'i-1': 'a'},
+        )
+
+    @patch('clinv.inventory.Inventory._load_yaml')
+    def test_load_uses_valid_snapshots(self, loadMock):
+        self.write_inventory_files()
+        for data_type, source_id, variable in [
+            ('source_data', 'ec2', {'i-1': 'a'}),
+            ('source_data', 's3', {'bucket': 'c'}),
+            ('user_data', 'ec2', {'i-1': 'b'}),
+            ('user_data', 's3', {}),
+        ]:
+            self.inv._save_snapshot(
+                self.inv._shard_path(data_type, source_id),
+                variable,
+            )
+
+        self.inv.load()
+
+        self.assertFalse(loadMock.called)
+        self.assertEqual(self.inv.user_data['ec2'], {'i-1': 'b'})
+
+    def test_snapshot_is_invalid_if_the_yaml_file_changes(self):
+        self.write_inventory_files()
+        self.inv.load()
+        shard_path = self.inv._shard_path('user_data', 'ec2')
+        self.inv._save_yaml(shard_path, {'i-1': 'changed'})
+
+        self.assertEqual(self.inv._load_snapshot(shard_path), None)
+        self.inv.load()
+        self.assertEqual(self.inv.user_data['ec2'], {'i-1': 'changed'})
+
+    def test_snapshot_is_valid_if_the_yaml_file_is_only_touched(self):
+        self.write_inventory_files()
+        self.inv.load()
+        shard_path = self.inv._shard_path('source_data', 'ec2')
+        os.utime(shard_path, (0, 0))
+
+        self.assertNotEqual(self.inv._load_snapshot(shard_path), None)
+
+    def test_snapshot_is_invalid_if_it_is_corrupted(self):
+        self.write_inventory_files()
+        shard_path = self.inv._shard_path('source_data', 'ec2')
+        os.makedirs(os.path.dirname(self.inv._snapshot_path(shard_path)))
+        with open(self.inv._snapshot_path(shard_path), 'wb') as f:
+            f.write(b'corrupted')
+
+        self.assertEqual(self.inv._load_snapshot(shard_path), None)
+
+    def test_snapshot_is_invalid_if_version_changes(self):
+        self.write_inventory_files()
+        self.inv.load()
+        self.inv.snapshot_version += 1
+
+        self.assertEqual(
+            self.inv._load_snapshot(
+                self.inv._shard_path('source_data', 'ec2')
+            ),
+            None,
+        )
+
+    def test_init_sets_region_cache_path(self):
+        self.assertEqual(
+            self.inv.region_cache_path,
+            os.path.join(self.inventory_dir, 'aws_regions.yaml'),
+        )
+
     def test_yaml_saving(self):
         save_file = os.path.join(self.tmp, 'yaml_save_test.yaml')
         dictionary = {'a': 'b', 'c': 'd'}
-        self.inv._save_yaml(save_file, dictionary)
+        self.assertTrue(self.inv._save_yaml(save_file, dictionary))
         with open(save_file, 'r') as f:
             self.assertEqual("a: b\nc: d\n", f.read())
+        self.assertEqual(os.listdir(self.tmp), ['yaml_save_test.yaml'])
+
+    def test_yaml_saving_skips_files_with_the_same_content(self):
+        save_file = os.path.join(self.tmp, 'yaml_save_test.yaml')
+        self.inv._save_yaml(save_file, {'a': 'b'})
+        mtime = os.stat(save_file).st_mtime_ns
+
+        self.assertFalse(self.inv._save_yaml(save_file, {'a': 'b'}))
+        self.assertEqual(os.stat(save_file).st_mtime_ns, mtime)
+
+    def test_yaml_saving_rewrites_files_with_the_same_size(self):
+        save_file = os.path.join(self.tmp, 'yaml_save_test.yaml')
+        self.inv._save_yaml(save_file, {'a': 'b'})
+
+        self.assertTrue(self.inv._save_yaml(save_file, {'a': 'c'}))
+        self.assertEqual(self.inv._load_yaml(save_file), {'a': 'c'})
+
+    @patch('clinv.inventory.os.fsync', wraps=os.fsync)
+    def test_yaml_saving_flushes_the_file_to_disk(self, fsyncMock):
+        self.inv._save_yaml(os.path.join(self.tmp, 'test.yaml'), {'a': 'b'})
+        self.assertTrue(fsyncMock.called)
+
+    def test_yaml_saving_keeps_the_old_file_if_the_rename_fails(self):
+        save_file = os.path.join(self.tmp, 'yaml_save_test.yaml')
+        self.inv._save_yaml(save_file, {'a': 'b'})
+
+        with patch('clinv.inventory.os.replace', side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.inv._save_yaml(save_file, {'a': 'changed'})
+
+        self.assertEqual(self.inv._load_yaml(save_file), {'a': 'b'})
+
+    @unittest.skipUnless(yaml.__with_libyaml__, 'PyYAML built without libyaml')
+    def test_yaml_backend_uses_libyaml_if_available(self):
+        self.assertIs(SafeLoader, yaml.CSafeLoader)
+        self.assertIs(SafeDumper, yaml.CSafeDumper)
+
+    def test_yaml_backend_dumps_the_same_as_the_python_one(self):
+        variable = {
+            'ec2': {
+                'us-east-1': [
+                    {
+                        'InstanceId': 'i-023desldk394995ss',
+                        'LaunchTime': datetime.datetime(
+                            2018, 5, 10, 7, 13, 17, tzinfo=tzutc()
+                        ),
+                        'State': {'Code': 16, 'Name': 'running'},
+                        'StateTransitionReason': '',
+                        'Tags': [{'Key': 'Name', 'Value': 'ñame: with colon'}],
+                        'Primary': True,
+                        'Description': 'a long description ' * 10,
+                    },
+                ],
+            },
+        }
+        self.inv._save_yaml(self.source_data_path, variable)
+        with open(self.source_data_path, 'r') as f:
+            self.assertEqual(
+                f.read(),
+                yaml.dump(
+                    variable,
+                    Dumper=yaml.SafeDumper,
+                    default_flow_style=False,
+                ),
+            )
+        with open(self.source_data_path, 'r') as f:
+            self.assertEqual(
+                self.inv._load_yaml(self.source_data_path),
+                yaml.load(f, Loader=yaml.SafeLoader),
+            )
 
     def test_load_yaml(self):
         with open(self.source_data_path, 'w') as f:
@@ -89,7 +571,7 @@ class TestInventory(InventoryBaseTestClass, unittest.TestCase):
     @patch('clinv.inventory.os')
     @patch('clinv.inventory.yaml')
     def test_load_yaml_raises_error_if_wrong_format(self, yamlMock, osMock):
-        yamlMock.safe_load.side_effect = YAMLError('error')
+        yamlMock.load.side_effect = YAMLError('error')
 
         with self.assertRaises(YAMLError):
             self.inv._load_yaml(self.source_data_path)
@@ -136,22 +618,6 @@ class TestInventory(InventoryBaseTestClass, unittest.TestCase):
         self.inv.load()
         self.assertTrue(invMock.called)
 
-    @patch('clinv.inventory.Inventory._save_yaml')
-    def test_save_saves_source_data(self, saveMock):
-        self.inv.save()
-        self.assertTrue(
-            call(self.source_data_path, self.inv.source_data)
-            in saveMock.mock_calls
-        )
-
-    @patch('clinv.inventory.Inventory._save_yaml')
-    def test_save_saves_user_data(self, saveMock):
-        self.inv.save()
-        self.assertTrue(
-            call(self.user_data_path, self.inv.user_data)
-            in saveMock.mock_calls
-        )
-
 
 class TestInventoryPluginLoad(InventoryBaseTestClass, unittest.TestCase):
     """
@@ -164,11 +630,17 @@ class TestInventoryPluginLoad(InventoryBaseTestClass, unittest.TestCase):
         self.source = self.source_patch.start()
         self.source.return_value.id = 'source_id'
         self.source_plugins = [self.source]
+        self.checkpoint_patch = patch(
+            'clinv.inventory.Inventory._save_checkpoint',
+            autospect=True,
+        )
+        self.save_checkpoint = self.checkpoint_patch.start()
 
         self.inv = Inventory(self.inventory_dir, self.source_plugins)
         self.inv._load_plugins()
 
     def tearDown(self):
+        self.checkpoint_patch.stop()
         super().tearDown()
 
     def test_load_plugins_creates_expected_list_if_user_data(self):
@@ -217,6 +689,176 @@ class TestInventoryPluginLoad(InventoryBaseTestClass, unittest.TestCase):
             }
         )
 
+    def test_generate_source_data_can_fetch_plugins_concurrently(self):
+        other_source = Mock()
+        other_source.return_value.id = 'other_source_id'
+        self.inv._source_plugins = [self.source, other_source]
+        self.inv._load_plugins()
+
+        self.inv._generate_source_data(jobs=2)
+
+        self.assertEqual(
+            list(self.inv.source_data.items()),
+            [
+                (
+                    'source_id',
+                    self.source.return_value.generate_source_data.return_value,
+                ),
+                (
+                    'other_source_id',
+                    other_source.return_value.generate_source_data()
+                ),
+            ]
+        )
+
+    def test_generate_source_data_stores_the_fetch_time(self):
+        self.inv._generate_source_data()
+
+        self.assertLessEqual(self.inv.fetch_times['source_id'], time.time())
+
+    def test_generate_source_data_only_fetches_the_selected_sources(self):
+        other_source = Mock()
+        other_source.return_value.id = 'other_source_id'
+        self.inv._source_plugins = [self.source, other_source]
+        self.inv.source_data = {'other_source_id': ['stored']}
+        self.inv._load_plugins()
+
+        self.inv._generate_source_data(source_ids=['source_id'])
+
+        self.assertFalse(other_source.return_value.generate_source_data.called)
+        self.assertEqual(
+            self.inv.source_data['other_source_id'],
+            ['stored'],
+        )
+        self.assertNotIn('other_source_id', self.inv.fetch_times)
+
+    def test_generate_source_data_checkpoints_each_source(self):
+        self.inv._generate_source_data()
+
+        self.assertEqual(
+            self.save_checkpoint.assert_called_with(
+                'source_id',
+                {
+                    'fetch_time': ANY,
+                    'source_data':
+                        self.source.return_value.generate_source_data(),
+                },
+            ),
+            None,
+        )
+
+    @patch('clinv.inventory.Inventory._load_checkpoint')
+    def test_generate_source_data_resumes_from_checkpoints(self, loadMock):
+        loadMock.return_value = {'fetch_time': 1, 'source_data': ['resumed']}
+
+        self.inv._generate_source_data(resume=True)
+
+        self.assertFalse(self.source.return_value.generate_source_data.called)
+        self.assertEqual(self.inv.source_data, {'source_id': ['resumed']})
+        self.assertEqual(self.inv.fetch_times, {'source_id': 1})
+        self.assertEqual(self.source.return_value.source_data, ['resumed'])
+
+    @patch('clinv.inventory.Inventory._load_checkpoint')
+    def test_generate_source_data_fetches_sources_without_checkpoint(
+        self,
+        loadMock,
+    ):
+        loadMock.return_value = None
+
+        self.inv._generate_source_data(resume=True)
+
+        self.assertTrue(self.source.return_value.generate_source_data.called)
+
+    @patch('clinv.inventory.Inventory._clear_checkpoints')
+    @patch('clinv.inventory.Inventory._generate_inventory_objects')
+    @patch('clinv.inventory.Inventory._generate_user_data')
+    @patch('clinv.inventory.Inventory._generate_source_data')
+    @patch('clinv.inventory.Inventory.save')
+    @patch('clinv.inventory.Inventory._load_yaml')
+    def test_generate_clears_checkpoints_before_fetch_and_after_save(
+        self,
+        loadMock,
+        saveMock,
+        sourceMock,
+        userMock,
+        inventoryMock,
+        clearMock,
+    ):
+        self.inv.generate()
+
+        self.assertEqual(len(clearMock.mock_calls), 2)
+
+    @patch('clinv.inventory.Inventory._clear_checkpoints')
+    @patch('clinv.inventory.Inventory._generate_inventory_objects')
+    @patch('clinv.inventory.Inventory._generate_user_data')
+    @patch('clinv.inventory.Inventory._generate_source_data')
+    @patch('clinv.inventory.Inventory.save')
+    @patch('clinv.inventory.Inventory._load_yaml')
+    def test_generate_keeps_checkpoints_until_save_on_resume(
+        self,
+        loadMock,
+        saveMock,
+        sourceMock,
+        userMock,
+        inventoryMock,
+        clearMock,
+    ):
+        self.inv.generate(resume=True)
+
+        self.assertEqual(len(clearMock.mock_calls), 1)
+        self.assertEqual(
+            sourceMock.assert_called_with(1, ['source_id'], True),
+            None,
+        )
+
+    def test_select_sources_returns_all_sources_by_default(self):
+        self.assertEqual(self.inv._select_sources(), ['source_id'])
+
+    def test_select_sources_returns_the_only_sources(self):
+        other_source = Mock()
+        other_source.return_value.id = 'other_source_id'
+        self.inv._source_plugins = [self.source, other_source]
+        self.inv._load_plugins()
+
+        self.assertEqual(
+            self.inv._select_sources(only=['other_source_id']),
+            ['other_source_id'],
+        )
+
+    def test_select_sources_raises_error_on_unknown_source(self):
+        with self.assertRaisesRegex(ValueError, 'Unknown source unexistent'):
+            self.inv._select_sources(only=['unexistent'])
+
+    def test_select_sources_skips_fresh_sources_if_stale_only(self):
+        self.inv.fetch_times = {'source_id': time.time() - 60}
+
+        self.assertEqual(
+            self.inv._select_sources(stale_only=True, ttls={'source_id': 120}),
+            [],
+        )
+
+    def test_select_sources_returns_expired_sources_if_stale_only(self):
+        self.inv.fetch_times = {'source_id': time.time() - 180}
+
+        self.assertEqual(
+            self.inv._select_sources(stale_only=True, ttls={'source_id': 120}),
+            ['source_id'],
+        )
+
+    def test_select_sources_returns_never_fetched_sources_if_stale_only(self):
+        self.assertEqual(
+            self.inv._select_sources(stale_only=True, ttls={'source_id': 120}),
+            ['source_id'],
+        )
+
+    def test_sources_without_ttl_are_always_stale(self):
+        self.inv.fetch_times = {'source_id': time.time()}
+
+        self.assertEqual(
+            self.inv._select_sources(stale_only=True),
+            ['source_id'],
+        )
+
     def test_generate_user_data_loads_data_from_plugins(self):
         self.inv._generate_user_data()
 
@@ -252,10 +894,489 @@ class TestInventoryPluginLoad(InventoryBaseTestClass, unittest.TestCase):
         userMock,
         inventoryMock,
     ):
-        self.inv.generate()
+        self.inv.generate(jobs=2)
 
         self.assertTrue(saveMock.called)
-        self.assertTrue(sourceMock.called)
+        self.assertEqual(
+            sourceMock.assert_called_with(2, ['source_id'], False),
+            None,
+        )
         self.assertTrue(userMock.called)
         self.assertTrue(inventoryMock.called)
         self.assertTrue(call(self.user_data_path) in loadMock.mock_calls)
+
+    @patch('clinv.inventory.Inventory._build_search_indexes')
+    @patch('clinv.inventory.Inventory._generate_inventory_objects')
+    @patch('clinv.inventory.Inventory._generate_user_data')
+    @patch('clinv.inventory.Inventory._generate_source_data')
+    @patch('clinv.inventory.Inventory.save')
+    @patch('clinv.inventory.Inventory._load_yaml')
+    def test_generate_builds_the_search_indexes_after_save(
+        self,
+        loadMock,
+        saveMock,
+        sourceMock,
+        userMock,
+        inventoryMock,
+        indexMock,
+    ):
+        manager = Mock()
+        manager.attach_mock(saveMock, 'save')
+        manager.attach_mock(indexMock, 'build_search_indexes')
+
+        self.inv.generate()
+
+        self.assertEqual(
+            manager.mock_calls,
+            [call.save(), call.build_search_indexes()],
+        )
+
+    @patch('clinv.inventory.AWSBasesrc')
+    @patch('clinv.inventory.Inventory._generate_inventory_objects')
+    @patch('clinv.inventory.Inventory._generate_user_data')
+    @patch('clinv.inventory.Inventory._generate_source_data')
+    @patch('clinv.inventory.Inventory.save')
+    @patch('clinv.inventory.Inventory._load_yaml')
+    def test_generate_configures_aws_sources(
+        self,
+        loadMock,
+        saveMock,
+        sourceMock,
+        userMock,
+        inventoryMock,
+        awsMock,
+    ):
+        self.inv.generate(regions=['us-east-1'], region_cache_ttl=60)
+
+        self.assertEqual(
+            awsMock.configure.assert_called_with(
+                regions=['us-east-1'],
+                region_cache_path=self.inv.region_cache_path,
+                checkpoint_dir=self.inv.checkpoint_dir,
+                resume=False,
+                region_cache_ttl=60,
+            ),
+            None,
+        )
+        self.assertTrue(awsMock.log_throttling_stats.called)
+
+
+class TestInventorySQLiteBackend(InventoryBaseTestClass, unittest.TestCase):
+    """
+    Test class to assess that the Inventory can be stored in a SQLite
+    database.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.inv = Inventory(self.inventory_dir, [Peoplesrc], backend='sqlite')
+        self.user_data = {
+            'people': {
+                'peo_01': {
+                    'name': 'Lyz',
+                    'description': 'Administrator',
+                    'state': 'active',
+                },
+            },
+        }
+
+    def tearDown(self):
+        super().tearDown()
+
+    def write_database(self):
+        self.inv.source_data = {'people': {}}
+        self.inv.user_data = self.user_data
+        self.inv.fetch_times = {'people': 1.0}
+        self.inv._load_plugins()
+        self.inv._generate_inventory_objects()
+        self.inv.save()
+
+    def write_user_data_shard(self, user_data):
+        os.makedirs(
+            os.path.join(self.inventory_dir, 'user_data'),
+            exist_ok=True,
+        )
+        with open(self.inv._shard_path('user_data', 'people'), 'w') as f:
+            yaml.dump(user_data, f)
+
+    def test_init_raises_error_on_unknown_backend(self):
+        with self.assertRaisesRegex(ValueError, 'Unknown inventory backend'):
+            Inventory(self.inventory_dir, backend='json')
+
+    def test_init_sets_the_store(self):
+        self.assertEqual(
+            self.inv.database_path,
+            os.path.join(self.inventory_dir, 'inventory.sqlite'),
+        )
+        self.assertEqual(self.inv.store.database_path, self.inv.database_path)
+        self.assertEqual(Inventory(self.inventory_dir).store, None)
+
+    def test_save_writes_the_database_instead_of_the_yaml_files(self):
+        self.write_database()
+
+        self.assertTrue(os.path.isfile(self.inv.database_path))
+        self.assertFalse(os.path.exists(self.inv.manifest_path))
+
+    def test_load_stored_data_reads_the_database(self):
+        self.write_database()
+        inv = Inventory(self.inventory_dir, [Peoplesrc], backend='sqlite')
+
+        inv._load_stored_data()
+
+        self.assertEqual(inv.source_data, {'people': {}})
+        self.assertEqual(inv.user_data, self.user_data)
+        self.assertEqual(inv.fetch_times, {'people': 1.0})
+
+    def test_load_reads_the_resources_from_the_database(self):
+        self.write_database()
+        inv = Inventory(self.inventory_dir, [Peoplesrc], backend='sqlite')
+
+        inv.load(['people'])
+
+        self.assertIsInstance(inv.inv, SQLiteInventory)
+        self.assertEqual(list(inv.inv), ['people'])
+        self.assertEqual(inv.inv['people']['peo_01'].name, 'Lyz')
+
+    def test_load_raises_error_if_there_is_no_database(self):
+        with self.assertRaises(FileNotFoundError):
+            self.inv.load()
+
+    def test_migrate_imports_the_yaml_inventory(self):
+        yaml_inventory = Inventory(self.inventory_dir, [Peoplesrc])
+        yaml_inventory.source_data = {'people': {}}
+        yaml_inventory.user_data = self.user_data
+        yaml_inventory.save()
+
+        self.inv.migrate()
+
+        self.assertTrue(os.path.isfile(self.inv.manifest_path))
+        self.assertEqual(
+            self.inv.store.load_sources()[1],
+            self.user_data,
+        )
+        self.assertEqual(
+            [resource.id for resource in self.inv.store.query('people')],
+            ['peo_01'],
+        )
+
+    def test_migrate_imports_the_user_data_again_if_the_database_exists(self):
+        self.write_database()
+        self.write_user_data_shard({'peo_02': {'name': 'Ana'}})
+
+        self.inv.migrate()
+
+        self.assertEqual(
+            [resource.id for resource in self.inv.store.query('people')],
+            ['peo_02'],
+        )
+
+    def test_save_writes_the_user_data_shards(self):
+        self.write_database()
+
+        self.assertEqual(
+            self.inv._load_yaml(self.inv._shard_path('user_data', 'people')),
+            self.user_data['people'],
+        )
+        self.assertFalse(
+            os.path.exists(self.inv._shard_path('source_data', 'people'))
+        )
+
+    def test_load_stored_data_reads_the_user_data_shards(self):
+        self.write_database()
+        self.write_user_data_shard({'peo_02': {'name': 'Ana'}})
+        inv = Inventory(self.inventory_dir, [Peoplesrc], backend='sqlite')
+
+        inv._load_stored_data()
+
+        self.assertEqual(
+            inv.user_data,
+            {'people': {'peo_02': {'name': 'Ana'}}},
+        )
+
+    def test_load_stored_data_uses_the_stored_user_data_without_shard(self):
+        self.write_database()
+        os.remove(self.inv._shard_path('user_data', 'people'))
+        inv = Inventory(self.inventory_dir, [Peoplesrc], backend='sqlite')
+
+        inv._load_stored_data()
+
+        self.assertEqual(inv.user_data, self.user_data)
+
+    def test_load_stored_data_reads_the_shards_without_database(self):
+        self.write_user_data_shard({'peo_02': {'name': 'Ana'}})
+
+        self.inv._load_stored_data()
+
+        self.assertEqual(
+            self.inv.user_data,
+            {'people': {'peo_02': {'name': 'Ana'}}},
+        )
+        self.assertEqual(self.inv.source_data, {})
+
+    def test_load_stored_data_raises_error_without_database_or_shards(self):
+        with self.assertRaises(FileNotFoundError):
+            self.inv._load_stored_data()
+
+    def test_generate_imports_the_edited_user_data(self):
+        self.write_database()
+        self.write_user_data_shard(
+            {
+                'peo_01': self.user_data['people']['peo_01'],
+                'peo_02': {'name': 'Ana', 'state': 'active'},
+            }
+        )
+        inv = Inventory(self.inventory_dir, [Peoplesrc], backend='sqlite')
+
+        with patch('clinv.inventory.AWSBasesrc'):
+            inv.generate()
+
+        self.assertEqual(
+            [resource.id for resource in inv.store.query('people')],
+            ['peo_01', 'peo_02'],
+        )
+
+    def test_load_builds_the_stale_sources_in_memory(self):
+        self.write_database()
+        connection = sqlite3.connect(self.inv.database_path)
+        with connection:
+            connection.execute("UPDATE sources SET resource_class = 'old'")
+        connection.close()
+        database_mtime = os.stat(self.inv.database_path).st_mtime_ns
+        inv = Inventory(self.inventory_dir, [Peoplesrc], backend='sqlite')
+
+        inv.load()
+
+        self.assertEqual(inv.inv['people']['peo_01'].name, 'Lyz')
+        self.assertEqual(inv.store.stale_sources(), ['people'])
+        self.assertEqual(
+            os.stat(self.inv.database_path).st_mtime_ns,
+            database_mtime,
+        )
+
+    def test_load_doesnt_build_the_unchanged_sources(self):
+        self.write_database()
+        inv = Inventory(self.inventory_dir, [Peoplesrc], backend='sqlite')
+
+        inv.load()
+
+        self.assertEqual(inv.store.memory_resources, {})
+        self.assertEqual(inv.inv['people']['peo_01'].name, 'Lyz')
+
+    def test_load_uses_the_edited_user_data_without_writing_it(self):
+        self.write_database()
+        self.write_user_data_shard(
+            {
+                'peo_01': self.user_data['people']['peo_01'],
+                'peo_02': {'name': 'Ana', 'state': 'active'},
+            }
+        )
+        inv = Inventory(self.inventory_dir, [Peoplesrc], backend='sqlite')
+
+        inv.load()
+
+        self.assertEqual(list(inv.inv['people']), ['peo_01', 'peo_02'])
+        self.assertEqual(
+            [resource.id for resource in inv.store.query(name='Ana')],
+            ['peo_02'],
+        )
+        self.assertEqual(
+            list(inv.store.load_sources()[1]['people']),
+            ['peo_01'],
+        )
+
+    def test_migrate_stores_the_edited_user_data(self):
+        self.write_database()
+        self.write_user_data_shard({'peo_02': {'name': 'Ana'}})
+
+        self.inv.migrate()
+        inv = Inventory(self.inventory_dir, [Peoplesrc], backend='sqlite')
+        inv.load()
+
+        self.assertEqual(inv.store.memory_resources, {})
+        self.assertEqual(list(inv.inv['people']), ['peo_02'])
+
+
+class TestInventorySearchIndex(InventoryBaseTestClass, unittest.TestCase):
+    """
+    Test class to assess that the Inventory keeps its search index up to date
+    with the stored data.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.search_index_logging_patch = patch(
+            'clinv.search_index.logging',
+            autospect=True,
+        )
+        self.search_index_logging_patch.start()
+        self.inv = Inventory(self.inventory_dir, [Peoplesrc])
+        self.inv.source_data = {'people': {}}
+        self.inv.user_data = {
+            'people': {
+                'peo_01': {
+                    'name': 'Lyz',
+                    'description': 'Administrator',
+                    'state': 'active',
+                    'email': 'lyz@clinv.org',
+                    'iam_user': 'iamuser_lyz',
+                },
+            },
+        }
+        self.inv.save()
+        self.inv.load()
+
+    def tearDown(self):
+        self.search_index_logging_patch.stop()
+        super().tearDown()
+
+    def test_init_sets_the_search_index_path(self):
+        self.assertEqual(
+            self.inv.search_index_path,
+            os.path.join(self.inventory_dir, 'search_index.pickle'),
+        )
+
+    def test_load_search_index_builds_and_saves_the_missing_index(self):
+        index = self.inv.load_search_index()
+
+        self.assertTrue(os.path.isfile(self.inv.search_index_path))
+        self.assertEqual(
+            index.candidates('lyz@clinv'),
+            {'people': ['peo_01']},
+        )
+
+    def test_load_search_index_reuses_the_up_to_date_index(self):
+        self.inv.load_search_index()
+
+        with patch('clinv.search_index.TrigramIndex.build') as buildMock:
+            index = self.inv.load_search_index()
+
+        self.assertFalse(buildMock.called)
+        self.assertEqual(index.resources, [('people', ['peo_01'])])
+
+    def test_load_search_index_rebuilds_the_index_if_the_data_changes(self):
+        self.inv.load_search_index()
+        self.inv.user_data['people']['peo_02'] = {
+            'name': 'Other',
+            'description': 'Developer',
+            'state': 'active',
+            'email': 'other@clinv.org',
+            'iam_user': 'iamuser_other',
+        }
+        self.inv.save()
+        self.inv.load()
+
+        index = self.inv.load_search_index()
+
+        self.assertEqual(index.resources, [('people', ['peo_01', 'peo_02'])])
+
+    def test_init_sets_the_ip_index_path(self):
+        self.assertEqual(
+            self.inv.ip_index_path,
+            os.path.join(self.inventory_dir, 'ip_index.pickle'),
+        )
+
+    def test_load_ip_index_only_indexes_the_sources_with_ips(self):
+        self.inv.inv['ec2'] = {
+            'i-01': EC2(
+                {
+                    'i-01': {
+                        'NetworkInterfaces': [
+                            {
+                                'PrivateIpAddresses': [
+                                    {'PrivateIpAddress': '10.12.1.5'},
+                                ],
+                            },
+                        ],
+                    },
+                }
+            ),
+        }
+
+        index = self.inv.load_ip_index()
+
+        self.assertTrue(os.path.isfile(self.inv.ip_index_path))
+        self.assertEqual(index.resources, [('ec2', ['i-01'])])
+        self.assertEqual(index.candidates('10.12.0.0/16'), {'ec2': ['i-01']})
+
+    def test_load_ip_index_reuses_the_up_to_date_index(self):
+        self.inv.load_ip_index()
+
+        with patch('clinv.search_index.IPIndex.build') as buildMock:
+            self.inv.load_ip_index()
+
+        self.assertFalse(buildMock.called)
+
+    def test_init_sets_the_field_index_path(self):
+        self.assertEqual(
+            self.inv.field_index_path,
+            os.path.join(self.inventory_dir, 'field_index.pickle'),
+        )
+
+    def test_load_field_index_builds_and_saves_the_missing_index(self):
+        index = self.inv.load_field_index()
+
+        self.assertTrue(os.path.isfile(self.inv.field_index_path))
+        self.assertEqual(
+            index.candidates('state', 'active'),
+            {'people': ['peo_01']},
+        )
+
+    def test_load_field_index_reuses_the_up_to_date_index(self):
+        self.inv.load_field_index()
+
+        with patch('clinv.search_index.FieldIndex.build') as buildMock:
+            self.inv.load_field_index()
+
+        self.assertFalse(buildMock.called)
+
+
+class TestLazyInventory(unittest.TestCase):
+    """
+    Test class to assess that the LazyInventory builds the resources of each
+    source on demand.
+    """
+
+    def setUp(self):
+        self.ec2 = Mock()
+        self.ec2.id = 'ec2'
+        self.s3 = Mock()
+        self.s3.id = 's3'
+        self.inv = LazyInventory([self.ec2, self.s3])
+
+    def test_keys_are_the_source_ids(self):
+        self.assertEqual(list(self.inv.keys()), ['ec2', 's3'])
+        self.assertEqual(len(self.inv), 2)
+
+    def test_resources_are_not_built_until_accessed(self):
+        self.assertFalse(self.ec2.generate_inventory.called)
+        self.assertFalse(self.s3.generate_inventory.called)
+
+    def test_only_the_accessed_source_is_built(self):
+        self.assertEqual(
+            self.inv['s3'],
+            self.s3.generate_inventory.return_value,
+        )
+        self.assertFalse(self.ec2.generate_inventory.called)
+
+    def test_resources_are_built_once(self):
+        self.inv['s3']
+        self.inv['s3']
+        self.assertEqual(len(self.s3.generate_inventory.mock_calls), 1)
+
+    def test_unknown_sources_raise_key_error(self):
+        with self.assertRaises(KeyError):
+            self.inv['unexistent']
+
+    def test_resources_can_be_set(self):
+        self.inv['people'] = {'peo_01': 'person'}
+        self.assertEqual(self.inv['people'], {'peo_01': 'person'})
+        self.assertEqual(list(self.inv), ['ec2', 's3', 'people'])
+
+    def test_equals_the_dictionary_of_built_resources(self):
+        self.assertEqual(
+            self.inv,
+            {
+                'ec2': self.ec2.generate_inventory.return_value,
+                's3': self.s3.generate_inventory.return_value,
+            },
+        )
@@ -0,0 +1,252 @@
+from clinv.query import FieldQuery
+from clinv.search_index import FieldIndex
+from clinv.sources.aws import EC2, RDS
+from clinv.sources.risk_management import Project, Service
+from unittest.mock import Mock, patch
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestFieldQuery(unittest.TestCase):
+    """
+    Test class to assess that the FieldQuery matches the fields of the
+    resources and selects every resource that matches it.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.logging_patch = patch(
+            'clinv.search_index.logging',
+            autospect=True,
+        )
+        self.logging_patch.start()
+
+        self.inventory = {
+            'ec2': {
+                'i-01': self.ec2('i-01', 'c5.large', 'eu-west-1', 'running'),
+                'i-02': self.ec2('i-02', 'c5.xlarge', 'eu-west-1', 'stopped'),
+                'i-03': self.ec2('i-03', 't2.micro', 'eu-west-1', 'running'),
+                'i-04': self.ec2('i-04', 'c5.large', 'us-east-1', 'running'),
+            },
+            'rds': {
+                'db-01': RDS(
+                    {
+                        'db-01': {
+                            'DBInstanceClass': 'db.c5.large',
+                            'DBInstanceIdentifier': 'billing-db',
+                            'DBInstanceStatus': 'available',
+                            'DBSecurityGroups': [],
+                            'description': 'Billing database',
+                            'region': 'eu-west-1',
+                        },
+                    }
+                ),
+            },
+            'projects': {
+                'pro_01': Project(
+                    {
+                        'pro_01': {
+                            'description': 'Billing',
+                            'name': 'Billing',
+                            'services': ['ser_01'],
+                            'state': 'active',
+                        },
+                    }
+                ),
+            },
+            'services': {
+                'ser_01': Service(
+                    {
+                        'ser_01': {
+                            'aws': {'ec2': ['i-01', 'i-02'], 'rds': None},
+                            'description': 'Billing web',
+                            'name': 'Billing web',
+                            'state': 'active',
+                        },
+                    }
+                ),
+            },
+        }
+        self.field_index = FieldIndex(
+            os.path.join(self.tmp, 'field_index.pickle'),
+        )
+        self.field_index.build(self.inventory)
+
+    def tearDown(self):
+        self.logging_patch.stop()
+        shutil.rmtree(self.tmp)
+
+    def ec2(self, instance_id, instance_type, region, state):
+        return EC2(
+            {
+                instance_id: {
+                    'InstanceId': instance_id,
+                    'InstanceType': instance_type,
+                    'NetworkInterfaces': [],
+                    'SecurityGroups': [],
+                    'State': {'Code': 16, 'Name': state},
+                    'Tags': [{'Key': 'Name', 'Value': 'web'}],
+                    'description': 'Web server',
+                    'region': region,
+                },
+            }
+        )
+
+    def matches(self, query_string):
+        query = FieldQuery(query_string, self.inventory)
+        return {
+            resource_type: [
+                resource_id
+                for resource_id, resource in resources.items()
+                if query.match(resource_type, resource)
+            ]
+            for resource_type, resources in self.inventory.items()
+        }
+
+    def test_is_field_query_if_a_term_has_a_field(self):
+        self.assertTrue(FieldQuery.is_field_query('type:ec2'))
+        self.assertTrue(FieldQuery.is_field_query('web state:running'))
+
+    def test_is_not_field_query_without_supported_fields(self):
+        self.assertFalse(FieldQuery.is_field_query('web'))
+        self.assertFalse(FieldQuery.is_field_query('arn:aws:iam'))
+        self.assertFalse(FieldQuery.is_field_query('state:'))
+
+    def test_related_types_of_project_terms(self):
+        self.assertEqual(
+            FieldQuery.related_types('project:billing type:ec2'),
+            ['projects', 'services'],
+        )
+        self.assertEqual(FieldQuery.related_types('type:ec2'), [])
+
+    def test_terms_are_split_into_fields_and_text(self):
+        query = FieldQuery('type:ec2 web instance_type:c5.*', self.inventory)
+
+        self.assertEqual(query.terms[0], ('type', 'ec2', None))
+        self.assertEqual(query.terms[1][:2], ('instance_type', None))
+        self.assertEqual(query.terms[1][2].pattern, 'c5.*')
+        self.assertEqual(
+            [text_query.search_string for text_query in query.text_queries],
+            ['web'],
+        )
+
+    def test_match_all_the_field_terms(self):
+        self.assertEqual(
+            self.matches(
+                'type:ec2 region:eu-west-1 state:running instance_type:c5.*'
+            ),
+            {'ec2': ['i-01'], 'rds': [], 'projects': [], 'services': []},
+        )
+
+    def test_match_plain_values_case_insensitively(self):
+        self.assertEqual(
+            self.matches('region:EU-WEST-1 state:Running')['ec2'],
+            ['i-01', 'i-03'],
+        )
+
+    def test_match_the_whole_value(self):
+        self.assertEqual(self.matches('instance_type:c5')['ec2'], [])
+        self.assertEqual(self.matches('region:eu-west')['ec2'], [])
+
+    def test_match_the_id_case_sensitively(self):
+        self.assertEqual(self.matches('id:i-01')['ec2'], ['i-01'])
+        self.assertEqual(self.matches('id:I-01')['ec2'], [])
+
+    def test_match_the_text_terms_as_a_search(self):
+        self.assertEqual(
+            self.matches('type:rds billing'),
+            {'ec2': [], 'rds': ['db-01'], 'projects': [], 'services': []},
+        )
+
+    def test_match_the_resources_of_a_project(self):
+        self.assertEqual(
+            self.matches('project:billing'),
+            {
+                'ec2': ['i-01', 'i-02'],
+                'rds': [],
+                'projects': ['pro_01'],
+                'services': ['ser_01'],
+            },
+        )
+
+    def test_match_the_resources_of_a_project_by_id(self):
+        self.assertEqual(
+            self.matches('project:pro_01 state:running')['ec2'],
+            ['i-01'],
+        )
+
+    def test_resources_without_the_field_dont_match(self):
+        self.assertEqual(self.matches('region:eu-west-1')['projects'], [])
+
+    def test_candidates_contain_every_match(self):
+        for query_string in [
+            'type:ec2 region:eu-west-1 state:running instance_type:c5.*',
+            'state:running',
+            'region:eu-west-1 type:rds',
+            'instance_type:c5.large',
+            'id:i-03',
+            'project:billing',
+            'project:Bill.* state:stopped',
+            'type:(ec2|rds) web',
+            'name:web',
+        ]:
+            query = FieldQuery(query_string, self.inventory)
+            candidates = query.candidates(self.field_index)
+            for resource_type, resource_ids in \
+                    self.matches(query_string).items():
+                if resource_type not in candidates:
+                    continue
+                self.assertTrue(
+                    set(resource_ids) <= set(candidates[resource_type]),
+                    query_string,
+                )
+
+    def test_candidates_of_the_indexed_fields(self):
+        query = FieldQuery('state:running region:eu-west-1', self.inventory)
+
+        self.assertEqual(
+            query.candidates(self.field_index),
+            {
+                'ec2': ['i-01', 'i-03'],
+                'rds': [],
+                'projects': [],
+                'services': [],
+            },
+        )
+
+    def test_candidates_of_the_type_terms(self):
+        query = FieldQuery('type:(ec2|rds)', self.inventory)
+
+        self.assertEqual(
+            query.candidates(self.field_index),
+            {'projects': [], 'services': []},
+        )
+
+    def test_candidates_of_the_id_and_project_terms(self):
+        query = FieldQuery('project:billing id:i-02', self.inventory)
+
+        self.assertEqual(
+            query.candidates(),
+            {'ec2': ['i-02'], 'rds': [], 'projects': [], 'services': []},
+        )
+
+    def test_regular_expression_terms_dont_narrow_the_candidates(self):
+        query = FieldQuery('state:run.*', self.inventory)
+
+        self.assertEqual(query.candidates(self.field_index), {})
+
+    def test_candidates_without_field_index_dont_use_the_indexed_fields(self):
+        query = FieldQuery('state:running', self.inventory)
+
+        self.assertEqual(query.candidates(), {})
+
+    def test_unindexed_resources_are_always_candidates(self):
+        resource = Mock()
+        resource.field_values.side_effect = KeyError('State')
+        self.inventory['ec2']['i-05'] = resource
+        self.field_index.build(self.inventory)
+        query = FieldQuery('state:unexistent', self.inventory)
+
+        self.assertEqual(query.candidates(self.field_index)['ec2'], ['i-05'])
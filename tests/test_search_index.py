@@ -0,0 +1,463 @@
+from clinv.search_index import FieldIndex, IPIndex, TrigramIndex
+from clinv.sources.aws import EC2, RDS, Route53
+from clinv.sources.risk_management import People, Project
+from unittest.mock import Mock, patch
+import ipaddress
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+
+class TestTrigramIndex(unittest.TestCase):
+    """
+    Test class to assess that the TrigramIndex selects every resource that
+    matches a search.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.logging_patch = patch(
+            'clinv.search_index.logging',
+            autospect=True,
+        )
+        self.logging = self.logging_patch.start()
+        self.index_path = os.path.join(self.tmp, 'search_index.pickle')
+        self.index = TrigramIndex(self.index_path)
+
+        self.inventory = {
+            'ec2': {
+                'i-023desldk394995ss': EC2(
+                    {
+                        'i-023desldk394995ss': {
+                            'InstanceId': 'i-023desldk394995ss',
+                            'InstanceType': 't2.micro',
+                            'NetworkInterfaces': [
+                                {
+                                    'PrivateIpAddresses': [
+                                        {
+                                            'Association': {
+                                                'PublicIp': '52.1.2.3',
+                                            },
+                                            'PrivateIpAddress': '10.0.1.5',
+                                        },
+                                    ],
+                                },
+                            ],
+                            'SecurityGroups': [{'GroupId': 'sg-f2234gf6'}],
+                            'State': {'Code': 16, 'Name': 'running'},
+                            'Tags': [{'Key': 'Name', 'Value': 'inst_name'}],
+                            'description': 'This is in the description',
+                            'region': 'us-east-1',
+                        },
+                    }
+                ),
+                'i-0a4c2e5d6b7f8a9b0': EC2(
+                    {
+                        'i-0a4c2e5d6b7f8a9b0': {
+                            'InstanceId': 'i-0a4c2e5d6b7f8a9b0',
+                            'InstanceType': 'c5.large',
+                            'NetworkInterfaces': [],
+                            'SecurityGroups': [],
+                            'State': {'Code': 80, 'Name': 'stopped'},
+                            'Tags': [
+                                {'Key': 'Name', 'Value': 'ſtaging_web'},
+                            ],
+                            'description': 'Old instance',
+                            'region': 'eu-west-1',
+                        },
+                    }
+                ),
+            },
+            'people': {
+                'peo_01': People(
+                    {
+                        'peo_01': {
+                            'description': 'Administrator',
+                            'email': 'lyz@clinv.org',
+                            'iam_user': 'iamuser_lyz',
+                            'name': 'Lyz',
+                            'state': 'active',
+                        },
+                    }
+                ),
+            },
+            'projects': {
+                'pro_01': Project(
+                    {
+                        'pro_01': {
+                            'aliases': r'foo\.bar',
+                            'description': 'This is the description',
+                            'name': 'Clinv project',
+                            'state': 'active',
+                        },
+                    }
+                ),
+            },
+        }
+        self.index.build(self.inventory, 'signature')
+
+    def tearDown(self):
+        self.logging_patch.stop()
+        shutil.rmtree(self.tmp)
+
+    def matches(self, search_string):
+        return {
+            resource_type: [
+                resource_id
+                for resource_id, resource in resources.items()
+                if resource.search(search_string) is True
+            ]
+            for resource_type, resources in self.inventory.items()
+        }
+
+    def test_candidates_contain_every_match(self):
+        for search_string in [
+            'i-023',
+            'inst_name',
+            'INST_NAME',
+            'STAGING',
+            r'10\.0\.1',
+            '52.1',
+            'sg-f2234gf6',
+            'us-east',
+            'lyz@clinv',
+            'iamuser',
+            r'foo\.bar',
+            '.*description',
+            'Adm(in|out)istrator',
+            '(?:Admin)+istrator',
+            'c5.large',
+            'unexistent',
+        ]:
+            candidates = self.index.candidates(search_string)
+            if candidates is None:
+                continue
+            for resource_type, resource_ids in \
+                    self.matches(search_string).items():
+                self.assertTrue(
+                    set(resource_ids) <= set(candidates[resource_type]),
+                    search_string,
+                )
+
+    def test_candidates_skip_the_resources_without_the_trigrams(self):
+        self.assertEqual(
+            self.index.candidates('lyz@clinv'),
+            {'ec2': [], 'people': ['peo_01'], 'projects': []},
+        )
+
+    def test_candidates_keep_the_inventory_order(self):
+        self.assertEqual(
+            self.index.candidates('i-0')['ec2'],
+            ['i-023desldk394995ss', 'i-0a4c2e5d6b7f8a9b0'],
+        )
+
+    def test_candidates_are_none_without_enough_literals(self):
+        self.assertIsNone(self.index.candidates('i-'))
+        self.assertIsNone(self.index.candidates('.*'))
+        self.assertIsNone(self.index.candidates('(abc|def)'))
+
+    def test_unindexable_resources_are_always_candidates(self):
+        resource = Mock()
+        resource.search_values.side_effect = KeyError('name')
+        self.inventory['services'] = {'ser_01': resource}
+        self.index.build(self.inventory)
+
+        self.assertEqual(
+            self.index.candidates('unexistent')['services'],
+            ['ser_01'],
+        )
+
+    def test_save_and_load_the_index(self):
+        self.index.save()
+
+        index = TrigramIndex(self.index_path)
+
+        self.assertTrue(index.load())
+        self.assertEqual(index.signature, 'signature')
+        self.assertEqual(
+            index.candidates('lyz@clinv'),
+            self.index.candidates('lyz@clinv'),
+        )
+
+    def test_load_returns_false_if_there_is_no_index(self):
+        self.assertFalse(self.index.load())
+
+    def test_load_discards_indexes_of_other_versions(self):
+        with open(self.index_path, 'wb') as f:
+            pickle.dump({'version': 0}, f)
+
+        self.assertFalse(self.index.load())
+
+    def test_load_discards_unreadable_indexes(self):
+        with open(self.index_path, 'wb') as f:
+            f.write(b'not a pickle')
+
+        self.assertFalse(self.index.load())
+
+
+class TestIPIndex(unittest.TestCase):
+    """
+    Test class to assess that the IPIndex selects the resources with an ip
+    address in a network.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.logging_patch = patch(
+            'clinv.search_index.logging',
+            autospect=True,
+        )
+        self.logging = self.logging_patch.start()
+        self.index_path = os.path.join(self.tmp, 'ip_index.pickle')
+        self.index = IPIndex(self.index_path)
+
+        self.inventory = {
+            'ec2': {
+                'i-01': self.ec2('i-01', '10.12.1.5', '52.1.2.3'),
+                'i-02': self.ec2('i-02', '10.13.0.7', '52.1.2.4'),
+                'i-03': self.ec2('i-03', '10.12.200.1', None),
+            },
+            'rds': {
+                'db-01': RDS(
+                    {
+                        'db-01': {
+                            'Endpoint': {
+                                'Address': 'db.us-east-1.rds.amazonaws.com',
+                                'Port': 5432,
+                            },
+                        },
+                    }
+                ),
+            },
+            'route53': {
+                'zone-web.clinv.org-a': self.route53(
+                    'zone-web.clinv.org-a',
+                    'A',
+                    ['10.12.3.3', '10.12.3.4'],
+                ),
+                'zone-web.clinv.org-aaaa': self.route53(
+                    'zone-web.clinv.org-aaaa',
+                    'AAAA',
+                    ['2001:db8::1'],
+                ),
+                'zone-db.clinv.org-cname': self.route53(
+                    'zone-db.clinv.org-cname',
+                    'CNAME',
+                    ['10.12.9.9'],
+                ),
+            },
+        }
+        self.index.build(self.inventory, 'signature')
+
+    def tearDown(self):
+        self.logging_patch.stop()
+        shutil.rmtree(self.tmp)
+
+    def ec2(self, instance_id, private_ip, public_ip):
+        address = {'PrivateIpAddress': private_ip}
+        if public_ip is not None:
+            address['Association'] = {'PublicIp': public_ip}
+        return EC2(
+            {
+                instance_id: {
+                    'InstanceId': instance_id,
+                    'NetworkInterfaces': [
+                        {'PrivateIpAddresses': [address]},
+                    ],
+                },
+            }
+        )
+
+    def route53(self, record_id, record_type, values):
+        return Route53(
+            {
+                record_id: {
+                    'ResourceRecords': [{'Value': value} for value in values],
+                    'Type': record_type,
+                },
+            }
+        )
+
+    def test_candidates_have_an_address_in_the_network(self):
+        self.assertEqual(
+            self.index.candidates('10.12.0.0/16'),
+            {
+                'ec2': ['i-01', 'i-03'],
+                'rds': [],
+                'route53': ['zone-web.clinv.org-a'],
+            },
+        )
+
+    def test_candidates_ignore_the_host_bits(self):
+        self.assertEqual(
+            self.index.candidates('52.1.2.5/31')['ec2'],
+            ['i-02'],
+        )
+
+    def test_candidates_of_a_single_address(self):
+        self.assertEqual(
+            self.index.candidates('10.12.3.4/32')['route53'],
+            ['zone-web.clinv.org-a'],
+        )
+
+    def test_candidates_of_an_ipv6_network(self):
+        self.assertEqual(
+            self.index.candidates('2001:db8::/32'),
+            {
+                'ec2': [],
+                'rds': [],
+                'route53': ['zone-web.clinv.org-aaaa'],
+            },
+        )
+
+    def test_candidates_accept_network_objects(self):
+        self.assertEqual(
+            self.index.candidates(ipaddress.ip_network('0.0.0.0/0'))['ec2'],
+            ['i-01', 'i-02', 'i-03'],
+        )
+
+    def test_candidates_match_every_address_in_the_network(self):
+        for network in ['10.0.0.0/8', '10.12.0.0/17', '52.0.0.0/8']:
+            network = ipaddress.ip_network(network)
+            for resource_type, resources in self.inventory.items():
+                self.assertEqual(
+                    self.index.candidates(network)[resource_type],
+                    [
+                        resource_id
+                        for resource_id, resource in resources.items()
+                        if resource_type != 'rds' and
+                        any(
+                            ipaddress.ip_address(address) in network
+                            for address in resource.ip_addresses()
+                        )
+                    ],
+                )
+
+    def test_resources_without_readable_addresses_are_skipped(self):
+        resource = Mock()
+        resource.ip_addresses.side_effect = KeyError('Endpoint')
+        self.inventory['rds']['db-02'] = resource
+        self.index.build(self.inventory)
+
+        self.assertEqual(self.index.candidates('0.0.0.0/0')['rds'], [])
+
+    def test_save_and_load_the_index(self):
+        self.index.save()
+
+        index = IPIndex(self.index_path)
+
+        self.assertTrue(index.load())
+        self.assertEqual(index.signature, 'signature')
+        for network in ['10.12.0.0/16', '2001:db8::/32']:
+            self.assertEqual(
+                index.candidates(network),
+                self.index.candidates(network),
+            )
+
+
+class TestFieldIndex(unittest.TestCase):
+    """
+    Test class to assess that the FieldIndex selects the resources with a
+    value in a field.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.logging_patch = patch(
+            'clinv.search_index.logging',
+            autospect=True,
+        )
+        self.logging = self.logging_patch.start()
+        self.index_path = os.path.join(self.tmp, 'field_index.pickle')
+        self.index = FieldIndex(self.index_path)
+
+        self.inventory = {
+            'ec2': {
+                'i-01': self.ec2('i-01', 'c5.large', 'eu-west-1', 'running'),
+                'i-02': self.ec2('i-02', 'c5.large', 'us-east-1', 'stopped'),
+                'i-03': self.ec2('i-03', 't2.micro', 'eu-west-1', 'Running'),
+            },
+            'route53': {
+                'zone-web.clinv.org-a': Route53(
+                    {
+                        'zone-web.clinv.org-a': {
+                            'Name': 'web.clinv.org',
+                            'ResourceRecords': [{'Value': '10.0.0.1'}],
+                            'Type': 'A',
+                            'state': 'active',
+                        },
+                    }
+                ),
+            },
+            'people': {
+                'peo_01': People({'peo_01': {'name': 'Lyz'}}),
+            },
+        }
+        self.index.build(self.inventory, 'signature')
+
+    def tearDown(self):
+        self.logging_patch.stop()
+        shutil.rmtree(self.tmp)
+
+    def ec2(self, instance_id, instance_type, region, state):
+        return EC2(
+            {
+                instance_id: {
+                    'InstanceId': instance_id,
+                    'InstanceType': instance_type,
+                    'State': {'Code': 16, 'Name': state},
+                    'region': region,
+                },
+            }
+        )
+
+    def test_candidates_have_the_field_value(self):
+        self.assertEqual(
+            self.index.candidates('region', 'eu-west-1'),
+            {'ec2': ['i-01', 'i-03'], 'route53': [], 'people': []},
+        )
+        self.assertEqual(
+            self.index.candidates('instance_type', 'c5.large')['ec2'],
+            ['i-01', 'i-02'],
+        )
+        self.assertEqual(
+            self.index.candidates('record_type', 'a')['route53'],
+            ['zone-web.clinv.org-a'],
+        )
+
+    def test_values_are_case_folded(self):
+        self.assertEqual(
+            self.index.candidates('state', 'RUNNING')['ec2'],
+            ['i-01', 'i-03'],
+        )
+
+    def test_candidates_of_unexistent_values_are_empty(self):
+        self.assertEqual(
+            self.index.candidates('state', 'unexistent'),
+            {'ec2': [], 'route53': [], 'people': []},
+        )
+
+    def test_unindexable_resources_are_always_candidates(self):
+        resource = Mock()
+        resource.field_values.side_effect = KeyError('State')
+        self.inventory['people']['peo_02'] = resource
+        self.index.build(self.inventory)
+
+        self.assertEqual(
+            self.index.candidates('state', 'unexistent')['people'],
+            ['peo_02'],
+        )
+
+    def test_save_and_load_the_index(self):
+        self.index.save()
+
+        index = FieldIndex(self.index_path)
+
+        self.assertTrue(index.load())
+        self.assertEqual(index.signature, 'signature')
+        self.assertEqual(
+            index.candidates('state', 'running'),
+            self.index.candidates('state', 'running'),
+        )
@@ -0,0 +1,409 @@
+from clinv.sources.aws import EC2
+from clinv.sources.risk_management import People, Project
+from clinv.store import SQLiteInventory, SQLiteStore
+from unittest.mock import patch
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+
+class SQLiteStoreBaseTestClass(object):
+    """
+    Base class to setup a store with some resources for the SQLiteStore test
+    cases.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.logging_patch = patch('clinv.store.logging', autospect=True)
+        self.logging = self.logging_patch.start()
+        self.database_path = os.path.join(self.tmp, 'inventory.sqlite')
+        self.resource_classes = {'ec2': EC2, 'people': People}
+        self.store = SQLiteStore(self.database_path, self.resource_classes)
+
+        self.ec2 = EC2(
+            {
+                'i-023desldk394995ss': {
+                    'InstanceId': 'i-023desldk394995ss',
+                    'State': {'Code': 16, 'Name': 'running'},
+                    'Tags': [{'Key': 'Name', 'Value': 'inst_name'}],
+                    'region': 'us-east-1',
+                    'description': 'This is in the description',
+                    'to_destroy': 'tbd',
+                    'environment': 'production',
+                },
+            }
+        )
+        self.terminated_ec2 = EC2(
+            {
+                'i-0a4c2e5d6b7f8a9b0': {
+                    'InstanceId': 'i-0a4c2e5d6b7f8a9b0',
+                    'State': {'Code': 48, 'Name': 'terminated'},
+                    'Tags': [{'Key': 'Name', 'Value': 'old_name'}],
+                    'region': 'eu-west-1',
+                },
+            }
+        )
+        self.person = People(
+            {
+                'peo_01': {
+                    'name': 'Lyz',
+                    'description': 'Administrator',
+                    'state': 'active',
+                    'email': 'lyz@clinv.org',
+                },
+            }
+        )
+        self.source_data = {
+            'ec2': {'us-east-1': [{'Instances': []}]},
+            'people': {},
+        }
+        self.user_data = {
+            'ec2': {'i-023desldk394995ss': {'description': 'tbd'}},
+            'people': {'peo_01': {'name': 'Lyz'}},
+        }
+        self.fetch_times = {'ec2': 1570000000.0}
+        self.inventory = {
+            'ec2': {
+                'i-023desldk394995ss': self.ec2,
+                'i-0a4c2e5d6b7f8a9b0': self.terminated_ec2,
+            },
+            'people': {
+                'peo_01': self.person,
+            },
+        }
+
+    def tearDown(self):
+        self.logging_patch.stop()
+        shutil.rmtree(self.tmp)
+
+    def save(self):
+        self.store.save(
+            self.source_data,
+            self.user_data,
+            self.fetch_times,
+            self.inventory,
+        )
+
+
+class TestSQLiteStore(SQLiteStoreBaseTestClass, unittest.TestCase):
+    """
+    Test class to assess that the SQLiteStore saves and queries the inventory.
+    """
+
+    def test_store_doesnt_exist_until_saved(self):
+        self.assertFalse(self.store.exists())
+        self.save()
+        self.assertTrue(self.store.exists())
+
+    def test_save_creates_the_indexes(self):
+        self.save()
+        connection = sqlite3.connect(self.database_path)
+        indexes = [
+            row[0]
+            for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' "
+                "AND name NOT LIKE 'sqlite_autoindex%'"
+            )
+        ]
+        self.assertEqual(
+            sorted(indexes),
+            [
+                'resources_id',
+                'resources_name',
+                'resources_position',
+                'resources_region',
+                'resources_state',
+            ],
+        )
+
+    def test_save_stores_the_indexed_fields_of_the_resources(self):
+        self.save()
+        connection = sqlite3.connect(self.database_path)
+        self.assertEqual(
+            connection.execute(
+                'SELECT type, id, name, region, state FROM resources '
+                'ORDER BY type, id'
+            ).fetchall(),
+            [
+                (
+                    'ec2',
+                    'i-023desldk394995ss',
+                    'inst_name',
+                    'us-east-1',
+                    'running',
+                ),
+                (
+                    'ec2',
+                    'i-0a4c2e5d6b7f8a9b0',
+                    'old_name',
+                    'eu-west-1',
+                    'terminated',
+                ),
+                ('people', 'peo_01', 'Lyz', None, 'active'),
+            ],
+        )
+
+    def test_load_sources_returns_the_saved_data(self):
+        self.save()
+        self.assertEqual(
+            SQLiteStore(
+                self.database_path,
+                self.resource_classes,
+            ).load_sources(),
+            (self.source_data, self.user_data, self.fetch_times),
+        )
+
+    def test_load_sources_can_select_the_sources(self):
+        self.save()
+        self.assertEqual(
+            self.store.load_sources(['people']),
+            (
+                {'people': {}},
+                {'people': {'peo_01': {'name': 'Lyz'}}},
+                {},
+            ),
+        )
+
+    def test_load_sources_raises_error_if_there_is_no_database(self):
+        with self.assertRaises(FileNotFoundError):
+            self.store.load_sources()
+
+    def test_save_replaces_the_resources_of_the_saved_sources(self):
+        self.save()
+        self.source_data['ec2'] = {'us-east-1': []}
+        self.inventory['ec2'] = {'i-023desldk394995ss': self.ec2}
+        self.save()
+        self.assertEqual(
+            [resource.id for resource in self.store.query('ec2')],
+            ['i-023desldk394995ss'],
+        )
+
+    def test_save_skips_the_resources_of_unchanged_sources(self):
+        self.save()
+        self.inventory['ec2'] = {'i-023desldk394995ss': self.ec2}
+        self.fetch_times['ec2'] = 1580000000.0
+        self.save()
+
+        self.assertEqual(
+            [resource.id for resource in self.store.query('ec2')],
+            ['i-023desldk394995ss', 'i-0a4c2e5d6b7f8a9b0'],
+        )
+        self.assertEqual(
+            self.store.load_sources(['ec2'])[2],
+            {'ec2': 1580000000.0},
+        )
+
+    def test_save_stores_the_plain_data_of_the_resources(self):
+        self.save()
+        connection = sqlite3.connect(self.database_path)
+        data = connection.execute(
+            "SELECT data FROM resources WHERE id = 'peo_01'"
+        ).fetchone()[0]
+        self.assertEqual(type(pickle.loads(data)), dict)
+        self.assertEqual(pickle.loads(data), self.person.raw)
+
+    def test_save_stores_the_resource_class_of_the_sources(self):
+        self.save()
+        connection = sqlite3.connect(self.database_path)
+        self.assertEqual(
+            connection.execute(
+                'SELECT id, resource_class FROM sources ORDER BY id'
+            ).fetchall(),
+            [
+                ('ec2', 'clinv.sources.aws.EC2'),
+                ('people', 'clinv.sources.risk_management.People'),
+            ],
+        )
+
+    def test_no_sources_are_stale_after_save(self):
+        self.save()
+        self.assertEqual(self.store.stale_sources(), [])
+
+    def test_sources_are_stale_if_their_resource_class_changes(self):
+        self.save()
+        self.store.resource_classes = {'ec2': EC2, 'people': Project}
+        self.assertEqual(self.store.stale_sources(), ['people'])
+
+    def test_save_rewrites_the_resources_if_their_class_changes(self):
+        self.save()
+        self.store.resource_classes = {'ec2': EC2, 'people': Project}
+        self.inventory['people'] = {
+            'peo_01': Project({'peo_01': dict(self.person.raw)}),
+        }
+        self.save()
+
+        self.assertEqual(self.store.stale_sources(), [])
+        self.assertIsInstance(self.store.query('people')[0], Project)
+
+    def test_save_stores_the_user_data_signatures(self):
+        self.store.save(
+            self.source_data,
+            self.user_data,
+            self.fetch_times,
+            self.inventory,
+            {'people': [10, 1]},
+        )
+
+        self.assertEqual(
+            self.store.stale_sources({'ec2': None, 'people': [10, 1]}),
+            [],
+        )
+
+    def test_sources_are_stale_if_their_user_data_file_changes(self):
+        self.store.save(
+            self.source_data,
+            self.user_data,
+            self.fetch_times,
+            self.inventory,
+            {'people': [10, 1]},
+        )
+
+        self.assertEqual(
+            self.store.stale_sources({'ec2': None, 'people': [10, 2]}),
+            ['people'],
+        )
+
+    def test_unstored_sources_with_user_data_file_are_stale(self):
+        self.save()
+        self.assertEqual(
+            self.store.stale_sources({'services': None, 'projects': [10, 1]}),
+            ['projects'],
+        )
+
+    def test_resource_types_returns_the_saved_sources(self):
+        self.save()
+        self.assertEqual(self.store.resource_types(), ['ec2', 'people'])
+
+    def test_query_returns_all_resources_in_the_inventory_order(self):
+        self.inventory = {
+            'people': self.inventory['people'],
+            'ec2': {
+                'i-0a4c2e5d6b7f8a9b0': self.terminated_ec2,
+                'i-023desldk394995ss': self.ec2,
+            },
+        }
+        self.save()
+        self.assertEqual(
+            [resource.id for resource in self.store.query()],
+            ['peo_01', 'i-0a4c2e5d6b7f8a9b0', 'i-023desldk394995ss'],
+        )
+        self.assertEqual(self.store.resource_types(), ['people', 'ec2'])
+
+    def test_query_returns_the_memory_resources_instead_of_the_stored(self):
+        self.save()
+        person = People({'peo_02': {'name': 'Ana', 'state': 'active'}})
+        self.store.memory_resources = {'people': {'peo_02': person}}
+
+        self.assertEqual(
+            [resource.id for resource in self.store.query()],
+            ['i-023desldk394995ss', 'i-0a4c2e5d6b7f8a9b0', 'peo_02'],
+        )
+        self.assertEqual(self.store.query('people', name='Ana'), [person])
+        self.assertEqual(self.store.query('people', name='Lyz'), [])
+        self.assertEqual(
+            self.store.query('people', exclude_state='active'),
+            [],
+        )
+        self.assertEqual(self.store.query(id_prefix='peo_02'), [person])
+
+    def test_query_returns_resource_objects(self):
+        self.save()
+        resource = self.store.query('people')[0]
+        self.assertIsInstance(resource, People)
+        self.assertEqual(resource.raw, self.person.raw)
+
+    def test_query_by_id_prefix(self):
+        self.save()
+        self.assertEqual(
+            [resource.id for resource in self.store.query(id_prefix='i-0a')],
+            ['i-0a4c2e5d6b7f8a9b0'],
+        )
+
+    def test_query_by_indexed_fields(self):
+        self.save()
+        self.assertEqual(
+            [
+                resource.id
+                for resource in self.store.query('ec2', region='eu-west-1')
+            ],
+            ['i-0a4c2e5d6b7f8a9b0'],
+        )
+        self.assertEqual(
+            [resource.id for resource in self.store.query(name='Lyz')],
+            ['peo_01'],
+        )
+
+    def test_query_can_exclude_a_state(self):
+        self.save()
+        self.assertEqual(
+            [
+                resource.id
+                for resource in self.store.query(
+                    'ec2',
+                    exclude_state='terminated',
+                )
+            ],
+            ['i-023desldk394995ss'],
+        )
+
+    def test_query_skips_the_types_without_resource_class(self):
+        self.save()
+        self.store.resource_classes = {'people': People}
+        self.assertEqual(
+            [resource.id for resource in self.store.query()],
+            ['peo_01'],
+        )
+
+    def test_query_raises_error_on_unindexed_fields(self):
+        self.save()
+        with self.assertRaises(ValueError):
+            self.store.query(description='tbd')
+
+    def test_unsupported_schema_version_raises_error(self):
+        connection = sqlite3.connect(self.database_path)
+        connection.execute('PRAGMA user_version = 99')
+        connection.close()
+        with self.assertRaises(ValueError):
+            self.store.resource_types()
+
+
+class TestSQLiteInventory(SQLiteStoreBaseTestClass, unittest.TestCase):
+    """
+    Test class to assess that the SQLiteInventory reads the resources of each
+    type from the store on demand.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.save()
+
+    def test_keys_are_the_stored_types(self):
+        inv = SQLiteInventory(self.store)
+        self.assertEqual(list(inv.keys()), ['ec2', 'people'])
+        self.assertEqual(len(inv), 2)
+
+    def test_keys_can_be_selected(self):
+        inv = SQLiteInventory(self.store, ['people', 'services'])
+        self.assertEqual(list(inv.keys()), ['people', 'services'])
+
+    def test_selected_types_without_resources_are_empty(self):
+        inv = SQLiteInventory(self.store, ['services'])
+        self.assertEqual(inv['services'], {})
+
+    @patch('clinv.store.SQLiteStore.query')
+    def test_resources_are_queried_once_on_first_access(self, queryMock):
+        queryMock.return_value = [self.person]
+        inv = SQLiteInventory(self.store)
+
+        self.assertFalse(queryMock.called)
+        self.assertEqual(inv['people'], {'peo_01': self.person})
+        inv['people']
+        queryMock.assert_called_once_with('people')
+
+    def test_unknown_types_raise_key_error(self):
+        with self.assertRaises(KeyError):
+            SQLiteInventory(self.store)['unexistent']